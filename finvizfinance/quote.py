@@ -4,11 +4,15 @@
 
 .. moduleauthor:: Tianning Li <ltianningli@gmail.com>
 """
+from concurrent.futures import ThreadPoolExecutor
+import copy
 from datetime import datetime
 import json
+import threading
+import time
 import pandas as pd
 import requests
-from finvizfinance.util import web_scrap, image_scrap, number_covert, headers
+from finvizfinance.util import web_scrap, image_scrap, number_covert, session_manager
 
 QUOTE_URL = "https://finviz.com/quote.ashx?t={ticker}"
 NUM_COL = [
@@ -21,6 +25,41 @@ NUM_COL = [
     "EPS nest Y",
     "Insider ",
 ]
+SIGNALS = [
+    "Top Gainers",
+    "Top Losers",
+    "New High",
+    "New Low",
+    "Most Volatile",
+    "Most Active",
+    "Unusual Volume",
+    "Overbought",
+    "Oversold",
+    "Downgrades",
+    "Upgrades",
+    "Earnings Before",
+    "Earnings After",
+    "Recent Insider Buying",
+    "Recent Insider Selling",
+    "Major News",
+    "Horizontal S/R",
+    "TL Resistance",
+    "TL Support",
+    "Wedge Up",
+    "Wedge Down",
+    "Triangle Ascending",
+    "Triangle Descending",
+    "Wedge",
+    "Channel Up",
+    "Channel Down",
+    "Channel",
+    "Double Top",
+    "Double Bottom",
+    "Multiple Top",
+    "Multiple Bottom",
+    "Head & Shoulders",
+    "Head & Shoulders Inverse",
+]
 
 
 class Quote:
@@ -46,19 +85,21 @@ class finvizfinance:
     Args:
         ticker(str): ticker string
         verbose(int): choice of visual the progress. 1 for visualize progress.
+        soup(beautiful soup): already loaded quote page. default: fetch it.
     """
 
     def __init__(
         self,
         ticker,
         verbose=0,
+        soup=None,
     ):
         """initiate module"""
 
         self.ticker = ticker
         self.flag = False
         self.quote_url = QUOTE_URL.format(ticker=ticker)
-        self.soup = web_scrap(self.quote_url)
+        self.soup = soup if soup is not None else web_scrap(self.quote_url)
         if self._checkexist(verbose):
             self.flag = True
         self.info = {}
@@ -325,43 +366,8 @@ class finvizfinance:
         from finvizfinance.screener.ticker import Ticker
 
         fticker = Ticker()
-        signals = [
-            "Top Gainers",
-            "Top Losers",
-            "New High",
-            "New Low",
-            "Most Volatile",
-            "Most Active",
-            "Unusual Volume",
-            "Overbought",
-            "Oversold",
-            "Downgrades",
-            "Upgrades",
-            "Earnings Before",
-            "Earnings After",
-            "Recent Insider Buying",
-            "Recent Insider Selling",
-            "Major News",
-            "Horizontal S/R",
-            "TL Resistance",
-            "TL Support",
-            "Wedge Up",
-            "Wedge Down",
-            "Triangle Ascending",
-            "Triangle Descending",
-            "Wedge",
-            "Channel Up",
-            "Channel Down",
-            "Channel",
-            "Double Top",
-            "Double Bottom",
-            "Multiple Top",
-            "Multiple Bottom",
-            "Head & Shoulders",
-            "Head & Shoulders Inverse",
-        ]
         ticker_signal = []
-        for signal in signals:
+        for signal in SIGNALS:
             try:
                 fticker.set_filter(signal=signal, ticker=self.ticker.upper())
                 if fticker.screener_view(verbose=0) == [self.ticker.upper()]:
@@ -383,6 +389,158 @@ class finvizfinance:
         return self.info
 
 
+class BatchQuote:
+    """BatchQuote
+    Getting information for many tickers. Each quote page is loaded once, every
+    section is parsed from that one soup, tickers are fetched concurrently (the
+    requests share the session manager's rate limit) and the parsed page is
+    cached per ticker, serving both the raw and the formatted fundament.
+
+    Args:
+        max_workers(int): number of quote pages loaded at the same time.
+        ttl(int): seconds a parsed ticker stays in the cache.
+    """
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, max_workers=4, ttl=900):
+        """initiate module"""
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.errors = {}
+
+    def _get_cached(self, key):
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._cache[key]
+                return None
+            return entry[1]
+
+    def _set_cached(self, key, info):
+        with self._cache_lock:
+            self._cache[key] = (time.time(), info)
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop every cached ticker."""
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    def _parse_ticker(self, ticker):
+        """Load the quote page of a ticker once and parse every section.
+
+        The fundament table is parsed both raw and formatted from the same
+        soup, so either form is served from one cached page.
+
+        Returns:
+            page(dict): raw and formatted fundament, and info with
+                ratings_outer, news and inside trader
+        """
+        stock = finvizfinance(ticker)
+        if not stock.flag:
+            raise ValueError("Ticker '{}' not found".format(ticker))
+        fundament = {
+            True: stock.ticker_fundament(raw=True),
+            False: stock.ticker_fundament(raw=False),
+        }
+        for section in (
+            stock.ticker_outer_ratings,
+            stock.ticker_news,
+            stock.ticker_inside_trader,
+        ):
+            try:
+                section()
+            except (AttributeError, IndexError):
+                # Section missing from the page (e.g. no insider trading)
+                pass
+        info = {key: value for key, value in stock.info.items() if key != "fundament"}
+        return {"fundament": fundament, "info": info}
+
+    def _load(self, ticker, raw):
+        page = self._get_cached(ticker)
+        if page is None:
+            page = self._parse_ticker(ticker)
+            self._set_cached(ticker, page)
+        # Callers get their own copy, the cached page stays untouched
+        info = copy.deepcopy(page["info"])
+        info["fundament"] = dict(page["fundament"][raw])
+        return info
+
+    def ticker_full_info(self, tickers, raw=True):
+        """Get all the ticker information for a list of tickers.
+
+        Args:
+            tickers(list): list of ticker strings
+            raw(boolean): if True, the fundament data is raw.
+
+        Returns:
+            info(dict): ticker information keyed by ticker. Tickers that failed are
+                left out and their error is kept in ``self.errors``.
+        """
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        self.errors = {}
+
+        def load(ticker):
+            try:
+                return ticker, self._load(ticker, raw)
+            except Exception as err:
+                self.errors[ticker] = str(err)
+                return ticker, None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(load, tickers))
+        return {ticker: info for ticker, info in results if info is not None}
+
+    def ticker_fundament(self, tickers, raw=False):
+        """Get the fundament table of a list of tickers.
+
+        Args:
+            tickers(list): list of ticker strings
+            raw(boolean): if True, the data is raw.
+
+        Returns:
+            df(pandas.DataFrame): one row of fundament per ticker, indexed by ticker
+        """
+        info = self.ticker_full_info(tickers, raw=raw)
+        df = pd.DataFrame.from_dict(
+            {ticker: item["fundament"] for ticker, item in info.items()}, orient="index"
+        )
+        df.index.name = "Ticker"
+        return df
+
+    def ticker_signal(self, tickers):
+        """Get the trading signals of a list of tickers.
+
+        One screener request per signal covers every ticker, instead of one
+        request per signal and ticker.
+
+        Args:
+            tickers(list): list of ticker strings
+
+        Returns:
+            ticker_signals(dict): list of signals keyed by ticker
+        """
+        from finvizfinance.screener.ticker import Ticker
+
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        ticker_signal = {ticker: [] for ticker in tickers}
+        fticker = Ticker()
+        for signal in SIGNALS:
+            try:
+                fticker.set_filter(signal=signal, ticker=",".join(tickers))
+                matched = fticker.screener_view(verbose=0) or []
+            except Exception:
+                continue
+            for ticker in matched:
+                if ticker in ticker_signal:
+                    ticker_signal[ticker].append(signal)
+        return ticker_signal
+
+
 class Statements:
     """
     Getting statements of ticker
@@ -403,7 +561,7 @@ class Statements:
             ticker=ticker, statement=statement, timeframe=timeframe
         )
         try:
-            website = requests.get(url, headers=headers)
+            website = session_manager.get(url)
             website.raise_for_status()
             response = json.loads(website.content)
             df = pd.DataFrame.from_dict(response["data"], orient="index")
@@ -5,6 +5,7 @@
 .. moduleauthor:: Tianning Li <ltianningli@gmail.com>
 
 """
+import asyncio
 import pdb
 import warnings
 from time import sleep
@@ -180,6 +181,15 @@ class Overview:
         Returns:
             df(pandas.DataFrame): screener information table
         """
+        frame = self._parse_rows(rows, num_col_index, table_header, limit)
+        return pd.concat([df, pd.DataFrame(frame)], ignore_index=True)
+
+    def _parse_rows(self, rows, num_col_index, table_header, limit=-1):
+        """Parse the rows of one screener page.
+
+        Returns:
+            frame(list): one dict per row, number columns converted
+        """
         rows = rows[1:]
         if limit != -1:
             rows = rows[0:limit]
@@ -195,7 +205,19 @@ class Overview:
                 else:
                     info_dict[table_header[i]] = number_covert(col.text)
             frame.append(info_dict)
-        return pd.concat([df, pd.DataFrame(frame)], ignore_index=True)
+        return frame
+
+    def _get_batch(self, rows, num_col_index, table_header, limit=-1):
+        """Get one screener page as a typed table.
+
+        Returns:
+            df(pandas.DataFrame): page rows, number columns as float
+        """
+        frame = self._parse_rows(rows, num_col_index, table_header, limit)
+        df = pd.DataFrame(frame, columns=table_header)
+        num_cols = [table_header[i] for i in num_col_index]
+        df[num_cols] = df[num_cols].astype(float)
+        return df
 
     def _screener_helper(self, i, page, rows, df, num_col_index, table_header, limit):
         """Get screener table helper function.
@@ -249,6 +271,90 @@ class Overview:
             df = self._process_additional_pages(df, start_page, end_page,select_page, page, num_col_index, table_header, limit, sleep_sec,verbose,order,ascend)
         return df
 
+    def screener_view_iter(
+        self,
+        order="ticker",
+        limit=-1,
+        select_page=None,
+        verbose=0,
+        ascend=True,
+        sleep_sec=1,
+    ):
+        """Iterate over the screener table one page at a time.
+
+        Pages are fetched lazily, so the first batch is available as soon as
+        the first page loads and only one page is held in memory.
+
+        Args:
+            order(str): sort the table by the choice of order.
+            limit(int): set the top k rows of the screener.
+            select_page(int): set the page of the screener.
+            verbose(int): choice of visual the progress. 1 for visualize progress.
+            ascend(bool): if True, the order is ascending.
+            sleep_sec(int): sleep seconds for fetching each page.
+        Yields:
+            df(pandas.DataFrame): rows of one page, number columns as float
+        """
+        url = self._build_url(order, ascend)
+        soup = self._fetch_soup(url)
+        page = self._get_page(soup)
+        if page == 0:
+            return
+
+        start_page, end_page, page = self._calculate_page_range(page, select_page, limit)
+        if select_page:
+            limit = -1
+        rows, table_header, num_col_index = self._extract_table_info(soup)
+
+        if not select_page or select_page == 1:
+            yield self._get_batch(
+                rows, num_col_index, table_header, self._page_limit(0, page, limit)
+            )
+        if select_page == 1:
+            return
+
+        for i in range(start_page, min(end_page, page)):
+            sleep(sleep_sec)  # Adding sleep
+            if verbose == 1:
+                progress_bar(i + 1, end_page)
+            soup = self._fetch_soup(self._page_url(i, order, ascend))
+            rows, _, _ = self._extract_table_info(soup)
+            yield self._get_batch(
+                rows, num_col_index, table_header, self._page_limit(i, page, limit)
+            )
+
+    async def screener_view_async(self, **kwargs):
+        """Async variant of screener_view_iter.
+
+        Pages are fetched in a worker thread so the event loop keeps running
+        while a page loads. Accepts the same arguments as screener_view_iter.
+
+        Yields:
+            df(pandas.DataFrame): rows of one page, number columns as float
+        """
+        batches = self.screener_view_iter(**kwargs)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                return
+            yield batch
+
+    def _page_limit(self, i, page, limit):
+        """Number of rows to keep from page i, -1 for all of them"""
+        if limit == -1 or i != page - 1:
+            return -1
+        return (limit - 1) % 20 + 1
+
+    def _page_url(self, i, order, ascend):
+        url = self.url
+        if order == "ticker":
+            url += "&r={}".format(i * 20 + 1)
+        else:
+            url += "&r={}".format(i * 20 + 1) + "&" + self.order_dict[order]
+        if not ascend:
+            url = url.replace("o=", "o=-")
+        return url
+
     def _build_url(self, order, ascend):
         url = self.url
         if order != "ticker":
@@ -307,14 +413,7 @@ class Overview:
                 else:
                     progress_bar(1, 1)
 
-            url = self.url
-            if order == "ticker":
-                url += "&r={}".format(i * 20 + 1)
-            else:
-                url += "&r={}".format(i * 20 + 1) + "&" + self.order_dict[order]
-            if not ascend:
-                url = url.replace("o=", "o=-")
-            soup = web_scrap(url)
+            soup = web_scrap(self._page_url(i, order, ascend))
             table = soup.find('table', {'class': 'styled-table-new is-rounded is-tabular-nums w-full screener_table'})
             rows = table.findAll("tr")
             df = self._screener_helper(
@@ -4,10 +4,17 @@
 
 .. moduleauthor:: Tianning Li <ltianningli@gmail.com>
 """
+import os
 import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
 import requests
 import pandas as pd
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_4) \
@@ -80,7 +87,210 @@ NUMBER_COL = [
     "Target Price",
 ]
 
-session = requests.Session()
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class SessionManager:
+    """SessionManager
+    Hand out one keep-alive ``requests.Session`` per thread. Every session mounts
+    the same pooled HTTPAdapter configuration with status-aware retries, and all
+    requests feed a shared set of per-host connection metrics.
+
+    Args:
+        pool_connections(int): number of host pools cached by each session.
+        pool_maxsize(int): maximum connections kept alive per host.
+        max_retries(int): retries on connection errors and 429/5xx responses.
+        backoff_factor(float): base delay (seconds) of the exponential backoff.
+        backoff_jitter(float): maximum random delay (seconds) added to each backoff.
+        min_interval(float): minimum seconds between two requests across all threads.
+    """
+
+    def __init__(
+        self,
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        min_interval=0.0,
+    ):
+        """initiate module"""
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.min_interval = min_interval
+        self._local = threading.local()
+        self._sessions = []
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+        self._next_request = 0.0
+        self._metrics = {}
+
+    def configure(self, **kwargs):
+        """Update the pool/retry settings. Sessions are rebuilt lazily per thread.
+
+        Args:
+            kwargs: any of the constructor arguments.
+        """
+        for key, value in kwargs.items():
+            if not hasattr(self, key) or key.startswith("_"):
+                raise ValueError("Invalid session setting '{}'".format(key))
+            setattr(self, key, value)
+        self.close()
+
+    def _build_retry(self):
+        """Build the urllib3 retry policy.
+
+        Returns:
+            retry(urllib3.util.retry.Retry): retry policy
+        """
+        options = dict(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=frozenset(["HEAD", "GET", "OPTIONS"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        try:
+            return Retry(backoff_jitter=self.backoff_jitter, **options)
+        except TypeError:
+            # urllib3 < 2.0 has no jitter support
+            return Retry(**options)
+
+    def _build_session(self):
+        """Build a session with the pooled retry adapter mounted.
+
+        Returns:
+            session(requests.Session): new session
+        """
+        session = requests.Session()
+        session.headers.update(headers)
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self._build_retry(),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def get_session(self):
+        """Get the session of the calling thread.
+
+        Returns:
+            session(requests.Session): thread-local session
+        """
+        session = getattr(self._local, "session", None)
+        if session is None or self._local.generation != self._generation:
+            session = self._build_session()
+            with self._lock:
+                self._sessions.append(session)
+                self._local.generation = self._generation
+            self._local.session = session
+        return session
+
+    def _throttle(self):
+        """Block until the shared minimum interval between requests has passed."""
+        if self.min_interval <= 0:
+            return
+        with self._throttle_lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+    def get(self, url, **kwargs):
+        """Send a GET request through the calling thread's session.
+
+        Args:
+            url(str): website
+            kwargs: extra arguments passed to ``requests.Session.get``
+        Returns:
+            response(requests.Response): website response
+        """
+        kwargs.setdefault("headers", headers)
+        kwargs.setdefault("timeout", 10)
+        host = urlsplit(url).netloc
+        self._throttle()
+        start = time.perf_counter()
+        try:
+            response = self.get_session().get(url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(host, time.perf_counter() - start, error=True)
+            raise
+        retries = getattr(getattr(response.raw, "retries", None), "history", ())
+        self._record(
+            host,
+            time.perf_counter() - start,
+            status=response.status_code,
+            retries=len(retries),
+            error=response.status_code >= 400,
+        )
+        return response
+
+    def _record(self, host, elapsed, status=None, retries=0, error=False):
+        """Record one request in the per-host metrics."""
+        with self._lock:
+            metric = self._metrics.setdefault(
+                host,
+                {
+                    "requests": 0,
+                    "errors": 0,
+                    "retries": 0,
+                    "total_time": 0.0,
+                    "status": {},
+                },
+            )
+            metric["requests"] += 1
+            metric["retries"] += retries
+            metric["total_time"] += elapsed
+            if error:
+                metric["errors"] += 1
+            if status is not None:
+                metric["status"][status] = metric["status"].get(status, 0) + 1
+
+    def get_metrics(self):
+        """Get per-host connection metrics.
+
+        Returns:
+            metrics(dict): requests, errors, retries, total_time, avg_time and
+                status counts for each host
+        """
+        with self._lock:
+            metrics = {}
+            for host, metric in self._metrics.items():
+                metrics[host] = dict(metric, status=dict(metric["status"]))
+                metrics[host]["avg_time"] = metric["total_time"] / metric["requests"]
+            metrics["_sessions"] = len(self._sessions)
+            return metrics
+
+    def reset_metrics(self):
+        """Clear the per-host connection metrics."""
+        with self._lock:
+            self._metrics = {}
+
+    def close(self):
+        """Close every session. Threads build a fresh one on their next request."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+            self._generation += 1
+        for session in sessions:
+            session.close()
+
+
+session_manager = SessionManager(
+    pool_connections=int(os.getenv("FINVIZ_POOL_CONNECTIONS", 10)),
+    pool_maxsize=int(os.getenv("FINVIZ_POOL_MAXSIZE", 10)),
+    max_retries=int(os.getenv("FINVIZ_MAX_RETRIES", 3)),
+    backoff_factor=float(os.getenv("FINVIZ_BACKOFF_FACTOR", 0.5)),
+    backoff_jitter=float(os.getenv("FINVIZ_BACKOFF_JITTER", 0.5)),
+    min_interval=float(os.getenv("FINVIZ_MIN_INTERVAL", 0.0)),
+)
 
 
 def web_scrap(url):
@@ -92,7 +302,7 @@ def web_scrap(url):
     """
 
     try:
-        website = session.get(url, headers=headers, timeout=10)
+        website = session_manager.get(url)
         website.raise_for_status()
         # Try lxml first, fallback to html.parser if not available
         try:
@@ -115,7 +325,7 @@ def image_scrap(url, ticker, out_dir):
         out_dir(str): output directory
     """
     try:
-        r = session.get(url, stream=True, headers=headers, timeout=10)
+        r = session_manager.get(url, stream=True)
         r.raise_for_status()
         r.raw.decode_content = True
         if len(out_dir) != 0:
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Record finviz pages into the offline fixture corpus
+This script refreshes tests/fixtures/finviz from the live site so the parser
+benchmarks in tests/benchmarks run against current markup
+"""
+
+import sys
+import os
+import logging
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from finvizfinance.util import session_manager
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'finviz')
+
+SCREENER_VIEWS = [111, 121, 131, 141, 161, 171]
+GROUP_VIEWS = [110, 120]
+
+def fixture_urls():
+    """Map each fixture file name to the page it is recorded from"""
+    urls = {}
+    for v_page in SCREENER_VIEWS:
+        base = f"https://finviz.com/screener.ashx?v={v_page}&f=idx_sp500,sec_technology&ft=4"
+        urls[f"screener_v{v_page}_p1.html"] = base
+        urls[f"screener_v{v_page}_p2.html"] = base + "&r=21"
+    for v_page in GROUP_VIEWS:
+        urls[f"group_v{v_page}.html"] = f"https://finviz.com/groups.ashx?g=sector&v={v_page}&o=name"
+    urls["quote.html"] = "https://finviz.com/quote.ashx?t=AAPL"
+    urls["news.html"] = "https://finviz.com/news.ashx"
+    urls["insider.html"] = "https://finviz.com/insidertrading.ashx"
+    return urls
+
+def main():
+    """Download every fixture page"""
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+
+    failed = []
+    for name, url in fixture_urls().items():
+        try:
+            response = session_manager.get(url)
+            response.raise_for_status()
+            with open(os.path.join(FIXTURE_DIR, name), 'w', encoding='utf-8') as fh:
+                fh.write(response.text)
+            logger.info(f"Recorded {name} ({len(response.text)} bytes)")
+        except Exception as e:
+            logger.error(f"Failed to record {name} from {url}: {e}")
+            failed.append(name)
+        time.sleep(1)  # Be respectful to finviz
+
+    if failed:
+        logger.error(f"Failed fixtures: {failed}")
+        return False
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
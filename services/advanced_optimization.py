@@ -4,6 +4,11 @@ import pandas as pd
 import warnings
 warnings.filterwarnings('ignore')
 
+from services.covariance import covariance_engine
+
+# The return table states annual return and risk in percent
+PERCENT = 100.0
+
 # Conditional imports for optional optimization packages
 try:
     from scipy.optimize import minimize
@@ -21,7 +26,6 @@ except ImportError:
     logging.warning("cvxpy not available - convex optimization features disabled")
 
 try:
-    from sklearn.covariance import LedoitWolf
     from sklearn.decomposition import PCA
     SKLEARN_AVAILABLE = True
 except ImportError:
@@ -39,7 +43,12 @@ class AdvancedPortfolioOptimizer:
     
     def calculate_returns_and_covariance(self, df):
         """
-        Calculate historical returns and covariance matrix with robust estimation
+        Expected returns and the covariance of the candidates
+        
+        The covariance is the slice of the precomputed universe covariance for
+        these tickers, in the percent units of the return table. A ticker
+        outside the universe keeps its expected_annual_risk as variance and no
+        correlation with the others.
         """
         try:
             # Extract price data and calculate returns
@@ -47,48 +56,25 @@ class AdvancedPortfolioOptimizer:
             if price_cols[0] not in df.columns:
                 raise ValueError("Price column not found in data")
             
-            # For now, we'll use the expected returns from the data
-            # In a real implementation, you'd calculate historical returns
             returns = df[['Ticker', 'expected_annual_return', 'expected_annual_risk']].copy()
             returns = returns.set_index('Ticker')
+            tickers = returns.index.tolist()
             
-            # Create a covariance matrix based on risk and correlation assumptions
-            n_assets = len(returns)
-            correlation_matrix = self._estimate_correlation_matrix(returns)
-            
-            # Create covariance matrix: Cov = Corr * std_i * std_j
-            std_devs = returns['expected_annual_risk'].values
-            covariance_matrix = np.outer(std_devs, std_devs) * correlation_matrix
+            std_devs = pd.to_numeric(returns['expected_annual_risk'], errors='coerce').fillna(0).to_numpy()
+            covariance_matrix = np.diag(std_devs ** 2)
+            historical = covariance_engine.covariance(tickers)
+            if not historical.empty:
+                rows = [tickers.index(ticker) for ticker in historical.index]
+                covariance_matrix[np.ix_(rows, rows)] = historical.to_numpy() * PERCENT ** 2
+            else:
+                self.logger.warning("No historical covariance available - assuming uncorrelated returns")
             
-            return returns['expected_annual_return'].values, covariance_matrix, returns.index.tolist()
+            return returns['expected_annual_return'].values, covariance_matrix, tickers
             
         except Exception as e:
             self.logger.error(f"Error calculating returns and covariance: {e}")
             raise
     
-    def _estimate_correlation_matrix(self, returns_df):
-        """
-        Estimate correlation matrix using sector-based correlations
-        """
-        n_assets = len(returns_df)
-        
-        # Base correlation matrix (assuming some sector-based correlation)
-        # In practice, you'd use historical correlation data
-        base_corr = 0.3  # Base correlation between stocks
-        correlation_matrix = np.full((n_assets, n_assets), base_corr)
-        np.fill_diagonal(correlation_matrix, 1.0)
-        
-        # Add some random variation to make it more realistic
-        np.random.seed(42)  # For reproducibility
-        noise = np.random.normal(0, 0.1, (n_assets, n_assets))
-        noise = (noise + noise.T) / 2  # Make symmetric
-        np.fill_diagonal(noise, 0)
-        
-        correlation_matrix += noise
-        correlation_matrix = np.clip(correlation_matrix, -0.9, 0.9)
-        
-        return correlation_matrix
-    
     def markowitz_optimization(self, returns, covariance, target_return=None, risk_aversion=1.0):
         """
         Modern Portfolio Theory (Markowitz) optimization
@@ -1,15 +1,20 @@
 import asyncio
 import logging
 import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 import yfinance as yf
 
-import utilities.helper as helper
 from enums.enum import RiskEnum
 from services.data_fetcher import fetch_stock_data_sync
+from utilities.price_store import price_store
 from utilities.redis_data import redis_manager
+from utilities.schema import apply_schema
 from datetime import datetime, timedelta
 
 logger_format = '%(asctime)s:%(threadName)s:%(message)s'
@@ -17,98 +22,149 @@ logging.basicConfig(format=logger_format, level=logging.INFO, datefmt="%H:%M:%S"
 
 # Using new async data fetcher instead of SourceDataMapperService
 
+# Yahoo download settings from environment variables
+YAHOO_CALLS_PER_SECOND = float(os.getenv('YAHOO_CALLS_PER_SECOND', 2))
+YAHOO_DOWNLOAD_WORKERS = int(os.getenv('YAHOO_DOWNLOAD_WORKERS', 4))
+YAHOO_CHUNK_RETRIES = int(os.getenv('YAHOO_CHUNK_RETRIES', 2))
+# Per-ticker annual returns older than this are recomputed on the next lookup
+ANNUAL_RETURN_MAX_AGE_HOURS = float(os.getenv('ANNUAL_RETURN_MAX_AGE_HOURS', 24))
+YAHOO_CHUNK_TIMEOUT = float(os.getenv('YAHOO_CHUNK_TIMEOUT', 120))
+# Tickers Yahoo could not resolve are not downloaded again for this long
+ANNUAL_RETURN_FAILURE_TTL_HOURS = float(os.getenv('ANNUAL_RETURN_FAILURE_TTL_HOURS', 6))
+
+# Exclusive bounds of the expected annual risk for each risk tolerance
+RISK_TOLERANCE_RANGES = {
+    RiskEnum.LOW.value: (.1, .45),
+    RiskEnum.MEDIUM.value: (.35, .65),
+    RiskEnum.HIGH.value: (.6, float('inf')),
+}
+
+
+class DownloadRateLimiter:
+    """Minimum spacing between upstream calls, shared by every worker thread"""
+
+    def __init__(self, calls_per_second):
+        self.interval = 1.0 / calls_per_second if calls_per_second > 0 else 0.0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+yahoo_rate_limiter = DownloadRateLimiter(YAHOO_CALLS_PER_SECOND)
+
+
+# Columns of the annual return table
+RETURN_COLUMNS = ['Ticker', 'expected_annual_return', 'expected_annual_risk', 'return_risk_ratio']
+
+# Trading days per horizon of the multi-horizon metrics
+HORIZONS = {'1m': 21, '3m': 63, '6m': 126, '1y': 252, '3y': 756, '5y': 1260}
+RISK_WINDOW = 252
+BENCHMARK_TICKER = 'SPY'
+METRIC_COLUMNS = (['Ticker'] + [f'return_{h}' for h in HORIZONS]
+                  + ['downside_deviation', 'max_drawdown', 'beta_spy'])
+
+
+def fill_and_daily_returns(prices, valid):
+    """Forward-filled closes and daily returns between consecutive valid closes
+
+    Returns are NaN wherever a ticker has no close, so ragged histories give
+    the same values as dropna() followed by pct_change() per ticker.
+    """
+    num_rows, num_tickers = prices.shape
+    cols = np.arange(num_tickers)
+    # Row of the latest valid close at or before every cell, -1 when there is none
+    latest = np.maximum.accumulate(np.where(valid, np.arange(num_rows)[:, None], -1), axis=0)
+    filled = np.where(latest >= 0, prices[np.maximum(latest, 0), cols], np.nan)
+    previous_close = np.vstack([np.full((1, num_tickers), np.nan), filled[:-1]])
+    returns = np.where(valid, prices / previous_close - 1, np.nan)
+    return filled, returns
+
+
 class AnnualReturn:
 
     def  __init__(self):
         self.annual_return_redis = 'annual-return'
         self.start_date = '2018-01-01'
         self.end_date = '2024-01-01'
+        self.download_workers = YAHOO_DOWNLOAD_WORKERS
+        self.chunk_retries = YAHOO_CHUNK_RETRIES
+        self.retry_backoff = 1.0
+        self.chunk_timeout = YAHOO_CHUNK_TIMEOUT
+        self.max_age = timedelta(hours=ANNUAL_RETURN_MAX_AGE_HOURS)
+        self.failure_ttl = timedelta(hours=ANNUAL_RETURN_FAILURE_TTL_HOURS)
 
-    async def get_result(self,tickers):
+    async def get_result(self, tickers, timeout=None):
+        """Annual returns of one chunk, computed in a worker thread
+        
+        The event loop stays free while the chunk downloads. A chunk that
+        exceeds the timeout gives an empty DataFrame; its thread finishes the
+        download in the background and the stored prices are reused next time.
+        Cancelling the caller cancels the wait the same way.
+        """
+        timeout = self.chunk_timeout if timeout is None else timeout
         logging.info(f"Start Task {tickers}")
-        df = await self.get_annual_return(tickers)
+        try:
+            df = await asyncio.wait_for(asyncio.to_thread(self.get_annual_return, tickers), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Annual returns for {tickers} timed out after {timeout}s")
+            return pd.DataFrame()
         logging.info(f"End Task {tickers}")
         return df
 
-    async def gather_result(self,ticker_lists):
+    async def gather_result(self, ticker_lists, chunk_size=10, max_concurrency=None, timeout=None):
+        """Annual returns of many tickers, at most max_concurrency chunks at a time
+        
+        Args:
+            ticker_lists: ticker symbols
+            chunk_size: tickers per download
+            max_concurrency: chunks running at once, download_workers by default
+            timeout: seconds allowed per chunk, chunk_timeout by default
+        
+        Returns:
+            list with one annual return DataFrame per chunk
+        """
         logging.info("Gathering Results for {} Tickers".format(len(ticker_lists)))
-        chunk_size = 10
-        num_tickers = len(ticker_lists)
-        remainder = num_tickers % chunk_size
-        if remainder == 0:
-            chunks = [ticker_lists[i:i+chunk_size] for i in range(0, num_tickers, chunk_size)]
-        else:
-            chunks = [ticker_lists[i:i+chunk_size] for i in range(0, num_tickers - remainder, chunk_size)]
-            chunks.append(ticker_lists[-remainder:])
-        return await asyncio.gather(*[self.get_result(tickers) for tickers in chunks])
-
+        chunks = [ticker_lists[i:i + chunk_size] for i in range(0, len(ticker_lists), chunk_size)]
+        semaphore = asyncio.Semaphore(max_concurrency or self.download_workers)
+        
+        async def run(chunk):
+            async with semaphore:
+                return await self.get_result(chunk, timeout)
+        
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            # Cancelled or failed: chunks still waiting for a slot never start
+            for task in tasks:
+                task.cancel()
+            raise
 
     def get_annual_return(self, ticker_list):
         """Get annual return for a list of tickers"""
         try:
-            # Use more recent date range to avoid delisted stock issues
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=365)  # Use 1 year instead of 6 years
-            
-            logging.info(f"Fetching data for {len(ticker_list)} tickers from {start_date.date()} to {end_date.date()}")
+            start_date, end_date = self._annual_window()
             
-            # Download data with error handling
-            data = yf.download(
-                ticker_list, 
-                start=start_date, 
-                end=end_date,
-                group_by='ticker',
-                progress=False,  # Reduce logging noise
-                ignore_tz=True
-            )
+            self.refresh_price_history(ticker_list, start_date, end_date)
+            data = price_store.read(ticker_list, start=start_date, end=end_date, field='close', adjusted=True)
             
             if data.empty:
                 logging.warning(f"No data returned for tickers: {ticker_list}")
                 return pd.DataFrame()
             
-            # Process the data
-            results = []
-            for ticker in ticker_list:
-                try:
-                    if isinstance(data.columns, pd.MultiIndex):
-                        # Multiple tickers case
-                        ticker_data = data[ticker] if ticker in data.columns.get_level_values(0) else None
-                    else:
-                        # Single ticker case
-                        ticker_data = data if len(ticker_list) == 1 else None
-                    
-                    if ticker_data is not None and not ticker_data.empty:
-                        # Calculate annual return
-                        if 'Close' in ticker_data.columns:
-                            close_prices = ticker_data['Close'].dropna()
-                            if len(close_prices) > 1:
-                                initial_price = close_prices.iloc[0]
-                                final_price = close_prices.iloc[-1]
-                                annual_return = ((final_price - initial_price) / initial_price) * 100
-                                
-                                # Calculate volatility
-                                returns = close_prices.pct_change().dropna()
-                                volatility = returns.std() * (252 ** 0.5) * 100  # Annualized
-                                
-                                results.append({
-                                    'Ticker': ticker,
-                                    'expected_annual_return': round(annual_return, 3),
-                                    'expected_annual_risk': round(volatility, 3),
-                                    'return_risk_ratio': round(annual_return / volatility, 3) if volatility > 0 else 0
-                                })
-                            else:
-                                logging.warning(f"Insufficient data for {ticker}")
-                        else:
-                            logging.warning(f"No 'Close' column found for {ticker}")
-                    else:
-                        logging.warning(f"No data available for {ticker}")
-                        
-                except Exception as e:
-                    logging.warning(f"Error processing {ticker}: {e}")
-                    continue
+            tickers = [ticker for ticker in dict.fromkeys(ticker_list) if ticker in data.columns]
+            for ticker in set(ticker_list) - set(tickers):
+                logging.warning(f"No data available for {ticker}")
             
-            if results:
-                df = pd.DataFrame(results)
+            df = self.compute_return_metrics(data[tickers])
+            if not df.empty:
                 logging.info(f"Successfully processed {len(df)} tickers")
                 return df
             else:
@@ -119,6 +175,307 @@ class AnnualReturn:
             logging.error(f"Error calculating annual return for {ticker_list}: {e}")
             return pd.DataFrame()
 
+    def compute_return_metrics(self, closes):
+        """Annual return, annualized volatility and return/risk ratio for every ticker
+        
+        Works on a dates x tickers close matrix in a few array operations.
+        Histories may be ragged: each ticker uses its first and last valid
+        close, and daily returns between consecutive valid closes, exactly as
+        dropna() followed by pct_change() would.
+        
+        Args:
+            closes: DataFrame indexed by date with one column per ticker
+        
+        Returns:
+            DataFrame with Ticker, expected_annual_return, expected_annual_risk
+            and return_risk_ratio; tickers with fewer than two closes are left out
+        """
+        prices = closes.to_numpy(dtype=float)
+        if prices.size == 0:
+            return pd.DataFrame(columns=RETURN_COLUMNS)
+        
+        num_rows, num_tickers = prices.shape
+        valid = ~np.isnan(prices)
+        counts = valid.sum(axis=0)
+        cols = np.arange(num_tickers)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _, returns = fill_and_daily_returns(prices, valid)
+            
+            initial_price = prices[valid.argmax(axis=0), cols]
+            final_price = prices[num_rows - 1 - valid[::-1].argmax(axis=0), cols]
+            annual_return = ((final_price - initial_price) / initial_price) * 100
+            
+            # Sample standard deviation of the daily returns (ddof=1)
+            num_returns = counts - 1
+            mean = np.nansum(returns, axis=0) / num_returns
+            variance = np.nansum((returns - mean) ** 2, axis=0) / (num_returns - 1)
+            variance = np.where(num_returns > 1, variance, np.nan)
+            volatility = np.sqrt(variance) * (252 ** 0.5) * 100  # Annualized
+            
+            ratio = np.where(volatility > 0, np.round(annual_return / volatility, 3), 0)
+        
+        keep = counts > 1
+        for ticker in closes.columns[~keep]:
+            logging.warning(f"Insufficient data for {ticker}")
+        
+        return pd.DataFrame({
+            'Ticker': closes.columns[keep],
+            'expected_annual_return': np.round(annual_return[keep], 3),
+            'expected_annual_risk': np.round(volatility[keep], 3),
+            'return_risk_ratio': ratio[keep].astype(float)
+        }, columns=RETURN_COLUMNS).reset_index(drop=True)
+
+    def compute_horizon_metrics(self, closes, benchmark=None):
+        """Multi-horizon returns and risk measures for every ticker in one pass
+        
+        Args:
+            closes: DataFrame indexed by date with one column per ticker
+            benchmark: close Series of the beta benchmark (SPY), optional
+        
+        Returns:
+            wide DataFrame with one row per ticker and METRIC_COLUMNS:
+            return_<h> is the total return in % over HORIZONS[h] trading days
+            (NaN when the ticker is younger than that); downside_deviation
+            (annualized, %), max_drawdown (%) and beta_spy are measured over the
+            last RISK_WINDOW trading days; beta_spy is named apart from the
+            screener's beta so both survive the join
+        """
+        prices = closes.to_numpy(dtype=float)
+        if prices.size == 0:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        
+        num_rows, num_tickers = prices.shape
+        valid = ~np.isnan(prices)
+        first_row = np.where(valid.any(axis=0), valid.argmax(axis=0), num_rows)
+        metrics = {'Ticker': closes.columns}
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            filled, returns = fill_and_daily_returns(prices, valid)
+            final_price = filled[-1]
+            
+            for horizon, days in HORIZONS.items():
+                base_row = num_rows - 1 - days
+                if base_row < 0:
+                    metrics[f'return_{horizon}'] = np.full(num_tickers, np.nan)
+                    continue
+                change = (final_price / filled[base_row] - 1) * 100
+                metrics[f'return_{horizon}'] = np.where(first_row <= base_row, change, np.nan)
+            
+            window = min(RISK_WINDOW, num_rows - 1)
+            recent = returns[num_rows - window:]
+            observed = ~np.isnan(recent)
+            count = observed.sum(axis=0)
+            
+            # Downside deviation: root mean square of the negative daily returns
+            downside = np.where(observed, np.minimum(recent, 0), 0)
+            downside_deviation = np.sqrt((downside ** 2).sum(axis=0) / count) * (252 ** 0.5) * 100
+            metrics['downside_deviation'] = np.where(count > 1, downside_deviation, np.nan)
+            
+            # Max drawdown against the running peak of the window
+            window_prices = filled[num_rows - window - 1:]
+            running_peak = np.fmax.accumulate(window_prices, axis=0)
+            drawdown = np.where(np.isnan(window_prices), 0, window_prices / running_peak - 1)
+            metrics['max_drawdown'] = np.where(count > 0, drawdown.min(axis=0) * 100, np.nan)
+            
+            metrics['beta_spy'] = self._beta(recent, observed, benchmark, closes.index[num_rows - window:])
+        
+        df = pd.DataFrame(metrics, columns=METRIC_COLUMNS)
+        numeric_columns = METRIC_COLUMNS[1:]
+        df[numeric_columns] = df[numeric_columns].astype(float).round(3)
+        return df.reset_index(drop=True)
+
+    def _beta(self, returns, observed, benchmark, dates):
+        """Beta of each column of returns against the benchmark over the same dates
+        
+        Uses only the days on which both the ticker and the benchmark traded.
+        """
+        num_tickers = returns.shape[1]
+        if benchmark is None or benchmark.dropna().empty:
+            return np.full(num_tickers, np.nan)
+        
+        bench = benchmark.dropna()
+        bench_returns = (bench / bench.shift(1) - 1).reindex(dates).to_numpy(dtype=float)
+        both = observed & ~np.isnan(bench_returns)[:, None]
+        n = both.sum(axis=0)
+        x = np.where(both, bench_returns[:, None], 0)
+        y = np.where(both, returns, 0)
+        sum_x, sum_y = x.sum(axis=0), y.sum(axis=0)
+        covariance = (x * y).sum(axis=0) - sum_x * sum_y / n
+        variance = (x * x).sum(axis=0) - sum_x ** 2 / n
+        return np.where((n > 2) & (variance > 0), covariance / variance, np.nan)
+
+    def get_return_metrics(self, ticker_list):
+        """Refresh price history and compute the multi-horizon metrics table
+        
+        Backfills five years of history the first time, then only appends the
+        missing days. The table is saved to Redis for update_with_return_data.
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=int(max(HORIZONS.values()) * 365 / 252) + 10)
+        tickers = list(dict.fromkeys(list(ticker_list) + [BENCHMARK_TICKER]))
+        
+        self.refresh_price_history(tickers, start_date, end_date)
+        closes = price_store.read(tickers, start=start_date, end=end_date, field='close', adjusted=True)
+        if closes.empty:
+            logging.warning("No price history available for return metrics")
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        
+        benchmark = closes[BENCHMARK_TICKER] if BENCHMARK_TICKER in closes.columns else None
+        wanted = [t for t in dict.fromkeys(ticker_list) if t in closes.columns]
+        df = self.compute_horizon_metrics(closes[wanted], benchmark=benchmark)
+        redis_manager.save_return_metrics(df)
+        logging.info(f"Computed return metrics for {len(df)} tickers")
+        return df
+
+    def _annual_window(self):
+        # Use more recent date range to avoid delisted stock issues
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=365)  # Use 1 year instead of 6 years
+        return start_date, end_date
+
+    def refresh_price_history(self, ticker_list, start_date, end_date):
+        """Download only the trading days missing from the local price store
+        
+        Tickers that are already up to date cost nothing; the rest are grouped
+        by the range they are missing so each group is a single download.
+        
+        Returns:
+            number of new daily rows stored
+        """
+        added, _ = self._refresh_prices(ticker_list, start_date, end_date)
+        return added
+
+    def _refresh_prices(self, ticker_list, start_date, end_date):
+        """Refresh the price store and report the tickers that failed
+        
+        A ticker fails when its download raised or when it still has no
+        stored history afterwards. An empty incremental download (weekend,
+        holiday) is not a failure.
+        
+        Returns:
+            (number of new daily rows stored, list of failed tickers)
+        """
+        added = 0
+        failed = []
+        for (start, end), tickers in price_store.missing_ranges(ticker_list, start_date, end_date).items():
+            logging.info(f"Fetching {len(tickers)} tickers from {start.date()} to {end.date()}")
+            yahoo_rate_limiter.wait()
+            try:
+                data = yf.download(
+                    tickers, 
+                    start=start, 
+                    end=end,
+                    group_by='ticker',
+                    progress=False,  # Reduce logging noise
+                    ignore_tz=True,
+                    # Raw closes plus actions; the store applies the adjustments on read
+                    auto_adjust=False,
+                    actions=True
+                )
+            except Exception as e:
+                logging.error(f"Error downloading price history for {tickers}: {e}")
+                failed.extend(tickers)
+                continue
+            
+            for ticker, prices in self._split_download(data, tickers).items():
+                try:
+                    added += price_store.append(ticker, prices, requested_start=start)
+                except Exception as e:
+                    logging.warning(f"Error storing price history for {ticker}: {e}")
+            failed.extend(t for t in tickers if not price_store.has_history(t))
+        
+        if added:
+            logging.info(f"Stored {added} new daily rows for {len(ticker_list)} tickers")
+        return added, failed
+
+    def _process_chunk(self, chunk, start_date, end_date):
+        """Refresh and score one chunk, retrying only the tickers that failed
+        
+        Returns:
+            (annual return DataFrame for the chunk, tickers that never loaded)
+        """
+        pending = list(chunk)
+        for attempt in range(self.chunk_retries + 1):
+            if attempt < self.chunk_retries or len(pending) == 1:
+                _, pending = self._refresh_prices(pending, start_date, end_date)
+            else:
+                # Last attempt: one download per ticker so a bad symbol cannot sink the rest
+                pending = [t for t in pending if self._refresh_prices([t], start_date, end_date)[1]]
+            if not pending or attempt == self.chunk_retries:
+                break
+            delay = self.retry_backoff * (2 ** attempt)
+            logging.warning(f"Retrying {len(pending)} tickers in {delay:.1f}s: {pending}")
+            time.sleep(delay)
+        
+        closes = price_store.read(chunk, start=start_date, end=end_date, field='close', adjusted=True)
+        tickers = [ticker for ticker in dict.fromkeys(chunk) if ticker in closes.columns]
+        return self.compute_return_metrics(closes[tickers]), pending
+
+    def download_annual_returns(self, ticker_lists, chunk_size=50):
+        """Compute annual returns for many tickers with bounded concurrent downloads
+        
+        Chunks run in a thread pool under the shared Yahoo rate limit. The
+        tickers of each finished chunk are saved to Redis right away, so a
+        failure later in the run keeps the work already done. Tickers that
+        still failed on their own download get a failure marker; a chunk that
+        failed as a whole is not marked, as that is usually transient.
+        
+        Returns:
+            (annual return DataFrame, list of tickers that could not be loaded)
+        """
+        start_date, end_date = self._annual_window()
+        chunks = [ticker_lists[i:i + chunk_size] for i in range(0, len(ticker_lists), chunk_size)]
+        all_results = []
+        failed = []
+        
+        with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix='yahoo') as executor:
+            futures = {executor.submit(self._process_chunk, chunk, start_date, end_date): i
+                       for i, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result_df, chunk_failed = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing chunk {i + 1}: {e}")
+                    failed.extend(chunks[i])
+                    continue
+                
+                failed.extend(chunk_failed)
+                if chunk_failed:
+                    redis_manager.save_ticker_failures(chunk_failed, int(self.failure_ttl.total_seconds()))
+                logging.info(f"Finished chunk {i + 1}/{len(chunks)}: {len(result_df)} tickers")
+                if not result_df.empty:
+                    all_results.append(result_df)
+                    redis_manager.save_ticker_returns(result_df)
+        
+        if failed:
+            logging.warning(f"Could not load {len(failed)} tickers: {failed}")
+        if not all_results:
+            return pd.DataFrame(), failed
+        return pd.concat(all_results, axis=0, ignore_index=True), failed
+
+    def _split_download(self, data, ticker_list):
+        """Split a yf.download frame into one price frame per ticker"""
+        frames = {}
+        if data is None or data.empty:
+            return frames
+        for ticker in ticker_list:
+            if isinstance(data.columns, pd.MultiIndex):
+                # Multiple tickers case
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                ticker_data = data[ticker]
+            elif len(ticker_list) == 1:
+                # Single ticker case
+                ticker_data = data
+            else:
+                continue
+            ticker_data = ticker_data.dropna(how='all')
+            if not ticker_data.empty:
+                frames[ticker] = ticker_data
+        return frames
+
     def get_annual_return_data(self):
         df = redis_manager.get_annual_returns()
         
@@ -168,34 +525,10 @@ class AnnualReturn:
         logging.info("Fetching real annual returns data from Yahoo Finance...")
         
         try:
-            # Process tickers in chunks to avoid overwhelming the API
-            chunk_size = 50  # Yahoo Finance can handle larger chunks
-            all_results = []
-            
-            for i in range(0, len(ticker_lists), chunk_size):
-                chunk = ticker_lists[i:i + chunk_size]
-                logging.info(f"Processing chunk {i//chunk_size + 1}: tickers {i+1}-{min(i+chunk_size, len(ticker_lists))}")
-                
-                try:
-                    # Use the new synchronous function directly
-                    result_df = self.get_annual_return(chunk)
-                    
-                    if not result_df.empty:
-                        all_results.append(result_df)
-                    
-                    # Add small delay to be respectful to Yahoo Finance API
-                    import time
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    logging.error(f"Error processing chunk {i//chunk_size + 1}: {e}")
-                    continue
+            df = self.get_returns_for_tickers(ticker_lists)
             
-            if all_results:
-                df = pd.concat(all_results, axis=0, ignore_index=True)
+            if not df.empty:
                 logging.info(f"Successfully fetched data for {len(df)} stocks from Yahoo Finance")
-                
-                # Save to Redis manager with longer TTL (48 hours instead of 24)
                 redis_manager.save_annual_returns(df)
                 return df
             else:
@@ -207,7 +540,44 @@ class AnnualReturn:
             logging.info("Falling back to mock data generation...")
             return self._generate_fallback_data(ticker_lists)
     
-    def _generate_fallback_data(self, ticker_lists):
+    def get_returns_for_tickers(self, ticker_lists):
+        """Annual returns of exactly these tickers, downloading only what is not cached
+        
+        Each ticker has its own Redis record. Records older than max_age are
+        recomputed, and are still used when the recomputation fails. Tickers
+        with a recent failure marker are not downloaded again until it expires.
+        
+        Returns:
+            DataFrame with one row per ticker that has a return, in input order
+        """
+        tickers = list(dict.fromkeys(ticker_lists))
+        cached = redis_manager.get_ticker_returns(tickers)
+        if cached.empty:
+            fresh = set()
+        else:
+            computed_at = pd.to_datetime(cached['timestamp'], errors='coerce')
+            fresh = set(cached.loc[computed_at >= datetime.now() - self.max_age, 'Ticker'])
+        
+        frames = [cached]
+        missing = [ticker for ticker in tickers if ticker not in fresh]
+        unresolved = redis_manager.get_ticker_failures(missing)
+        if unresolved:
+            logging.info(f"Skipping {len(unresolved)} tickers that recently failed to load")
+            missing = [ticker for ticker in missing if ticker not in unresolved]
+        if missing:
+            logging.info(f"Annual returns missing or stale for {len(missing)}/{len(tickers)} tickers")
+            fetched, _ = self.download_annual_returns(missing)
+            frames.append(fetched)
+        
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=RETURN_COLUMNS)
+        # Newly fetched rows replace stale ones
+        df = pd.concat(frames, ignore_index=True).drop_duplicates('Ticker', keep='last')
+        df = df.set_index('Ticker').reindex([t for t in tickers if t in set(df['Ticker'])])
+        return df.reset_index()[RETURN_COLUMNS]
+    
+    def _generate_fallback_data(self, ticker_lists, save=True):
         """Generate fallback mock data when Yahoo Finance fails"""
         logging.info("Creating fallback mock annual returns data...")
         results = []
@@ -242,42 +612,54 @@ class AnnualReturn:
             logging.info(f"Generated fallback data for {len(df)} stocks")
             
             # Save to Redis manager
-            redis_manager.save_annual_returns(df)
+            if save:
+                redis_manager.save_annual_returns(df)
             return df
         else:
             logging.error("No annual return data could be calculated")
             return pd.DataFrame()
     
-    def update_with_return_data(self,df):
-        helper.round_decimal_place(df,['insider_own','dividend','roi','roe'])
-        return_rate = self.get_annual_return_data()
+    def get_return_table(self, ticker_lists):
+        """Annual returns and return metrics of the tickers, typed and ready to join"""
+        tickers = [str(ticker) for ticker in ticker_lists]
+        return_rate = self.get_returns_for_tickers(tickers)
+        if return_rate.empty and tickers:
+            # Mock values keep the screens populated, but never enter the per-ticker cache
+            return_rate = self._generate_fallback_data(tickers, save=False)
+        # Tables cached before the rename still call the SPY beta "beta"
+        return_metrics = redis_manager.get_return_metrics().rename(columns={'beta': 'beta_spy'})
+        if not return_metrics.empty:
+            return_rate = pd.merge(return_rate, return_metrics, on='Ticker', how='left', validate=None)
+        return apply_schema(return_rate)
+
+    def update_with_return_data(self, df, return_table=None):
+        """Join annual returns and return metrics onto a stock frame and apply STOCK_SCHEMA
+        
+        Args:
+            df: stock frame with a Ticker column
+            return_table: result of get_return_table covering these tickers, to
+                share one lookup between several frames; looked up when omitted
+        """
+        if return_table is None:
+            return_table = self.get_return_table(df['Ticker'].astype(str).tolist())
+        df = apply_schema(df)
+        # Same categorical Ticker on both sides keeps the join and its result typed
+        return_rate = return_table.astype({'Ticker': df['Ticker'].dtype})
         df = pd.merge(df, return_rate, on='Ticker', how='inner', validate=None)
-        df = np.round(df, decimals=3)
-        df = df.drop_duplicates()
-        df  = df.replace(np.nan,0)
-        # Convert only string columns to strings, keep numeric columns as numbers
-        string_columns = ['Ticker', 'Sector', 'Index', 'Last_Updated', 'Earnings']
-        for col in df.columns:
-            if col in string_columns:
-                df[col] = df[col].astype(str)
-            else:
-                # Keep numeric columns as numbers
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        # Rows can only repeat when a ticker does
+        if not df['Ticker'].is_unique:
+            df = df.drop_duplicates()
         return df
 
     def get_risk_tolerance_data(self,risk_tolerance,df):
         logging.info(f"Applying risk tolerance filter: {risk_tolerance}")
         logging.info(f"Initial stock count: {len(df)}")
         
-        if risk_tolerance == RiskEnum.HIGH.value:
-            df = df[df['expected_annual_risk'].astype(float) > .6]
-            logging.info(f"High risk filter (>0.6): {len(df)} stocks")
-        elif risk_tolerance == RiskEnum.MEDIUM.value:
-            df = df[(df['expected_annual_risk'].astype(float) > .35) &(df['expected_annual_risk'].astype(float) < .65)]
-            logging.info(f"Medium risk filter (0.35-0.65): {len(df)} stocks")
-        elif risk_tolerance == RiskEnum.LOW.value:
-            df = df[(df['expected_annual_risk'].astype(float) > .1) &(df['expected_annual_risk'].astype(float) < .45)]
-            logging.info(f"Low risk filter (0.1-0.45): {len(df)} stocks")
+        if risk_tolerance in RISK_TOLERANCE_RANGES:
+            low, high = RISK_TOLERANCE_RANGES[risk_tolerance]
+            risk = df['expected_annual_risk'].astype(float)
+            df = df[(risk > low) & (risk < high)]
+            logging.info(f"{risk_tolerance} risk filter ({low}-{high}): {len(df)} stocks")
         
         if len(df) == 0:
             logging.warning(f"No stocks passed {risk_tolerance} risk filter. Showing all stocks.")
@@ -1,17 +1,34 @@
 import logging
 import json
+from datetime import datetime, timedelta
+
+import numpy as np
 import pandas as pd
 
 import enums.enum as enum
 from services.data_fetcher import fetch_stock_data_sync
+from services.sector_aggregates import sector_aggregates
 from services.strengthCalculator import StrengthCalculator
 from utilities.constant import SECTORS
 from utilities.redis_data import redis_manager
 from utilities.redis_tracker import redis_tracker
+from utilities.sector_history import SECTOR_HISTORY_FIELDS, lttb, min_max, sector_history
 
 strengthCalculator = StrengthCalculator()
 # Using new async data fetcher instead of sourceDataMapperService
 
+CHART_TOP_N = 5
+# Score column of every chart type
+CHART_SCORE_COLUMNS = {
+    enum.StockType.VALUE.value: 'value_score',
+    enum.StockType.GROWTH.value: 'growth_score',
+    enum.StockType.DIVIDEND.value: 'dividend_score',
+}
+# The chart document lives as long as the screener data it is computed from
+CHART_TTL = 7 * 24 * 60 * 60
+# Downsampling of time-series charts: LTTB keeps the shape, minmax every extreme
+CHART_HISTORY_MODES = ('lttb', 'minmax')
+
 
 class chart():
      # init method or constructor
@@ -20,278 +37,248 @@ class chart():
         self.sectors = SECTORS
  
     def get_chart_data(self, stock_type):
-        """Get chart data with caching to avoid multiple API calls"""
-        # Check cache first
-        cache_key = f"chart_data:{stock_type}:{self.index}"
-        cached_data = self._get_chart_from_cache(cache_key)
-        
-        if cached_data:
-            logging.info(f'Retrieved chart data from cache for {stock_type}')
-            redis_tracker.track_data_access(cache_key)
-            return cached_data
-        
-        # If not in cache, calculate and cache
-        logging.info(f'Calculating chart data for {stock_type} (not in cache)')
-        top_dict = self._calculate_chart_data(stock_type)
+        """Get the chart data of one stock type from the chart document"""
+        payload = self.get_chart_payload(stock_type)
+        if payload is None:
+            return self._calculate_chart_data(stock_type)
+        return json.loads(payload)['data']
+
+    def get_chart_payload(self, stock_type):
+        """Encoded JSON response body of one chart type, served as stored
         
-        # Cache the result
-        self._save_chart_to_cache(cache_key, top_dict)
+        The charts are materialized by the refresh pipeline; only a request
+        that finds no document, such as before the first refresh, computes
+        them.
         
-        return top_dict
-
-    def _get_chart_from_cache(self, cache_key):
-        """Get chart data from Redis cache"""
-        try:
-            cached_data = redis_manager.r.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
+        Returns:
+            JSON string {"data": [...], "version": ...}, or None for an
+            unknown stock type
+        """
+        if stock_type not in CHART_SCORE_COLUMNS:
             return None
-        except Exception as e:
-            logging.error(f"Error getting chart data from cache: {e}")
-            return None
-
-    def _save_chart_to_cache(self, cache_key, chart_data):
-        """Save chart data to Redis cache"""
-        try:
-            # Cache for 24 hours (86400 seconds)
-            redis_manager.r.setex(cache_key, 86400, json.dumps(chart_data))
-            from utilities.redis_tracker import DataType, APISource
-            redis_tracker.track_data_save(
-                cache_key, 
-                DataType.CHART_DATA, 
-                APISource.CHART_SERVICE,
-                index=self.index,
-                record_count=len(chart_data),
-                ttl_seconds=86400
-            )
-            logging.info(f'Cached chart data with key: {cache_key}')
-        except Exception as e:
-            logging.error(f"Error saving chart data to cache: {e}")
+        payload = redis_manager.get_chart_payload(self.index, stock_type)
+        if payload is not None:
+            redis_tracker.track_data_access(self._get_document_key())
+            return payload
+        
+        logging.info(f'Chart document for {self.index} not found, materializing charts')
+        return self.materialize().get(stock_type)
 
-    def _calculate_chart_data(self, stock_type):
-        """Calculate chart data for all sectors using individual API calls with caching"""
-        top_dict = []
+    def materialize(self, fetch_missing=True):
+        """Compute every chart type and publish them as one versioned document
         
-        # Process each sector individually (but with caching)
-        for sector in self.sectors:
+        Each chart type is stored already encoded, so serving it needs no
+        serialization.
+        
+        Args:
+            fetch_missing: fetch the sectors missing from the cache; the
+                refresh pipeline passes False and charts what is cached
+        
+        Returns:
+            dict mapping each stock type to its encoded payload, also when the
+            document could not be saved
+        """
+        charts = self.calculate_all_chart_data(fetch_missing=fetch_missing)
+        self._record_history(charts)
+        version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        payloads = {stock_type: json.dumps({'data': top_dict, 'version': version})
+                    for stock_type, top_dict in charts.items()}
+        if redis_manager.save_chart_document(self.index, payloads, version, CHART_TTL):
             try:
-                values, labels = self._get_sector_data(stock_type, sector)
-                top_dict.append({"id": sector, "values": values, "labels": labels, "title": sector})
+                from utilities.redis_tracker import DataType, APISource
+                redis_tracker.track_data_save(
+                    self._get_document_key(),
+                    DataType.CHART_DATA,
+                    APISource.CHART_SERVICE,
+                    index=self.index,
+                    record_count=len(payloads),
+                    size_bytes=sum(len(payload) for payload in payloads.values()),
+                    ttl_seconds=CHART_TTL
+                )
             except Exception as e:
-                logging.error(f"Error processing sector {sector}: {e}")
-                top_dict.append({"id": sector, "values": [], "labels": [], "title": sector})
-        
-        logging.info(f'Calculated chart data for {len(top_dict)} sectors')
-        return top_dict
-
+                logging.warning(f"Failed to track chart data save: {e}")
+            logging.info(f'Published chart document {version} for {self.index}')
+        return payloads
 
-
-    def _calculate_value_metrics(self, df):
-        """Calculate value stock metrics using industry-standard ratios"""
+    def _record_history(self, charts, date=None):
+        """Time-series stage: append the day's sector averages and mean top scores to the history store"""
+        rows = {}
+        for stock_type, sector_charts in charts.items():
+            column = CHART_SCORE_COLUMNS[stock_type]
+            for sector_chart in sector_charts:
+                row = rows.setdefault(sector_chart['id'], dict(sector_chart['averages']))
+                if sector_chart['values']:
+                    row[column] = float(np.mean(sector_chart['values']))
+        if not rows:
+            return
         try:
-            if not df.empty and self._has_required_columns(df, ["Ticker", "pe", "pb", "dividend"]):
-                # Calculate Value Score using industry-standard metrics
-                # Lower P/E and P/B ratios are better for value stocks
-                df['pe_numeric'] = pd.to_numeric(df['pe'], errors='coerce').fillna(50)
-                df['pb_numeric'] = pd.to_numeric(df['pb'], errors='coerce').fillna(10)
-                df['dividend_numeric'] = pd.to_numeric(df['dividend'], errors='coerce').fillna(0)
-                
-                # Value Score using industry-standard metrics (0-100 scale)
-                # Components: P/E ratio (40%), P/B ratio (30%), Dividend Yield (30%)
-                # Lower P/E and P/B ratios are better for value stocks
-                pe_score = (1 / df['pe_numeric'].clip(lower=1)) * 40
-                pb_score = (1 / df['pb_numeric'].clip(lower=0.1)) * 30
-                dividend_score = (df['dividend_numeric'] * 100) * 30
-                
-                df['value_score'] = (pe_score + pb_score + dividend_score).round(1)
-                
-                # Sort by value score (higher is better)
-                value_data = df.nlargest(5, 'value_score')
-                return self._extract_lists(value_data["value_score"], value_data["Ticker"])
-            else:
-                logging.warning(f"Missing required columns for value metrics")
-                return [], []
+            sector_history.append(self.index, pd.DataFrame.from_dict(rows, orient='index'), date)
         except Exception as e:
-            logging.error(f"Error calculating value metrics: {e}")
-            return [], []
+            logging.warning(f"Failed to record sector history for {self.index}: {e}")
 
-    def _calculate_growth_metrics(self, df):
-        """Calculate growth stock metrics using industry-standard ratios"""
-        try:
-            if not df.empty and self._has_required_columns(df, ["Ticker", "pe", "fpe"]):
-                # Calculate Growth Score using industry-standard metrics
-                df['pe_numeric'] = pd.to_numeric(df['pe'], errors='coerce').fillna(50)
-                df['fpe_numeric'] = pd.to_numeric(df['fpe'], errors='coerce').fillna(50)
-                
-                # Handle PEG ratio if available
-                if 'peg' in df.columns:
-                    df['peg_numeric'] = pd.to_numeric(df['peg'], errors='coerce').fillna(5)
-                    peg_component = (1 / df['peg_numeric'].clip(lower=0.1)) * 30
-                else:
-                    peg_component = 0
-                
-                # Handle Sales Growth if available
-                if 'Sales Past 5Y' in df.columns:
-                    df['sales_growth'] = df['Sales Past 5Y'].astype(str).str.replace('%', '').str.replace('-', '0')
-                    df['sales_growth_numeric'] = pd.to_numeric(df['sales_growth'], errors='coerce').fillna(0) / 100
-                    sales_component = (df['sales_growth_numeric'].clip(upper=1)) * 40
-                else:
-                    sales_component = 0
-                
-                # Growth Score using industry-standard metrics (0-100 scale)
-                # Components: Sales Growth (40%), PEG ratio (30%), Forward P/E (30%)
-                # Higher sales growth and lower PEG/FPE ratios are better for growth stocks
-                fpe_score = (1 / df['fpe_numeric'].clip(lower=1)) * 30
-                
-                df['growth_score'] = (sales_component + peg_component + fpe_score).round(1)
-                
-                # Sort by growth score (higher is better)
-                growth_data = df.nlargest(5, 'growth_score')
-                return self._extract_lists(growth_data["growth_score"], growth_data["Ticker"])
+    def get_history(self, stock_type, days=90, width=300, mode='lttb', metric=None):
+        """Time series of one metric per sector, downsampled to a pixel width
+        
+        Args:
+            stock_type: chart type; its top-stock score is the default metric
+            days: length of the window ending today
+            width: maximum points per series, one per pixel
+            mode: 'lttb' or 'minmax' (the low and high of width / 2 buckets)
+            metric: any of SECTOR_HISTORY_FIELDS instead of the chart score
+        
+        Returns:
+            dict {"data": [{"id", "title", "dates", "values"}], "metric", "days",
+            "width", "mode"}, or None for an unknown stock type
+        
+        Raises:
+            ValueError: on an unknown metric or mode, or a non-positive days or width
+        """
+        if stock_type not in CHART_SCORE_COLUMNS:
+            return None
+        metric = metric or CHART_SCORE_COLUMNS[stock_type]
+        if metric not in SECTOR_HISTORY_FIELDS:
+            raise ValueError(f"Unknown history metric {metric}")
+        if mode not in CHART_HISTORY_MODES:
+            raise ValueError(f"Unknown downsampling mode {mode}")
+        if days < 1 or width < 1:
+            raise ValueError("days and width must be positive")
+        
+        start = datetime.now() - timedelta(days=days - 1)
+        series = []
+        for sector in self.sectors:
+            values = sector_history.read(self.index, sector, start=start)[metric].dropna()
+            y = values.to_numpy()
+            if mode == 'lttb':
+                x = values.index.to_numpy().astype('datetime64[D]').astype(np.float64)
+                kept = lttb(x, y, width)
             else:
-                logging.warning(f"Missing required columns for growth metrics")
-                return [], []
-        except Exception as e:
-            logging.error(f"Error calculating growth metrics: {e}")
-            return [], []
+                kept = min_max(y, max(width // 2, 1))
+            series.append({
+                "id": sector,
+                "title": sector,
+                "dates": values.index[kept].strftime('%Y-%m-%d').tolist(),
+                "values": y[kept].tolist(),
+            })
+        return {"data": series, "metric": metric, "days": days, "width": width, "mode": mode}
 
-    def _calculate_dividend_data(self, df):
-        """Calculate dividend-based chart data"""
-        try:
-            if not df.empty and self._has_required_columns(df, ["Ticker", "dividend"]):
-                dividend_data = df.sort_values(by="dividend", ascending=False).head(5)
-                # Convert dividend values to percentages for better display
-                dividend_percentages = dividend_data["dividend"].astype(float) * 100
-                return self._extract_lists(dividend_percentages, dividend_data["Ticker"])
-            else:
-                logging.warning(f"Missing required columns in dividend data")
-                return [], []
-        except Exception as e:
-            logging.error(f"Error in dividend calculation: {e}")
-            return [], []
+    def _get_document_key(self):
+        return f"chart_data:{self.index}"
 
-    def _get_sector_data(self, stock_type, sector):
-        """Get chart data for a specific sector and stock type (legacy method - kept for compatibility)"""
-        if stock_type == enum.StockType.VALUE.value:
-            return self._get_value_metrics(sector)
-        elif stock_type == enum.StockType.GROWTH.value:
-            return self._get_growth_metrics(sector)
-        elif stock_type == enum.StockType.DIVIDEND.value:
-            return self._get_dividend_data(sector)
-        else:
-            return [], []
+    def _calculate_chart_data(self, stock_type):
+        """Calculate chart data of one stock type for all sectors"""
+        return self.calculate_all_chart_data([stock_type])[stock_type]
 
-    def _get_value_metrics(self, sector):
-        """Get value stock metrics using industry-standard ratios (legacy method)"""
-        try:
-            result = fetch_stock_data_sync(index=self.index, sector=sector)
-            if result.success and not result.data.empty:
-                df = result.data
-                if self._has_required_columns(df, ["Ticker", "pe", "pb", "dividend"]):
-                    # Calculate Value Score using industry-standard metrics
-                    # Lower P/E and P/B ratios are better for value stocks
-                    df['pe_numeric'] = pd.to_numeric(df['pe'], errors='coerce').fillna(50)
-                    df['pb_numeric'] = pd.to_numeric(df['pb'], errors='coerce').fillna(10)
-                    df['dividend_numeric'] = pd.to_numeric(df['dividend'], errors='coerce').fillna(0)
-                    
-                    # Value Score using industry-standard metrics (0-100 scale)
-                    # Components: P/E ratio (40%), P/B ratio (30%), Dividend Yield (30%)
-                    # Lower P/E and P/B ratios are better for value stocks
-                    pe_score = (1 / df['pe_numeric'].clip(lower=1)) * 40
-                    pb_score = (1 / df['pb_numeric'].clip(lower=0.1)) * 30
-                    dividend_score = (df['dividend_numeric'] * 100) * 30
-                    
-                    df['value_score'] = (pe_score + pb_score + dividend_score).round(1)
-                    
-                    # Sort by value score (higher is better)
-                    value_data = df.nlargest(5, 'value_score')
-                    return self._extract_lists(value_data["value_score"], value_data["Ticker"])
-                else:
-                    logging.warning(f"Missing required columns for value metrics in {sector}")
-                    return [], []
+    def calculate_all_chart_data(self, stock_types=tuple(CHART_SCORE_COLUMNS), fetch_missing=True):
+        """Calculate the chart data of several stock types in one pass
+        
+        Every sector of the index is loaded with one Redis read, all rows are
+        scored at once and the top stocks of every sector come from one
+        groupby per chart type.
+        
+        Args:
+            stock_types: chart types to calculate
+            fetch_missing: fetch the sectors missing from the cache
+        
+        Returns:
+            dict mapping each stock type to its list of sector charts
+        """
+        df = self._load_index_data(fetch_missing)
+        scores = self._calculate_scores(df)
+        averages = {sector: sector_aggregates.get_group(self.index, sector).get("mean", {}) for sector in self.sectors}
+        
+        charts = {}
+        for stock_type in stock_types:
+            column = CHART_SCORE_COLUMNS.get(stock_type)
+            top = {}
+            if column is None:
+                logging.warning(f"Unknown chart type {stock_type}")
+            elif column in scores.columns:
+                best = scores.groupby('Sector', observed=True)[column].nlargest(CHART_TOP_N)
+                labels = scores['Ticker'].loc[best.index.get_level_values(-1)].tolist()
+                for (sector, _), value, label in zip(best.index, best.tolist(), labels):
+                    values_labels = top.setdefault(sector, ([], []))
+                    values_labels[0].append(value)
+                    values_labels[1].append(label)
             else:
-                logging.warning(f"No data available for value metrics in {sector}")
-                return [], []
-        except Exception as e:
-            logging.error(f"Error calculating value metrics for {sector}: {e}")
-            return [], []
+                logging.warning(f"Missing required columns for {stock_type} chart data")
+            charts[stock_type] = [
+                {"id": sector, "values": top.get(sector, ([], []))[0], "labels": top.get(sector, ([], []))[1],
+                 "title": sector, "averages": averages[sector]}
+                for sector in self.sectors
+            ]
+        
+        logging.info(f'Calculated {len(charts)} chart types for {len(self.sectors)} sectors from {len(df)} stocks')
+        return charts
 
-    def _get_growth_metrics(self, sector):
-        """Get growth stock metrics using industry-standard ratios (legacy method)"""
-        try:
-            result = fetch_stock_data_sync(index=self.index, sector=sector)
-            if result.success and not result.data.empty:
-                df = result.data
-                if self._has_required_columns(df, ["Ticker", "pe", "fpe"]):
-                    # Calculate Growth Score using industry-standard metrics
-                    df['pe_numeric'] = pd.to_numeric(df['pe'], errors='coerce').fillna(50)
-                    df['fpe_numeric'] = pd.to_numeric(df['fpe'], errors='coerce').fillna(50)
-                    
-                    # Handle PEG ratio if available
-                    if 'peg' in df.columns:
-                        df['peg_numeric'] = pd.to_numeric(df['peg'], errors='coerce').fillna(5)
-                        peg_component = (1 / df['peg_numeric'].clip(lower=0.1)) * 30
-                    else:
-                        peg_component = 0
-                    
-                    # Handle Sales Growth if available
-                    if 'Sales Past 5Y' in df.columns:
-                        df['sales_growth'] = df['Sales Past 5Y'].astype(str).str.replace('%', '').str.replace('-', '0')
-                        df['sales_growth_numeric'] = pd.to_numeric(df['sales_growth'], errors='coerce').fillna(0) / 100
-                        sales_component = (df['sales_growth_numeric'].clip(upper=1)) * 40
-                    else:
-                        sales_component = 0
-                    
-                    # Growth Score using industry-standard metrics (0-100 scale)
-                    # Components: Sales Growth (40%), PEG ratio (30%), Forward P/E (30%)
-                    # Higher sales growth and lower PEG/FPE ratios are better for growth stocks
-                    fpe_score = (1 / df['fpe_numeric'].clip(lower=1)) * 30
-                    
-                    df['growth_score'] = (sales_component + peg_component + fpe_score).round(1)
-                    
-                    # Sort by growth score (higher is better)
-                    growth_data = df.nlargest(5, 'growth_score')
-                    return self._extract_lists(growth_data["growth_score"], growth_data["Ticker"])
+    def _load_index_data(self, fetch_missing=True):
+        """Stock data of every sector of the index as one frame with a Sector column
+        
+        Sectors missing from the cache are fetched one by one, or left out
+        when fetch_missing is False.
+        """
+        df = redis_manager.get_stock_data_sectors(self.index, self.sectors)
+        frames = [df] if not df.empty else []
+        loaded = set(df['Sector']) if not df.empty else set()
+        for sector in self.sectors:
+            if sector in loaded:
+                continue
+            if not fetch_missing:
+                logging.info(f"No cached chart data for {self.index}:{sector}")
+                continue
+            try:
+                result = fetch_stock_data_sync(index=self.index, sector=sector)
+                if result.success and not result.data.empty:
+                    frames.append(result.data.assign(Sector=sector))
                 else:
-                    logging.warning(f"Missing required columns for growth metrics in {sector}")
-                    return [], []
-            else:
-                logging.warning(f"No data available for growth metrics in {sector}")
-                return [], []
-        except Exception as e:
-            logging.error(f"Error calculating growth metrics for {sector}: {e}")
-            return [], []
+                    logging.warning(f"No data available for chart data in {sector}")
+            except Exception as e:
+                logging.error(f"Error loading chart data for {sector}: {e}")
+        if not frames:
+            return pd.DataFrame(columns=['Ticker', 'Sector'])
+        return pd.concat(frames, ignore_index=True)
 
-    def _get_dividend_data(self, sector):
-        """Get dividend-based chart data (legacy method)"""
-        try:
-            result = fetch_stock_data_sync(index=self.index, sector=sector)
-            if result.success and not result.data.empty:
-                dividend_data = result.data.sort_values(by="dividend", ascending=False).head(5)
-                if self._has_required_columns(dividend_data, ["Ticker", "dividend"]):
-                    # Convert dividend values to percentages for better display
-                    dividend_percentages = dividend_data["dividend"].astype(float) * 100
-                    return self._extract_lists(dividend_percentages, dividend_data["Ticker"])
-                else:
-                    logging.warning(f"Missing required columns in dividend data for {sector}")
-                    return [], []
+    def _calculate_scores(self, df):
+        """Value, growth and dividend scores of every row, where the columns allow"""
+        scores = pd.DataFrame({'Sector': df['Sector'], 'Ticker': df['Ticker']}, index=df.index)
+        
+        def numeric(col, fill):
+            return pd.to_numeric(df[col], errors='coerce').fillna(fill)
+        
+        if self._has_required_columns(df, ["Ticker", "pe", "pb", "dividend"]):
+            # Components: P/E ratio (40%), P/B ratio (30%), Dividend Yield (30%)
+            pe_score = (1 / numeric('pe', 50).clip(lower=1)) * 40
+            pb_score = (1 / numeric('pb', 10).clip(lower=0.1)) * 30
+            dividend_score = (numeric('dividend', 0) * 100) * 30
+            scores['value_score'] = (pe_score + pb_score + dividend_score).round(1)
+        
+        if self._has_required_columns(df, ["Ticker", "pe", "fpe"]):
+            # Components: Sales Growth (40%), PEG ratio (30%), Forward P/E (30%)
+            peg_component = (1 / numeric('peg', 5).clip(lower=0.1)) * 30 if 'peg' in df.columns else 0
+            if 'Sales Past 5Y' in df.columns:
+                sales_growth = df['Sales Past 5Y'].astype(str).str.replace('%', '').str.replace('-', '0')
+                sales_component = (pd.to_numeric(sales_growth, errors='coerce').fillna(0) / 100).clip(upper=1) * 40
             else:
-                logging.warning(f"No dividend data available for {sector}")
-                return [], []
-        except Exception as e:
-            logging.error(f"Error in dividend calculation for {sector}: {e}")
-            return [], []
+                sales_component = 0
+            fpe_score = (1 / numeric('fpe', 50).clip(lower=1)) * 30
+            scores['growth_score'] = (sales_component + peg_component + fpe_score).round(1)
+        
+        if self._has_required_columns(df, ["Ticker", "dividend"]):
+            # Dividend yield as a percentage for better display
+            scores['dividend_score'] = pd.to_numeric(df['dividend'], errors='coerce') * 100
+        
+        return scores
 
     def _has_required_columns(self, df, required_columns):
         """Check if DataFrame has required columns"""
         return not df.empty and all(col in df.columns for col in required_columns)
 
-    def _extract_lists(self, values_series, labels_series):
-        """Extract values and labels as lists"""
-        values = values_series.tolist() if hasattr(values_series, 'tolist') else []
-        labels = labels_series.tolist() if hasattr(labels_series, 'tolist') else []
-        return values, labels
-    
-    
 
+def materialize_charts(index='S&P 500'):
+    """Refresh pipeline stage: publish the chart document of an index once its stock data landed
     
+    Charts only what is cached; a sector that has not landed yet is never
+    fetched from here.
+    """
+    service = chart()
+    service.index = index
+    return service.materialize(fetch_missing=False)
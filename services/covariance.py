@@ -0,0 +1,240 @@
+"""
+Covariance Engine
+Estimates the covariance of daily returns of the whole universe from the local
+price history once per refresh and serves any ticker subset as a slice of it
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.annualReturn import RISK_WINDOW, fill_and_daily_returns
+from utilities.price_store import price_store
+from utilities.redis_data import redis_manager
+
+try:
+    from sklearn.covariance import LedoitWolf
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COVARIANCE_METHODS = ('sample', 'ledoit_wolf', 'ewma')
+# Estimator of the precomputed covariance
+COVARIANCE_METHOD = os.getenv('COVARIANCE_METHOD', 'ledoit_wolf')
+# Trading days of returns behind every estimate
+COVARIANCE_WINDOW = int(os.getenv('COVARIANCE_WINDOW', RISK_WINDOW))
+# Half-life in trading days of the exponentially weighted estimate
+COVARIANCE_HALFLIFE = float(os.getenv('COVARIANCE_HALFLIFE', 63))
+# Tickers with fewer daily returns in the window are left out of the universe
+COVARIANCE_MIN_OBSERVATIONS = int(os.getenv('COVARIANCE_MIN_OBSERVATIONS', 60))
+# Seconds a reader trusts the loaded matrix before asking Redis for the current version
+COVARIANCE_CHECK_SECONDS = float(os.getenv('COVARIANCE_CHECK_SECONDS', 5))
+COVARIANCE_TTL = 7 * 24 * 60 * 60
+TRADING_DAYS = 252
+
+
+def is_psd(matrix: np.ndarray, tolerance: float = 1e-10) -> bool:
+    """True when the symmetric matrix has no eigenvalue below -tolerance times its largest"""
+    if matrix.size == 0:
+        return True
+    eigenvalues = np.linalg.eigvalsh(matrix)
+    return eigenvalues[0] >= -tolerance * max(abs(eigenvalues[-1]), 1.0)
+
+
+def repair_psd(matrix: np.ndarray, floor: float = 1e-10) -> np.ndarray:
+    """Nearest positive semi-definite matrix with the same variances
+
+    Negative eigenvalues are raised to floor times the mean variance and the
+    result is rescaled so its diagonal matches the input again.
+    """
+    matrix = (matrix + matrix.T) / 2
+    if is_psd(matrix):
+        return matrix
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    eigenvalues = np.maximum(eigenvalues, floor * max(np.mean(np.diag(matrix)), floor))
+    repaired = (eigenvectors * eigenvalues) @ eigenvectors.T
+    scale = np.sqrt(np.clip(np.diag(matrix), 0, None) / np.diag(repaired))
+    repaired = repaired * np.outer(scale, scale)
+    return (repaired + repaired.T) / 2
+
+
+def sample_covariance(returns: np.ndarray) -> np.ndarray:
+    """Unbiased covariance of a days x tickers return matrix"""
+    centered = returns - returns.mean(axis=0)
+    return centered.T @ centered / max(len(returns) - 1, 1)
+
+
+def ledoit_wolf_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Ledoit-Wolf shrinkage towards a scaled identity
+
+    Returns:
+        (covariance, shrinkage intensity in [0, 1])
+    """
+    centered = returns - returns.mean(axis=0)
+    if SKLEARN_AVAILABLE:
+        estimator = LedoitWolf(assume_centered=True).fit(centered)
+        return estimator.covariance_, float(estimator.shrinkage_)
+
+    samples, features = centered.shape
+    empirical = centered.T @ centered / samples
+    mu = np.trace(empirical) / features
+    squared = centered ** 2
+    delta_sum = np.sum(empirical ** 2)
+    beta = (np.sum(squared.T @ squared) / samples - delta_sum) / (features * samples)
+    delta = (delta_sum - 2 * mu * np.trace(empirical) + features * mu ** 2) / features
+    shrinkage = 0.0 if delta == 0 else float(min(beta, delta) / delta)
+    covariance = (1 - shrinkage) * empirical
+    covariance.flat[::features + 1] += shrinkage * mu
+    return covariance, shrinkage
+
+
+def ewma_covariance(returns: np.ndarray, halflife: float = COVARIANCE_HALFLIFE) -> np.ndarray:
+    """Exponentially weighted covariance; a day halflife days older counts half"""
+    weights = 0.5 ** (np.arange(len(returns))[::-1] / halflife)
+    weights /= weights.sum()
+    centered = returns - weights @ returns
+    return (centered * weights[:, None]).T @ centered / (1 - np.sum(weights ** 2))
+
+
+class CovarianceEngine:
+    """Annualized covariance of daily returns for the whole universe
+
+    refresh() estimates one matrix over every ticker of the price store and
+    publishes it with a version, like the sector aggregates. Readers slice the
+    rows and columns of the tickers they need, so a request for k tickers costs
+    O(k^2) and never touches the price history. The published version is
+    checked at most once every check_seconds.
+    """
+
+    def __init__(self, method: str = COVARIANCE_METHOD, window: int = COVARIANCE_WINDOW,
+                 halflife: float = COVARIANCE_HALFLIFE, min_observations: int = COVARIANCE_MIN_OBSERVATIONS,
+                 check_seconds: float = COVARIANCE_CHECK_SECONDS):
+        if method not in COVARIANCE_METHODS:
+            raise ValueError(f"Unknown covariance method {method}, expected one of {COVARIANCE_METHODS}")
+        self.method = method
+        self.window = window
+        self.halflife = halflife
+        self.min_observations = min_observations
+        self.check_seconds = check_seconds
+        self._version = None
+        self._checked_at = None
+        # (position of every ticker, matrix), swapped as one so readers never mix versions
+        self._state: Tuple[Dict[str, int], np.ndarray] = ({}, np.empty((0, 0)))
+        self._lock = threading.Lock()
+
+    def daily_returns(self, closes: pd.DataFrame) -> pd.DataFrame:
+        """Last window daily returns of the tickers with enough of them
+
+        A day a ticker did not trade counts as its mean return, which keeps the
+        estimate positive semi-definite for ragged histories.
+        """
+        prices = closes.to_numpy(dtype=float)
+        if prices.size == 0:
+            return pd.DataFrame()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _, returns = fill_and_daily_returns(prices, ~np.isnan(prices))
+        returns = returns[1:][-self.window:]
+        observed = ~np.isnan(returns)
+        keep = observed.sum(axis=0) >= self.min_observations
+        returns = returns[:, keep]
+        mean = np.nanmean(returns, axis=0) if returns.size else np.zeros(returns.shape[1])
+        returns = np.where(np.isnan(returns), mean, returns)
+        return pd.DataFrame(returns, index=closes.index[1:][-self.window:], columns=closes.columns[keep])
+
+    def estimate(self, closes: pd.DataFrame, method: Optional[str] = None) -> pd.DataFrame:
+        """Annualized covariance of the daily returns of a dates x tickers close matrix
+
+        Args:
+            closes: adjusted closes, one column per ticker
+            method: one of COVARIANCE_METHODS, the engine's method by default
+
+        Returns:
+            tickers x tickers DataFrame, positive semi-definite
+        """
+        method = method or self.method
+        if method not in COVARIANCE_METHODS:
+            raise ValueError(f"Unknown covariance method {method}, expected one of {COVARIANCE_METHODS}")
+        returns = self.daily_returns(closes)
+        if returns.shape[1] == 0:
+            return pd.DataFrame()
+
+        values = returns.to_numpy()
+        if method == 'sample':
+            covariance = sample_covariance(values)
+        elif method == 'ledoit_wolf':
+            covariance, shrinkage = ledoit_wolf_covariance(values)
+            logger.debug(f"Ledoit-Wolf shrinkage {shrinkage:.3f} for {values.shape[1]} tickers")
+        else:
+            covariance = ewma_covariance(values, self.halflife)
+        covariance = repair_psd(covariance * TRADING_DAYS)
+        return pd.DataFrame(covariance, index=returns.columns, columns=returns.columns)
+
+    def refresh(self, tickers: Optional[Iterable[str]] = None, end=None) -> Optional[str]:
+        """Estimate the universe covariance from the price store and publish a new version
+
+        Args:
+            tickers: universe, every ticker with stored history by default
+            end: last day of the window, today by default
+
+        Returns:
+            the published version, or the current one when there was no history
+        """
+        end = pd.Timestamp(end or datetime.now())
+        # Calendar days covering the trading-day window with room for holidays
+        start = end - timedelta(days=int(self.window * 365 / TRADING_DAYS) + 10)
+        universe = list(dict.fromkeys(tickers)) if tickers is not None else price_store.tickers()
+        closes = price_store.read(universe, start=start, end=end, field='close', adjusted=True)
+        covariance = self.estimate(closes)
+        if covariance.empty:
+            logger.warning("No price history for the covariance universe")
+            return self._version
+
+        version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        matrix = covariance.to_numpy()
+        with self._lock:
+            redis_manager.save_covariance(self.method, covariance.columns.tolist(), matrix, version, COVARIANCE_TTL)
+            self._publish(covariance.columns.tolist(), matrix, version)
+        logger.info(f"Published {self.method} covariance {version} of {len(matrix)} tickers")
+        return version
+
+    def _publish(self, tickers: List[str], matrix: np.ndarray, version: str):
+        self._state = ({ticker: i for i, ticker in enumerate(tickers)}, matrix)
+        self._version = version
+        self._checked_at = time.monotonic()
+
+    def _current(self):
+        """Load the published matrix when its version changed"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+        version = redis_manager.get_covariance_version(self.method)
+        if version and version != self._version:
+            loaded = redis_manager.get_covariance(self.method)
+            if loaded is not None:
+                with self._lock:
+                    self._publish(*loaded)
+
+    def covariance(self, tickers: Iterable[str]) -> pd.DataFrame:
+        """Covariance of the requested tickers that are in the universe, in request order"""
+        self._current()
+        position, matrix = self._state
+        tickers = [ticker for ticker in dict.fromkeys(tickers) if ticker in position]
+        rows = [position[ticker] for ticker in tickers]
+        return pd.DataFrame(matrix[np.ix_(rows, rows)], index=tickers, columns=tickers)
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+
+# Global instance
+covariance_engine = CovarianceEngine()
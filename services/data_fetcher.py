@@ -5,6 +5,7 @@ Handles multiple data sources with fallbacks, async processing, and robust error
 
 import asyncio
 import logging
+import os
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
@@ -19,13 +20,18 @@ from finvizfinance.screener.valuation import Valuation
 from finvizfinance.screener.technical import Technical
 from finvizfinance.screener.ownership import Ownership
 from finvizfinance.screener.performance import Performance
+from finvizfinance.util import session_manager
 from utilities.redis_data import redis_manager
 from utilities.constant import SECTORS, INDEX, METRIC_COLUMNS, METRIC_SCHEMA
+from utilities.schema import apply_schema
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between two finviz requests of the sync screener fetch
+FINVIZ_REQUEST_INTERVAL = float(os.getenv('FINVIZ_REQUEST_INTERVAL', 0.5))
+
 class DataSource(Enum):
     FINVIZ = "finviz"
     YAHOO_FINANCE = "yahoo"
@@ -145,32 +151,12 @@ class DataFetcher:
     async def _fetch_from_finviz(self, index: str, sector: str) -> DataFetchResult:
         """Fetch data from Finviz with improved error handling"""
         try:
-            all_data = []
+            batches = []
+            async for batch in self._iter_finviz_batches(index, sector):
+                if not batch.empty:
+                    batches.append(batch)
             
-            for service_name, service in self.finviz_services.items():
-                try:
-                    await self.rate_limiter.wait()
-                    
-                    # Set filters
-                    filters = {}
-                    if sector != 'Any':
-                        filters["Sector"] = sector
-                    if index != 'Any':
-                        filters["Index"] = index
-                    
-                    if filters:
-                        service.set_filter(filters_dict=filters)
-                    
-                    data = service.screener_view()
-                    if data is not None and not data.empty:
-                        all_data.append(data)
-                        logger.debug(f"Successfully fetched {service_name} data")
-                    
-                except Exception as e:
-                    logger.warning(f"Error fetching {service_name} data: {e}")
-                    continue
-            
-            if not all_data:
+            if not batches:
                 return DataFetchResult(
                     success=False,
                     data=pd.DataFrame(),
@@ -178,13 +164,9 @@ class DataFetcher:
                     error="No data returned from Finviz"
                 )
             
-            # Combine and clean data
-            combined_data = pd.concat(all_data, axis=1)
-            cleaned_data = self._clean_and_validate_data(combined_data, index, sector)
-            
             return DataFetchResult(
                 success=True,
-                data=cleaned_data,
+                data=_combine_batches(batches),
                 source=DataSource.FINVIZ
             )
             
@@ -197,6 +179,34 @@ class DataFetcher:
                 error=str(e)
             )
     
+    async def _iter_finviz_batches(self, index: str, sector: str):
+        """Yield cleaned data one screener page at a time
+        
+        Page i of every view holds the same tickers, so the views of a page are
+        joined side by side and cleaned before the next page is requested.
+        """
+        filters = _finviz_filters(index, sector)
+        pages = {}
+        for service_name, service in self.finviz_services.items():
+            if filters:
+                service.set_filter(filters_dict=filters)
+            pages[service_name] = service.screener_view_async(sleep_sec=0)
+        
+        while pages:
+            views = []
+            for service_name in list(pages):
+                try:
+                    await self.rate_limiter.wait()
+                    views.append(await pages[service_name].__anext__())
+                except StopAsyncIteration:
+                    del pages[service_name]
+                except Exception as e:
+                    logger.warning(f"Error fetching {service_name} data: {e}")
+                    del pages[service_name]
+            if not views:
+                return
+            yield self._clean_and_validate_data(pd.concat(views, axis=1), index, sector)
+    
     async def _fetch_from_yahoo(self, index: str, sector: str) -> DataFetchResult:
         """Fetch data from Yahoo Finance as fallback"""
         try:
@@ -298,14 +308,8 @@ class DataFetcher:
             # Map to schema first
             df = self._map_to_schema(df)
             
-            # Convert only string columns to strings, keep numeric columns as numbers
-            string_columns = ['Ticker', 'Sector', 'Index', 'Last_Updated', 'Earnings']
-            for col in df.columns:
-                if col in string_columns:
-                    df[col] = df[col].astype(str)
-                else:
-                    # Keep numeric columns as numbers
-                    df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            # Cast every column according to the stock frame schema
+            df = apply_schema(df)
             
             return df
             
@@ -747,47 +751,9 @@ def fetch_stock_data_sync(index: str, sector: str = 'Any') -> DataFetchResult:
 def _fetch_from_finviz_sync(index: str, sector: str) -> DataFetchResult:
     """Synchronous Finviz fetch"""
     try:
-        from finvizfinance.screener.financial import Financial
-        from finvizfinance.screener.valuation import Valuation
-        from finvizfinance.screener.technical import Technical
-        from finvizfinance.screener.ownership import Ownership
-        from finvizfinance.screener.performance import Performance
-        
-        services = {
-            'valuation': Valuation(),
-            'financial': Financial(),
-            'technical': Technical(),
-            'ownership': Ownership(),
-            'performance': Performance()
-        }
+        batches = [batch for batch in iter_finviz_batches(index, sector) if not batch.empty]
         
-        all_data = []
-        
-        for service_name, service in services.items():
-            try:
-                # Set filters
-                filters = {}
-                if sector != 'Any':
-                    filters["Sector"] = sector
-                if index != 'Any':
-                    filters["Index"] = index
-                
-                if filters:
-                    service.set_filter(filters_dict=filters)
-                
-                data = service.screener_view()
-                if data is not None and not data.empty:
-                    all_data.append(data)
-                    logger.debug(f"Successfully fetched {service_name} data")
-                
-                # Add small delay to respect rate limits
-                time.sleep(0.5)
-                
-            except Exception as e:
-                logger.warning(f"Error fetching {service_name} data: {e}")
-                continue
-        
-        if not all_data:
+        if not batches:
             return DataFetchResult(
                 success=False,
                 data=pd.DataFrame(),
@@ -795,13 +761,9 @@ def _fetch_from_finviz_sync(index: str, sector: str) -> DataFetchResult:
                 error="No data returned from Finviz"
             )
         
-        # Combine and clean data
-        combined_data = pd.concat(all_data, axis=1)
-        cleaned_data = _clean_and_validate_data_sync(combined_data, index, sector)
-        
         return DataFetchResult(
             success=True,
-            data=cleaned_data,
+            data=_combine_batches(batches),
             source=DataSource.FINVIZ
         )
         
@@ -814,6 +776,74 @@ def _fetch_from_finviz_sync(index: str, sector: str) -> DataFetchResult:
             error=str(e)
         )
 
+def iter_finviz_batches(index: str, sector: str):
+    """Yield cleaned, schema-mapped stock data one screener page at a time
+    
+    Only the current page of each view is held in memory, so callers that
+    process batches as they arrive stay bounded for very large screens.
+    Requests are spaced by the finviz session manager, at least
+    FINVIZ_REQUEST_INTERVAL apart, while the previous response is parsed.
+    """
+    from finvizfinance.screener.financial import Financial
+    from finvizfinance.screener.valuation import Valuation
+    from finvizfinance.screener.technical import Technical
+    from finvizfinance.screener.ownership import Ownership
+    from finvizfinance.screener.performance import Performance
+    
+    services = {
+        'valuation': Valuation(),
+        'financial': Financial(),
+        'technical': Technical(),
+        'ownership': Ownership(),
+        'performance': Performance()
+    }
+    
+    if session_manager.min_interval < FINVIZ_REQUEST_INTERVAL:
+        session_manager.configure(min_interval=FINVIZ_REQUEST_INTERVAL)
+    
+    filters = _finviz_filters(index, sector)
+    pages = {}
+    for service_name, service in services.items():
+        if filters:
+            service.set_filter(filters_dict=filters)
+        pages[service_name] = service.screener_view_iter(sleep_sec=0)
+    
+    while pages:
+        views = []
+        for service_name in list(pages):
+            try:
+                views.append(next(pages[service_name]))
+            except StopIteration:
+                del pages[service_name]
+            except Exception as e:
+                logger.warning(f"Error fetching {service_name} data: {e}")
+                del pages[service_name]
+        if not views:
+            return
+        yield _clean_and_validate_data_sync(pd.concat(views, axis=1), index, sector)
+
+def _finviz_filters(index: str, sector: str) -> Dict[str, str]:
+    """Screener filters for an index/sector pair"""
+    filters = {}
+    if sector != 'Any':
+        filters["Sector"] = sector
+    if index != 'Any':
+        filters["Index"] = index
+    return filters
+
+def _combine_batches(batches: List[pd.DataFrame]) -> pd.DataFrame:
+    """Stack cleaned page batches, dropping the columns of a view that failed part-way
+    
+    The pages after the failure have no values for its columns; filling them
+    would feed made-up zeros into the averages and strength scores.
+    """
+    shared = set.intersection(*(set(batch.columns) for batch in batches))
+    columns = [col for col in batches[0].columns if col in shared]
+    dropped = [col for batch in batches for col in batch.columns if col not in shared]
+    if dropped:
+        logger.warning(f"Dropping partially fetched columns {sorted(set(dropped))}")
+    return apply_schema(pd.concat([batch[columns] for batch in batches], ignore_index=True))
+
 def _fetch_from_yahoo_sync(index: str, sector: str) -> DataFetchResult:
     """Synchronous Yahoo Finance fetch"""
     try:
@@ -918,14 +948,8 @@ def _clean_and_validate_data_sync(df: pd.DataFrame, index: str, sector: str) ->
         # Map to schema first
         df = _map_to_schema_sync(df)
         
-        # Convert only string columns to strings, keep numeric columns as numbers
-        string_columns = ['Ticker', 'Sector', 'Index', 'Last_Updated', 'Earnings']
-        for col in df.columns:
-            if col in string_columns:
-                df[col] = df[col].astype(str)
-            else:
-                # Keep numeric columns as numbers
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        # Cast every column according to the stock frame schema
+        df = apply_schema(df)
         
         return df
         
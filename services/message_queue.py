@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Callable
 from enum import Enum
 import asyncio
+import pandas as pd
 import redis
 from dataclasses import dataclass, asdict
 from utilities.redis_data import redis_manager
@@ -331,10 +332,13 @@ async def calculate_annual_returns_handler(data: Dict[str, Any]) -> Dict[str, An
     
     try:
         annual_return = AnnualReturn()
-        result = await annual_return.get_result(tickers)
+        # Chunks download in worker threads, so this worker keeps serving other tasks
+        results = [df for df in await annual_return.gather_result(tickers) if not df.empty]
+        if results:
+            redis_manager.save_ticker_returns(pd.concat(results, ignore_index=True))
         return {
             'success': True,
-            'data_count': len(result) if not result.empty else 0
+            'data_count': sum(len(df) for df in results)
         }
     except Exception as e:
         logger.error(f"Error in calculate_annual_returns_handler: {e}")
@@ -1,45 +1,75 @@
 import numpy as np
 
+
+def prefix_expected_returns(strength, expected_return):
+    """Strength-weighted expected return of every prefix of the rows
+
+    Element n - 1 is the return of a portfolio of the first n rows weighted by
+    strength, from two cumulative sums.
+    """
+    strength = np.asarray(strength, dtype=float)
+    weighted = np.cumsum(strength * np.asarray(expected_return, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return weighted / np.cumsum(strength)
+
+
+def optimal_number_of_stocks(returns, number_of_stocks, threshold, desired_return):
+    """Portfolio size picked from the prefix returns
+
+    Sizes are tried from number_of_stocks down to threshold. A size qualifies
+    when its return beats the desired return (for the largest size) or the
+    return of one more stock (for the others), or else beats every
+    non-qualifying return seen so far. The smallest qualifying size wins.
+
+    Args:
+        returns: prefix_expected_returns of the rows, strongest first
+        number_of_stocks: largest portfolio size
+        threshold: smallest portfolio size
+        desired_return: return the largest portfolio is compared with
+
+    Returns:
+        the number of stocks, 0 when no size qualifies
+    """
+    lowest = max(int(np.ceil(float(threshold))), 1)
+    if number_of_stocks < lowest or len(returns) == 0:
+        return 0
+    # Sizes beyond the number of rows hold all of them
+    sizes = np.arange(number_of_stocks, lowest - 1, -1)
+    actual = returns[np.minimum(sizes, len(returns)) - 1]
+
+    desired = np.concatenate([[float(desired_return)], actual[:-1]])
+    beats_desired = actual > desired
+    # Best earlier return that did not beat its desired return
+    missed = np.where(beats_desired | np.isnan(actual), 0.0, actual)
+    previous_highest = np.maximum.accumulate(np.concatenate([[0.0], missed[:-1]]))
+    qualifies = np.flatnonzero(beats_desired | (actual > previous_highest))
+    return int(sizes[qualifies[-1]]) if len(qualifies) else 0
+
+
 class optimization():
-     # init method or constructor
-    def __init__(self):
-        self.optimal_number_stocks = 0
-        self.previous_highest_expected_return = 0
-        self.threshold = 0
-        self.desired_return = 0
-     
-    """Returns the optimal number of stocks from the top strength stocks that give the expected
-    return equal or higher than the desired expected return
-        :param number_of_stocks: iterative number of stocks 
-        :param threshold: minimum number of stocks
-        :param desired_return: desired expected return 
-        :returns: optimal portfolio 
+    """Portfolio sizing from strength-weighted returns
+
+    Stateless: every call works on its arguments only, so one instance can
+    serve concurrent requests.
     """
-    def optimize_expected_return(self, df, number_of_stocks, threshold,desired_return):
-        #we want to remove the lowest strength iteratively till we get the optimal expected return
+
+    def optimize_expected_return(self, df, number_of_stocks, threshold, desired_return):
+        """Returns the optimal number of stocks from the top strength stocks that give the expected
+        return equal or higher than the desired expected return
+            :param number_of_stocks: largest number of stocks
+            :param threshold: minimum number of stocks
+            :param desired_return: desired expected return
+            :returns: optimal portfolio
+        """
         if number_of_stocks < float(threshold):
-            return  
-        df = df.head(number_of_stocks)
-        self.calculate_weighted_expected_return(df)
-        actual_return = df['weighted_expected_return']
-        actual_expected_return = float(actual_return.sum())
-        actual_greater_than_desired = actual_expected_return > float(desired_return)
-        actual_greater_than_previous_actual = actual_expected_return > self.previous_highest_expected_return 
-        if actual_greater_than_desired:
-            self.optimal_number_stocks = number_of_stocks
-        elif (actual_greater_than_previous_actual) & (not actual_greater_than_desired):
-             self.optimal_number_stocks = number_of_stocks
-             self.previous_highest_expected_return = actual_expected_return
-        self.optimize_expected_return(df,number_of_stocks - 1,threshold,actual_expected_return)
-        df = df.head(self.optimal_number_stocks)
-        df = self.calculate_weighted_expected_return(df)
-        return df
-    
+            return None
+        returns = prefix_expected_returns(df['strength'].to_numpy(dtype=float),
+                                          df['expected_annual_return'].to_numpy(dtype=float))
+        count = optimal_number_of_stocks(returns, number_of_stocks, threshold, desired_return)
+        return self.calculate_weighted_expected_return(df.head(count))
+
     def calculate_weighted_expected_return(self, df):
-        strengthArray = df["strength"]
-        strengthList = list(map(float, strengthArray))
-        weight_array = np.divide(strengthList, sum(strengthList))
-        df['weight'] = weight_array
-        df['weighted_expected_return'] =  df['expected_annual_return'].astype(float) * df['weight']
-        print ("WER", df['weighted_expected_return'])
-        return df
\ No newline at end of file
+        strength = df['strength'].to_numpy(dtype=float)
+        weight = strength / strength.sum()
+        return df.assign(weight=weight,
+                         weighted_expected_return=df['expected_annual_return'].to_numpy(dtype=float) * weight)
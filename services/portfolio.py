@@ -7,10 +7,11 @@ from flask import flash
 from flask_login import current_user
 
 import utilities.helper as helper
-from services.annualReturn import AnnualReturn
+from services.annualReturn import AnnualReturn, RISK_TOLERANCE_RANGES
 from services.optimization import optimization
 from services.advanced_optimization import AdvancedPortfolioOptimizer
 from services.backtesting import PortfolioBacktester
+from services.strengthCalculator import StrengthCalculator
 from utilities.pickle import pickle
 from utilities.redis_data import redis_manager
 
@@ -18,34 +19,29 @@ optimization = optimization()
 annualReturn = AnnualReturn()
 advanced_optimizer = AdvancedPortfolioOptimizer()
 backtester = PortfolioBacktester()
+strengthCalculator = StrengthCalculator()
 
 class portfolio():
      # init method or constructor
     def __init__(self):
+        # Last built portfolio, read back by the save and portfolio data routes
         self.optimized_df = pd.DataFrame()
         self.portfolio_redis_key = 'portfolio'
-        self.optimal_number_stocks = 0
-        self.previous_highest_expected_return = 0
-        self.threshold = 0
-        self.desired_return = 0
         self.portfolio_list = []
 
     def build_portfolio_from_user_input_tickers(self, df, selected_ticker_list, desired_return, investing_amount,risk_tolerance):
         df = df[df.Ticker.isin(selected_ticker_list)]
         df = df[(df['strength'] > 0) & (df['expected_annual_return'].astype(float) > 0)]
         df = annualReturn.get_risk_tolerance_data(risk_tolerance,df)
-        self.threshold = len(selected_ticker_list)
-        self.desired_return = desired_return
-        self.optimized_df = df #initialize the df
-        self.optimized_df = optimization.optimize_expected_return(self.optimized_df,
+        df = optimization.optimize_expected_return(df,
             number_of_stocks=len(selected_ticker_list),threshold = len(selected_ticker_list), desired_return = desired_return)
-        self.optimized_df  = self.calculate_portfolio_value_and_share(investing_amount)
+        self.optimized_df = self.calculate_portfolio_value_and_share(df, investing_amount)
         return self.optimized_df 
 
-    def calculate_portfolio_value_and_share(self, investing_amount):
-        self.calculate_portfolio_value_distribution(investing_amount)
-        self.total_share()
-        portfolio = np.round(self.optimized_df, decimals=3)
+    def calculate_portfolio_value_and_share(self, df, investing_amount):
+        df = self.calculate_portfolio_value_distribution(df, investing_amount)
+        df = self.total_share(df)
+        portfolio = np.round(df, decimals=3)
         
         # Get required attributes and filter to only include columns that exist
         required_attributes = helper.portfolio_attributes()
@@ -59,11 +55,49 @@ class portfolio():
         portfolio = portfolio[existing_columns]
         return portfolio
 
-    def total_share(self):
-        self.optimized_df['total_shares'] = np.divide(
-            self.optimized_df['invested_amount'], self.optimized_df['price'].astype(float))
-        return self.optimized_df
+    def total_share(self, df):
+        return df.assign(total_shares=np.divide(df['invested_amount'], df['price'].astype(float)))
 
+    def get_top_strength_stocks(self, stock_type, sector, index, count, maximum_stock_price, risk_tolerance, keep_risk_filter=True):
+        """Strongest stocks passing the portfolio filters, from the cached strength index
+        
+        Applies the filters and fallbacks of build_portfolio_with_top_stocks
+        (keep_risk_filter=True) or build_portfolio_with_advanced_optimization
+        (keep_risk_filter=False) as sorted-set range queries, so the builders
+        get these few rows instead of the whole strength table.
+        
+        Returns:
+            DataFrame of at most count rows, strongest first, or None when the
+            strength table is not cached
+        """
+        def top(above, below, rows=count):
+            return strengthCalculator.get_top_strength(stock_type, sector, index, rows, above, below)
+        
+        positive = {'strength': 0}
+        filters_above = {'strength': 0, 'expected_annual_return': 0}
+        filters_below = {'price': float(maximum_stock_price)}
+        risk_above, risk_below = {}, {}
+        if risk_tolerance in RISK_TOLERANCE_RANGES:
+            low, high = RISK_TOLERANCE_RANGES[risk_tolerance]
+            risk_above, risk_below = {'expected_annual_risk': low}, {'expected_annual_risk': high}
+        
+        df = top({**filters_above, **risk_above}, {**filters_below, **risk_below})
+        if df is None or not df.empty:
+            return df
+        
+        if keep_risk_filter:
+            # Nothing passed the price and return filters: keep only strength and risk
+            passed = top(filters_above, filters_below, rows=1)
+            if passed is None:
+                return None
+            if passed.empty:
+                df = top({**positive, **risk_above}, risk_below)
+                if df is None or not df.empty:
+                    return df
+        
+        logging.warning("No stocks passed risk tolerance filter. Using all stocks with positive strength.")
+        return top(positive, {})
+    
     def build_portfolio_with_top_stocks(self, df, investing_amount,maximum_stock_price,risk_tolerance):  
         logging.info(f"Building portfolio with {len(df)} stocks initially")
         
@@ -88,39 +122,39 @@ class portfolio():
         df_price = df_return[df_return['price'].astype(float) < float(maximum_stock_price)]
         logging.info(f"After price filter: {len(df_price)} stocks")
         
-        self.optimized_df = df_price
+        selected = df_price
         
-        if len(self.optimized_df) == 0:
+        if len(selected) == 0:
             logging.warning("No stocks passed all filters. Relaxing constraints...")
             # Try with just strength filter
-            self.optimized_df = df[df['strength'] > 0]
-            if len(self.optimized_df) == 0:
+            selected = df[df['strength'] > 0]
+            if len(selected) == 0:
                 logging.error("No stocks with positive strength found")
+                self.optimized_df = selected
                 return self.optimized_df
         
         # Apply risk tolerance filter
-        self.optimized_df = annualReturn.get_risk_tolerance_data(risk_tolerance, self.optimized_df)
-        logging.info(f"After risk tolerance filter: {len(self.optimized_df)} stocks")
+        selected = annualReturn.get_risk_tolerance_data(risk_tolerance, selected)
+        logging.info(f"After risk tolerance filter: {len(selected)} stocks")
         
         # If no stocks passed risk filter, try with all stocks
-        if len(self.optimized_df) == 0:
+        if len(selected) == 0:
             logging.warning("No stocks passed risk tolerance filter. Using all stocks with positive strength.")
-            self.optimized_df = df[df['strength'] > 0]
-            logging.info(f"Using all stocks with positive strength: {len(self.optimized_df)} stocks")
+            selected = df[df['strength'] > 0]
+            logging.info(f"Using all stocks with positive strength: {len(selected)} stocks")
         
         # Take top 5 stocks
-        self.optimized_df = optimization.calculate_weighted_expected_return(self.optimized_df.head(5))
-        logging.info(f"After optimization: {len(self.optimized_df)} stocks")
+        selected = optimization.calculate_weighted_expected_return(selected.head(5))
+        logging.info(f"After optimization: {len(selected)} stocks")
         
         # Calculate portfolio values
-        self.optimized_df = self.calculate_portfolio_value_and_share(investing_amount)
+        self.optimized_df = self.calculate_portfolio_value_and_share(selected, investing_amount)
         logging.info(f"Final portfolio: {len(self.optimized_df)} stocks")
         
         return self.optimized_df
     
-    def calculate_portfolio_value_distribution(self, investing_amount):
-        self.optimized_df['invested_amount'] = np.multiply(
-        self.optimized_df['weight'].astype(float), float(investing_amount))
+    def calculate_portfolio_value_distribution(self, df, investing_amount):
+        return df.assign(invested_amount=np.multiply(df['weight'].astype(float), float(investing_amount)))
     
 
     def calculate_portfolio_return(self,df):
@@ -283,11 +317,10 @@ class portfolio():
             optimization_result = advanced_optimizer.optimize_portfolio(df_optimize, method=method)
             
             # Create portfolio DataFrame with optimized weights
-            self.optimized_df = df_optimize.copy()
-            self.optimized_df['weight'] = optimization_result['weights']
+            optimized = df_optimize.assign(weight=optimization_result['weights'])
             
             # Calculate portfolio values
-            self.optimized_df = self.calculate_portfolio_value_and_share(investing_amount)
+            self.optimized_df = self.calculate_portfolio_value_and_share(optimized, investing_amount)
             
             # Add optimization metrics
             self.optimization_metrics = {
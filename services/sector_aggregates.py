@@ -0,0 +1,162 @@
+"""
+Sector Aggregates Service
+Computes per index/sector statistics for every metric in METRIC_SCHEMA in one
+groupby pass after each data refresh and serves them from a versioned document
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from utilities.constant import METRIC_SCHEMA
+from utilities.redis_data import redis_manager
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = {'q25': 0.25, 'q75': 0.75}
+STATS = ['mean', 'median'] + list(QUANTILES)
+# Seconds a reader trusts the loaded version before asking Redis for the current one
+SECTOR_AGGREGATES_CHECK_SECONDS = float(os.getenv('SECTOR_AGGREGATES_CHECK_SECONDS', 5))
+
+
+class SectorAggregates:
+    """Versioned mean/median/quantile table keyed by "index:sector"
+
+    Each refresh merges the groups it computed into the current document and
+    publishes it under a new version, so readers never see a half-written table.
+    Lookups are a dictionary access once the current version is loaded; the
+    version itself is checked at most once every check_seconds.
+    """
+
+    def __init__(self, check_seconds: float = SECTOR_AGGREGATES_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._version = None
+        self._document = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _group_key(index: str, sector: str) -> str:
+        return f"{index}:{sector}"
+
+    def compute(self, df: pd.DataFrame, rollup: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Compute the statistics for every index/sector group in the frame
+
+        Args:
+            df: stock data with Index and Sector columns, raw or schema column names
+            rollup: also compute an "index:Any" group over all rows of each index.
+                Only pass True when the frame holds every sector of the index.
+
+        Returns:
+            dict mapping "index:sector" to {"count", "mean", "median", "q25", "q75"}
+        """
+        if df.empty or 'Index' not in df.columns or 'Sector' not in df.columns:
+            return {}
+
+        df = df.rename(columns={k: v for k, v in METRIC_SCHEMA.items() if k in df.columns})
+        df = df.loc[:, ~df.columns.duplicated()]
+        metrics = [m for m in METRIC_SCHEMA.values() if m in df.columns]
+        if not metrics:
+            return {}
+
+        values = df[metrics].apply(pd.to_numeric, errors='coerce')
+        keys = df['Index'].astype(str) + ':' + df['Sector'].astype(str)
+        if rollup:
+            by_sector = (df['Sector'] != 'Any').to_numpy()
+            values = pd.concat([values, values[by_sector]], ignore_index=True)
+            keys = pd.concat([keys, df['Index'].astype(str)[by_sector] + ':Any'], ignore_index=True)
+
+        grouped = values.groupby(keys.to_numpy())
+        frames = {
+            'mean': grouped.mean(),
+            'median': grouped.median(),
+        }
+        quantiles = grouped.quantile(list(QUANTILES.values()))
+        for name, q in QUANTILES.items():
+            frames[name] = quantiles.xs(q, level=-1)
+        counts = grouped.size()
+
+        groups = {}
+        for key in counts.index:
+            group = {'count': int(counts[key])}
+            for stat, frame in frames.items():
+                row = frame.loc[key]
+                group[stat] = {m: (None if pd.isna(v) else round(float(v), 3)) for m, v in row.items()}
+            groups[key] = group
+        return groups
+
+    def refresh(self, df: pd.DataFrame, rollup: bool = False) -> Optional[str]:
+        """Recompute the groups present in df and publish a new version
+
+        Groups not present in df keep their previous values, so a refresh of a
+        single index/sector only pays for that slice.
+        """
+        groups = self.compute(df, rollup=rollup)
+        if not groups:
+            return self._version
+
+        with self._lock:
+            # Merge into the latest published groups, not a cached version
+            merged = dict(self._current_groups(force=True))
+            merged.update(groups)
+            version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            document = {
+                'version': version,
+                'timestamp': datetime.now().isoformat(),
+                'groups': merged
+            }
+            redis_manager.save_sector_aggregates(document, version)
+            self._document = document
+            self._version = version
+            self._checked_at = time.monotonic()
+
+        logger.info(f"Published sector aggregates {version} ({len(groups)} groups refreshed)")
+        return version
+
+    def _current_groups(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Groups of the current version, reloading only when the version changed"""
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return self._document.get('groups', {})
+        self._checked_at = now
+        version = redis_manager.get_sector_aggregates_version()
+        if version and version != self._version:
+            document = redis_manager.get_sector_aggregates(version)
+            if document:
+                self._document = document
+                self._version = version
+        return self._document.get('groups', {})
+
+    def get(self, index: str, sector: str, stat: str = 'mean') -> pd.Series:
+        """Get one statistic for every metric of an index/sector group
+
+        Returns an empty Series when the group has not been computed yet.
+        """
+        if stat not in STATS:
+            raise ValueError(f"Unknown statistic {stat}, expected one of {STATS}")
+        group = self._current_groups().get(self._group_key(index, sector))
+        if not group:
+            return pd.Series(dtype=float)
+        return pd.Series(group[stat], dtype=float)
+
+    def get_group(self, index: str, sector: str) -> Dict[str, Any]:
+        """Get all statistics of an index/sector group as a JSON-ready dict"""
+        return self._current_groups().get(self._group_key(index, sector), {})
+
+    def get_document(self) -> Dict[str, Any]:
+        """Get the full current document"""
+        self._current_groups()
+        return self._document
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+
+# Global instance
+sector_aggregates = SectorAggregates()
@@ -1,29 +1,41 @@
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 
-from enums.enum import StockType
 from services.annualReturn import AnnualReturn
 from services.data_fetcher import fetch_stock_data_sync
+from services.sector_aggregates import sector_aggregates
+from services.strength_engine import IncrementalStrength, strength_engine, strength_models
 from utilities.redis_data import redis_manager
 
 # Using new async data fetcher instead of SourceDataMapperService
 AnnualReturn = AnnualReturn()
 
+# Threads of the strength precalculation; 0 sizes the pool to the machine
+STRENGTH_PRECALC_WORKERS = int(os.getenv('STRENGTH_PRECALC_WORKERS', 0))
+# Columns the portfolio optimizers read; callers that return no rows to the
+# client decode only these
+STRENGTH_PORTFOLIO_COLUMNS = ['Ticker', 'strength', 'price', 'expected_annual_return', 'expected_annual_risk']
+
 class StrengthCalculator:
 
     def __init__(self):
         self.cache_key_prefix = "strength_data"
+        # Incremental state of every precalculated (index, sector) dataset
+        self._incremental = {}
     
     def _get_cache_key(self, stock_type, sector, index):
-        """Generate cache key for strength data"""
-        return f"{self.cache_key_prefix}:{stock_type}:{sector}:{index}"
+        """Generate cache key for strength data of the current version of a model"""
+        return f"{self.cache_key_prefix}:{strength_models.get(stock_type).key}:{sector}:{index}"
     
-    def _get_strength_from_cache(self, stock_type, sector, index):
+    def _get_strength_from_cache(self, stock_type, sector, index, columns=None):
         """Get strength data from Redis cache"""
         cache_key = self._get_cache_key(stock_type, sector, index)
-        df = redis_manager.get_strength_data(cache_key)
+        df = redis_manager.get_strength_data(cache_key, columns)
         if not df.empty:
             # Track cache hit
             try:
@@ -40,7 +52,20 @@ class StrengthCalculator:
         """Save strength data to Redis cache"""
         cache_key = self._get_cache_key(stock_type, sector, index)
         redis_manager.save_strength_data(df, cache_key)
+        self._track_strength_save(cache_key, df, stock_type, sector, index)
+        
+        logging.debug(f"Saved strength data to cache for {stock_type}:{sector}:{index}")
+
+    def _save_strength_batch_to_cache(self, frames, sector, index):
+        """Save the strength tables of every stock type of one dataset in one pipeline"""
+        batch = {self._get_cache_key(stock_type, sector, index): df for stock_type, df in frames.items()}
+        redis_manager.save_strength_batch(batch)
+        for stock_type, df in frames.items():
+            self._track_strength_save(self._get_cache_key(stock_type, sector, index), df, stock_type, sector, index)
         
+        logging.debug(f"Saved {len(frames)} strength tables to cache for {sector}:{index}")
+
+    def _track_strength_save(self, cache_key, df, stock_type, sector, index):
         # Track the data save
         try:
             from utilities.redis_tracker import redis_tracker, DataType, APISource
@@ -57,15 +82,18 @@ class StrengthCalculator:
             )
         except Exception as e:
             logging.warning(f"Failed to track strength data save: {e}")
+    
+    def calculate_strength_value(self, stock_type, sector, index, columns=None):
+        """Calculate strength value with caching
         
-        logging.debug(f"Saved strength data to cache for {stock_type}:{sector}:{index}")
-
-    def calculate_strength_value(self, stock_type, sector, index):
-        """Calculate strength value with caching"""
+        Args:
+            columns: return only these columns, e.g. STRENGTH_PORTFOLIO_COLUMNS;
+                a cached table decodes nothing else
+        """
         logging.debug(f"Calculating strength value for {stock_type} Stock")
         
         # Try to get from cache first
-        cached_df = self._get_strength_from_cache(stock_type, sector, index)
+        cached_df = self._get_strength_from_cache(stock_type, sector, index, columns)
         if not cached_df.empty:
             return cached_df
         
@@ -80,18 +108,7 @@ class StrengthCalculator:
         if not df.empty:
             df = AnnualReturn.update_with_return_data(df)
         
-        # Create average metrics DataFrame from the data
-        if not df.empty:
-            avg_metric_df = df[["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]].apply(pd.to_numeric, errors='coerce').mean()
-        else:
-            avg_metric_df = pd.Series({
-                "dividend": 0,
-                "pe": 0,
-                "fpe": 0,
-                "pb": 0,
-                "beta": 0,
-                "return_risk_ratio": 0
-            })
+        avg_metric_df = self._get_avg_metric_df(df, sector, index)
         
         # Calculate strength
         df = self._calculate_strength(df, avg_metric_df, stock_type)
@@ -99,100 +116,182 @@ class StrengthCalculator:
         # Save to cache
         self._save_strength_to_cache(df, stock_type, sector, index)
         
+        if columns is not None:
+            return df.reindex(columns=columns)
         return df
     
+    def get_top_strength(self, stock_type, sector, index, count, above=None, below=None):
+        """Strongest cached rows within exclusive score bounds, read through the sorted-set index
+
+        Returns None when the strength table is not cached; see
+        RedisDataManager.get_top_strength for the bounds.
+        """
+        cache_key = self._get_cache_key(stock_type, sector, index)
+        return redis_manager.get_top_strength(cache_key, count, above, below)
+    
+    def _get_avg_metric_df(self, df, sector, index):
+        """Sector averages from the precomputed aggregates, falling back to the frame itself"""
+        avg_metric_df = sector_aggregates.get(index, sector)
+        if not avg_metric_df.empty:
+            return avg_metric_df
+        
+        # Aggregates not published yet - create average metrics from the data
+        if not df.empty:
+            return df[["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]].apply(pd.to_numeric, errors='coerce').mean()
+        return pd.Series({
+            "dividend": 0,
+            "pe": 0,
+            "fpe": 0,
+            "pb": 0,
+            "beta": 0,
+            "return_risk_ratio": 0
+        })
+    
     def _calculate_strength(self, df, avg_metric_df, stock_type):
         """Calculate strength values for the dataframe"""
-        if df.empty:
-            return df
-            
-        attributes = ["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]
-        df["strength"] = 0
-        
-        for col in attributes:
-            if col not in df.columns:
-                logging.warning(f"Column {col} not found in DataFrame, skipping")
-                continue
-                
-            df[col].replace('nan', np.nan, inplace=True)
-            df[col].replace('None', np.nan, inplace=True)
-            
-            if col == 'beta':
-                df["strength"] = df["strength"] - np.where(df[col].isnull(), 0, df[col].astype(float))
-            elif col == 'return_risk_ratio':
-                df["strength"] = df["strength"] + np.where(df[col].isnull(), 0, df[col].astype(float))
-            else:
-                if col in avg_metric_df and avg_metric_df[col] != 0:
-                    new_col = np.where(df[col].isnull(), 0, df[col].astype(float) - avg_metric_df[col])
-                    new_col = np.divide(1, avg_metric_df[col]) * new_col  # percentage change
-                    if col == 'dividend':
-                        df["strength"] = df["strength"] + new_col
-                    else:
-                        df["strength"] = df["strength"] - new_col
-        
-        if stock_type == StockType.VALUE.value:
-            df["strength"] = 1 * df["strength"]
-        elif stock_type == StockType.GROWTH.value:
-            df["strength"] = -1 * df["strength"]
-        else:
-            raise ValueError("Stock Type must be Value or Growth")
-        
-        df = df.replace(np.nan, 0)
-        df = np.round(df, decimals=3)
-        df = df.sort_values(by=["strength"], ascending=[False])
-        
-        return df
+        return strength_engine.calculate(df, avg_metric_df, stock_type)
     
     def clear_strength_cache(self):
         """Clear all strength data from cache"""
         logging.info("Clearing strength data cache")
         redis_manager.clear_strength_cache(self.cache_key_prefix)
     
-    def precalculate_all_strength_data(self):
-        """Precalculate strength data for all combinations and cache them"""
+    def precalculate_all_strength_data(self, max_workers=None):
+        """Precalculate strength data for all index:sector combinations and cache them
+        
+        Datasets load in a thread pool, their annual returns are looked up once
+        into a shared read-only table, then every combination is scored and
+        saved in the pool, so a run takes about as long as its slowest dataset.
+        
+        Args:
+            max_workers: pool size; STRENGTH_PRECALC_WORKERS or the CPU count by default
+        
+        Returns:
+            dict with the total seconds and one entry per combination holding
+            its stock count, seconds and error (None when it succeeded)
+        """
         logging.info("Starting precalculation of all strength data")
         
         from utilities.constant import SECTORS
-        stock_types = [StockType.VALUE.value, StockType.GROWTH.value]
+        stock_types = strength_models.names()
         indices = ["S&P 500", "DJIA"]
+        combinations = [(index, sector) for index in indices for sector in SECTORS]
+        workers = max_workers or STRENGTH_PRECALC_WORKERS or min(len(combinations), os.cpu_count() or 1)
+        started = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='strength') as executor:
+            loaded = dict(zip(combinations, executor.map(lambda c: self._load_strength_dataset(*c), combinations)))
+            
+            # One returns lookup for the union of tickers, shared by every combination
+            tickers = {t for df, _, _ in loaded.values() if not df.empty for t in df['Ticker'].astype(str)}
+            return_table = AnnualReturn.get_return_table(sorted(tickers)) if tickers else None
+            
+            futures = {
+                executor.submit(self._precalculate_strength_dataset, index, sector, loaded[(index, sector)],
+                                return_table, stock_types): (index, sector)
+                for index, sector in combinations
+            }
+            combos = []
+            for future in as_completed(futures):
+                index, sector = futures[future]
+                entry = future.result()
+                combos.append(entry)
+                if entry['error']:
+                    logging.error(f"Error precalculating strength data for {sector}:{index}: {entry['error']}")
+                else:
+                    logging.info(f"Cached strength data for {sector}:{index} ({entry['stocks']} stocks, {entry['seconds']:.2f}s)")
+        
+        report = {
+            'seconds': round(time.perf_counter() - started, 3),
+            'workers': workers,
+            'combinations': sorted(combos, key=lambda c: (c['index'], c['sector'])),
+            'failed': [f"{c['sector']}:{c['index']}" for c in combos if c['error']]
+        }
+        logging.info(f"Completed precalculation of all strength data: {len(combos) - len(report['failed'])}/"
+                     f"{len(combos)} combinations in {report['seconds']:.1f}s with {workers} workers")
+        return report
+
+    def update_strength(self, index, sector, changes, stock_types=None):
+        """Apply changed stock rows to a precalculated dataset and save its tables
+        
+        Only the changed rows are rescored unless a sector average moved
+        beyond STRENGTH_AVERAGE_TOLERANCE.
+        
+        Args:
+            changes: stock rows with a Ticker column, new tickers are added
+            stock_types: tables to save; every model of the dataset by default
         
-        total_combinations = len(SECTORS) * len(stock_types) * len(indices)
-        current = 0
-        
-        for index in indices:
-            for sector in SECTORS:
-                for stock_type in stock_types:
-                    current += 1
-                    logging.info(f"Precalculating strength data ({current}/{total_combinations}): {stock_type}:{sector}:{index}")
-                    
-                    try:
-                        # Calculate and cache strength data
-                        result = fetch_stock_data_sync(index, sector)
-                        if result.success and not result.data.empty:
-                            df = result.data
-                        else:
-                            df = pd.DataFrame()
-                        
-                        if not df.empty:
-                            df = AnnualReturn.update_with_return_data(df)
-                        
-                        # Create average metrics DataFrame from the data
-                        if not df.empty:
-                            avg_metric_df = df[["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]].apply(pd.to_numeric, errors='coerce').mean()
-                        else:
-                            avg_metric_df = pd.Series({
-                                "dividend": 0,
-                                "pe": 0,
-                                "fpe": 0,
-                                "pb": 0,
-                                "beta": 0,
-                                "return_risk_ratio": 0
-                            })
-                        df = self._calculate_strength(df, avg_metric_df, stock_type)
-                        self._save_strength_to_cache(df, stock_type, sector, index)
-                        
-                        logging.info(f"Successfully cached strength data for {stock_type}:{sector}:{index} ({len(df)} stocks)")
-                    except Exception as e:
-                        logging.error(f"Error precalculating strength data for {stock_type}:{sector}:{index}: {e}")
-        
-        logging.info("Completed precalculation of all strength data")
\ No newline at end of file
+        Returns:
+            the IncrementalStrength report, or None when the dataset has not
+            been precalculated and needs a full calculation
+        """
+        state = self._incremental.get((index, sector))
+        if state is None:
+            return None
+        if 'return_risk_ratio' not in changes.columns:
+            changes = AnnualReturn.update_with_return_data(changes)
+        
+        report = state.update(changes)
+        frames = state.tables(stock_types)
+        self._save_strength_batch_to_cache(frames, sector, index)
+        logging.info(f"Updated strength data for {sector}:{index}: {report['changed']} changed, "
+                     f"{report['inserted']} new, {report['rescored']} rows rescored")
+        return report
+
+    def refresh_strength(self, index, sector, df, stock_types=None):
+        """Bring a precalculated dataset up to date with freshly fetched stock data
+        
+        The fetched rows are compared with the kept dataset and only the new
+        or changed ones go through update_strength.
+        
+        Returns:
+            the update report, or None when nothing changed or the dataset
+            has not been precalculated and is left to the next full calculation
+        """
+        state = self._incremental.get((index, sector))
+        if state is None or df.empty:
+            return None
+        if 'return_risk_ratio' not in df.columns:
+            df = AnnualReturn.update_with_return_data(df)
+        changes = state.changed_rows(df)
+        if changes.empty:
+            logging.debug(f"Strength data for {sector}:{index} unchanged")
+            return None
+        return self.update_strength(index, sector, changes, stock_types)
+
+    def _load_strength_dataset(self, index, sector):
+        """Load one index:sector dataset; returns (df, seconds, error)"""
+        started = time.perf_counter()
+        try:
+            result = fetch_stock_data_sync(index, sector)
+            df = result.data if result.success and not result.data.empty else pd.DataFrame()
+            error = None if result.success else (result.error or 'fetch failed')
+        except Exception as e:
+            df, error = pd.DataFrame(), str(e)
+        return df, time.perf_counter() - started, error
+
+    def _precalculate_strength_dataset(self, index, sector, loaded, return_table, stock_types):
+        """Score one loaded dataset for every stock type and save the tables"""
+        df, seconds, error = loaded
+        started = time.perf_counter()
+        try:
+            if error is None:
+                if not df.empty:
+                    df = AnnualReturn.update_with_return_data(df, return_table)
+                avg_metric_df = self._get_avg_metric_df(df, sector, index)
+                if df.empty:
+                    frames = strength_engine.calculate_all(df, avg_metric_df, stock_types)
+                else:
+                    state = IncrementalStrength(df, avg_metric_df, stock_types=stock_types)
+                    frames = state.tables(stock_types)
+                    self._incremental[(index, sector)] = state
+                self._save_strength_batch_to_cache(frames, sector, index)
+        except Exception as e:
+            error = str(e)
+        return {
+            'index': index,
+            'sector': sector,
+            'stocks': len(df),
+            'seconds': round(seconds + time.perf_counter() - started, 3),
+            'error': error
+        }
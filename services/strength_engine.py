@@ -0,0 +1,378 @@
+"""
+Strength Scoring Engine
+Scores every stock for every registered factor model in one matrix product of
+the normalized factor matrix and the compiled model weights, relative to the
+sector averages
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from enums.enum import StockType
+
+logger = logging.getLogger(__name__)
+
+STRENGTH_ATTRIBUTES = ["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]
+# Attributes normalized as the relative deviation from the sector average;
+# +1 when being above the average adds Value strength, -1 when it takes it away
+RELATIVE_SIGNS = {"dividend": 1, "pe": -1, "fpe": -1, "pb": -1}
+# Attributes used as they are
+ABSOLUTE_SIGNS = {"beta": -1, "return_risk_ratio": 1}
+# Relative move of a sector average that makes an incremental update rescore every row
+STRENGTH_AVERAGE_TOLERANCE = float(os.getenv('STRENGTH_AVERAGE_TOLERANCE', 0.01))
+
+
+@dataclass(frozen=True)
+class FactorModel:
+    """A named weight vector over the normalized strength factors"""
+    name: str
+    weights: Dict[str, float]
+    version: int = 1
+
+    @property
+    def key(self) -> str:
+        """Name and version, as used in cache keys"""
+        return f"{self.name}@{self.version}"
+
+
+class FactorModelRegistry:
+    """Registered factor models and their weights compiled into matrices
+
+    Registering a model under an existing name with other weights bumps its
+    version, so tables cached for the previous weights are never served.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, FactorModel] = {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, weights: Dict[str, float]) -> FactorModel:
+        unknown = set(weights) - set(STRENGTH_ATTRIBUTES)
+        if unknown:
+            raise ValueError(f"Unknown strength factors {sorted(unknown)}")
+        weights = {col: float(weight) for col, weight in weights.items() if weight}
+        with self._lock:
+            current = self._models.get(name)
+            if current is not None and current.weights == weights:
+                return current
+            model = FactorModel(name, weights, current.version + 1 if current else 1)
+            self._models[name] = model
+            self._compiled = {}
+        logger.info(f"Registered strength model {model.key}")
+        return model
+
+    def get(self, name: str) -> FactorModel:
+        model = self._models.get(name)
+        if model is None:
+            raise ValueError(f"Unknown strength model {name}, expected one of {self.names()}")
+        return model
+
+    def names(self) -> List[str]:
+        return list(self._models)
+
+    def models(self, names: Sequence[str] = None) -> List[FactorModel]:
+        return [self.get(name) for name in (self.names() if names is None else names)]
+
+    def matrix(self, models: Sequence[FactorModel], attributes: Sequence[str]) -> np.ndarray:
+        """Weights of the models as one attributes x models matrix, compiled once"""
+        key = (tuple(model.key for model in models), tuple(attributes))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = np.array([[model.weights.get(col, 0.0) for model in models] for col in attributes],
+                                dtype=float).reshape(len(attributes), len(models))
+            compiled.flags.writeable = False
+            self._compiled[key] = compiled
+        return compiled
+
+
+# Global registry with the built-in stock types; Growth is Value reversed
+strength_models = FactorModelRegistry()
+strength_models.register(StockType.VALUE.value, {**RELATIVE_SIGNS, **ABSOLUTE_SIGNS})
+strength_models.register(StockType.GROWTH.value, {col: -sign for col, sign in {**RELATIVE_SIGNS, **ABSOLUTE_SIGNS}.items()})
+
+
+class StrengthEngine:
+    """Strength of every model as F @ W over the normalized factor matrix F
+
+    A relative factor is (x - average) / average, 0 where x is missing and for
+    every row when the average is missing or zero; an absolute factor is x,
+    0 where missing. W holds one column of weights per model, so each extra
+    model costs one more output column of the same product.
+    """
+
+    def __init__(self, attributes=STRENGTH_ATTRIBUTES, registry=None):
+        self.attributes = list(attributes)
+        self.registry = registry or strength_models
+
+    def normalization(self, avg_metric_df, columns):
+        """Centers and scales of the attributes present in columns
+
+        Args:
+            avg_metric_df: Series of sector averages by attribute
+            columns: columns of the frame being scored
+
+        Returns:
+            (attributes, centers, scales); a NaN average gives NaN scores
+        """
+        attributes = [col for col in self.attributes if col in columns]
+        centers = np.zeros(len(attributes))
+        scales = np.ones(len(attributes))
+        for i, col in enumerate(attributes):
+            if col in ABSOLUTE_SIGNS:
+                continue
+            if col in avg_metric_df and avg_metric_df[col] != 0:
+                average = float(avg_metric_df[col])
+                centers[i] = average
+                scales[i] = np.divide(1, average)
+            else:
+                scales[i] = 0.0
+        return attributes, centers, scales
+
+    def factors(self, values, centers, scales):
+        """Normalized factor matrix of a raw attribute matrix, missing values as 0"""
+        return np.where(np.isnan(values), 0.0, values - centers) * scales
+
+    def matrix(self, df, attributes):
+        """Attribute block as one float matrix"""
+        block = df[attributes]
+        if not all(pd.api.types.is_float_dtype(dtype) for dtype in block.dtypes):
+            block = block.apply(pd.to_numeric, errors='coerce')
+        return block.to_numpy(dtype=float)
+
+    def scores(self, df, avg_metric_df, models):
+        """Scores of every row for every model, as a rows x models matrix"""
+        attributes, centers, scales = self.normalization(avg_metric_df, df.columns)
+        if not attributes:
+            return np.zeros((len(df), len(models)), dtype=int)
+        factors = self.factors(self.matrix(df, attributes), centers, scales)
+        return factors @ self.registry.matrix(models, attributes)
+
+    def score(self, df, avg_metric_df, stock_type):
+        """Strength of every row as an array"""
+        return self.scores(df, avg_metric_df, [self.registry.get(stock_type)])[:, 0]
+
+    def calculate(self, df, avg_metric_df, stock_type):
+        """Score, round and sort a stock frame the way the strength tables are served
+
+        Missing values become 0, numbers are rounded to 3 decimals and rows are
+        sorted by strength, strongest first.
+        """
+        return self.calculate_all(df, avg_metric_df, [stock_type])[stock_type]
+
+    def calculate_all(self, df, avg_metric_df, stock_types=None):
+        """Strength tables of several models from one scoring pass
+
+        Every model is one column of the same matrix product, and the fill and
+        rounding run once. The tables share every column except strength.
+
+        Args:
+            stock_types: registered model names; every registered model by default
+
+        Returns:
+            dict mapping each model name to its sorted table
+        """
+        models = self.registry.models(stock_types)
+        if df.empty:
+            return {model.name: df for model in models}
+        for col in self.attributes:
+            if col not in df.columns:
+                logger.warning(f"Column {col} not found in DataFrame, skipping")
+
+        return self.tables(df, self.scores(df, avg_metric_df, models), models)
+
+    def tables(self, df, scores, models):
+        """Sorted strength tables from a rows x models score matrix"""
+        table = df.assign(strength=0)
+        table = table.replace(np.nan, 0)
+        table = np.round(table, decimals=3)
+
+        tables = {}
+        for i, model in enumerate(models):
+            strength = scores[:, i]
+            if strength.dtype.kind == 'f':
+                strength = np.round(np.where(np.isnan(strength), 0, strength), 3)
+            tables[model.name] = table.assign(strength=strength).sort_values(by=["strength"], ascending=[False])
+        return tables
+
+
+# Global instance
+strength_engine = StrengthEngine()
+
+
+class IncrementalStrength:
+    """Strength of one sector dataset kept up to date from changesets
+
+    Running sums and counts of every attribute give the sector averages in
+    O(changed) per update. Scores stay relative to the averages they were
+    last computed with until a running average moves more than tolerance
+    (relatively) from its value at that time; only then is every row
+    rescored in one vectorized pass, against the running averages. Otherwise
+    only the changed rows are scored.
+
+    Drift is measured between running averages only, so seeding with other
+    averages (the published aggregates) does not force a rescore by itself.
+    """
+
+    def __init__(self, df, averages=None, tolerance=STRENGTH_AVERAGE_TOLERANCE, engine=None, stock_types=None):
+        """
+        Args:
+            df: stock frame with a Ticker column and the strength attributes
+            averages: averages to score with at first, such as the published
+                sector aggregates; the running averages of df by default
+            tolerance: relative drift of an average that triggers a full rescore
+            engine: StrengthEngine providing the normalization and the models
+            stock_types: models to keep scores for; every registered model by default
+        """
+        self.engine = engine or strength_engine
+        self.models = self.engine.registry.models(stock_types)
+        self.tolerance = tolerance
+        self.frame = df.reset_index(drop=True)
+        self.attributes = [col for col in self.engine.attributes if col in self.frame.columns]
+        self.position = {ticker: i for i, ticker in enumerate(self.frame['Ticker'].astype(str))}
+        self.values = self._numeric(self.frame)
+        self.sums = np.nansum(self.values, axis=0)
+        self.counts = np.count_nonzero(~np.isnan(self.values), axis=0)
+        # Running averages when the scores were last computed, the basis of the drift
+        self.basis = self.averages()
+        self.applied = self.basis if averages is None else averages.reindex(self.attributes).astype(float)
+        self.rescored_rows = 0
+        self.last_report = {}
+        self._lock = threading.Lock()
+        self.scores = self._score(self.values)
+
+    def _numeric(self, df):
+        block = df[self.attributes]
+        if not all(pd.api.types.is_float_dtype(dtype) for dtype in block.dtypes):
+            block = block.apply(pd.to_numeric, errors='coerce')
+        return block.to_numpy(dtype=float, copy=True).reshape(len(df), len(self.attributes))
+
+    def _score(self, values):
+        _, centers, scales = self.engine.normalization(self.applied, self.attributes)
+        weights = self.engine.registry.matrix(self.models, self.attributes)
+        return self.engine.factors(values, centers, scales) @ weights
+
+    def averages(self):
+        """Running mean of every attribute, NaN where no row has a value"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+        return pd.Series(means, index=self.attributes, dtype=float)
+
+    def drift(self):
+        """Largest relative move of a running average since the scores were computed"""
+        applied = self.basis.to_numpy()
+        current = self.averages().to_numpy()
+        relative = np.array([col in RELATIVE_SIGNS for col in self.attributes], dtype=bool)
+        applied, current = applied[relative], current[relative]
+        same = (applied == current) | (np.isnan(applied) & np.isnan(current))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            moved = np.abs(current - applied) / np.abs(applied)
+        moved = np.where(same, 0.0, np.where(np.isnan(moved), np.inf, moved))
+        return float(moved.max()) if len(moved) else 0.0
+
+    def changed_rows(self, df):
+        """Rows of a fresh fetch that are new or differ from the kept frame
+
+        Only the columns shared with the kept frame are compared; tickers
+        missing from df are kept as they are.
+        """
+        df = df.drop_duplicates(subset='Ticker', keep='last').reset_index(drop=True)
+        columns = [col for col in df.columns if col in self.frame.columns and col != 'Ticker']
+        with self._lock:
+            positions = np.array([self.position.get(t, -1) for t in df['Ticker'].astype(str)], dtype=int)
+            known = positions >= 0
+            kept = self.frame.iloc[np.where(known, positions, 0)]
+            changed = ~known
+            for col in columns:
+                new, old = df[col].to_numpy(dtype=object), kept[col].to_numpy(dtype=object)
+                same = (new == old) | (pd.isna(new) & pd.isna(old))
+                changed |= known & ~same
+        return df[changed]
+
+    def update(self, changes):
+        """Apply changed or new rows and rescore what the change requires
+
+        Args:
+            changes: rows with a Ticker column; present tickers are updated
+                in the columns given, unknown tickers are appended
+
+        Returns:
+            report with the changed and inserted row counts, the drift of
+            the averages, whether every row was rescored, the number of rows
+            scored and the seconds spent
+        """
+        started = time.perf_counter()
+        changes = changes.drop_duplicates(subset='Ticker', keep='last').reset_index(drop=True)
+        positions = [self.position.get(ticker, -1) for ticker in changes['Ticker'].astype(str)]
+        known = np.array(positions, dtype=int) >= 0
+        columns = [col for col in changes.columns if col in self.frame.columns and col != 'Ticker']
+
+        with self._lock:
+            updated = changes[known]
+            rows = np.array(positions, dtype=int)[known]
+            if len(rows):
+                old = self.values[rows]
+                new = old.copy()
+                for j, col in enumerate(self.attributes):
+                    if col in columns:
+                        new[:, j] = pd.to_numeric(updated[col], errors='coerce').to_numpy(dtype=float)
+                self._accumulate(old, -1)
+                self._accumulate(new, 1)
+                self.values[rows] = new
+                for col in columns:
+                    self.frame.loc[rows, col] = updated[col].to_numpy()
+
+            inserted = changes[~known]
+            if len(inserted):
+                inserted = inserted.reindex(columns=self.frame.columns)
+                new_values = self._numeric(inserted)
+                self._accumulate(new_values, 1)
+                start = len(self.frame)
+                self.frame = pd.concat([self.frame, inserted], ignore_index=True)
+                self.values = np.vstack([self.values, new_values])
+                self.scores = np.vstack([self.scores, np.zeros((len(inserted), len(self.models)))])
+                self.position.update({t: start + i for i, t in enumerate(inserted['Ticker'].astype(str))})
+                rows = np.concatenate([rows, np.arange(start, len(self.frame))])
+
+            drift = self.drift()
+            full = drift > self.tolerance
+            if full:
+                self.basis = self.applied = self.averages()
+                self.scores = self._score(self.values)
+                rescored = len(self.frame)
+            else:
+                self.scores[rows] = self._score(self.values[rows])
+                rescored = len(rows)
+            self.rescored_rows += rescored
+
+            self.last_report = {
+                'changed': int(known.sum()),
+                'inserted': int((~known).sum()),
+                'drift': round(drift, 6),
+                'full': bool(full),
+                'rescored': rescored,
+                'seconds': round(time.perf_counter() - started, 6)
+            }
+        return self.last_report
+
+    def _accumulate(self, values, sign):
+        self.sums += sign * np.nansum(values, axis=0)
+        self.counts += sign * np.count_nonzero(~np.isnan(values), axis=0)
+
+    def tables(self, stock_types=None):
+        """Current strength tables, in the format of StrengthEngine.calculate_all"""
+        names = [model.name for model in self.models]
+        stock_types = names if stock_types is None else stock_types
+        for stock_type in stock_types:
+            if stock_type not in names:
+                raise ValueError(f"Strength model {stock_type} is not scored here, expected one of {names}")
+        columns = [names.index(stock_type) for stock_type in stock_types]
+        with self._lock:
+            return self.engine.tables(self.frame, self.scores[:, columns], [self.models[i] for i in columns])
@@ -40,6 +40,7 @@ setup(
         "dev": [
             "pytest>=6.0",
             "pytest-cov>=2.0",
+            "pytest-benchmark>=4.0",
             "black>=21.0",
             "flake8>=3.8",
             "mypy>=0.800",
@@ -22,7 +22,8 @@ import utilities.helper as helper
 from services.chart import chart
 from services.portfolio import portfolio as buildPortfolio
 from services.screener import Screener
-from services.strengthCalculator import StrengthCalculator
+from services.sector_aggregates import sector_aggregates
+from services.strengthCalculator import STRENGTH_PORTFOLIO_COLUMNS, StrengthCalculator
 from services.async_scheduler import (
     start_scheduler, 
     stop_scheduler, 
@@ -41,6 +42,19 @@ strengthCalculator = StrengthCalculator()
 chart = chart()
 
 
+def _portfolio_candidates(stock_type, sector, index, count, max_stock_price, risk_tolerance, keep_risk_filter=False,
+                          columns=None):
+    """Top stocks from the strength index, or the whole strength table when it is not cached
+    
+    columns narrows the fallback table to what the caller reads.
+    """
+    candidates = buildPortfolio.get_top_strength_stocks(
+        stock_type, sector, index, count, max_stock_price, risk_tolerance, keep_risk_filter
+    )
+    if candidates is not None:
+        return candidates
+    return strengthCalculator.calculate_strength_value(stock_type, sector, index, columns)
+
 
 @main.route('/api/home', methods=['GET'])
 def api_home():
@@ -93,10 +107,14 @@ def api_portfolio():
             
             if btn_value == "Build":
                 current_app.logger.info("Building top stock portfolio")
-                strength_df = strengthCalculator.calculate_strength_value(
-                    sector=request.form.get('sector'), 
-                    index=request.form.get('index'),
-                    stock_type=request.form.get('stock_type')
+                strength_df = _portfolio_candidates(
+                    request.form.get('stock_type'),
+                    request.form.get('sector'),
+                    request.form.get('index'),
+                    5,
+                    request.form.get('max_stock_price'),
+                    request.form.get('risk_tolerance'),
+                    keep_risk_filter=True
                 )
                 portfolio = buildPortfolio.build_portfolio_with_top_stocks(
                     strength_df,
@@ -169,7 +187,23 @@ def api_stock_data():
     screenerService.update_key_sector_and_index(sector=sector, index=index)
     
     stock_data = screenerService.get_screener_data()
-    return jsonify({'data': stock_data.to_dict('records')})
+    return jsonify({'data': stock_data.to_dict('records'),
+                    'averages': sector_aggregates.get_group(index, sector)})
+
+@main.route('/api/sector/aggregates', methods=['GET'])
+def api_sector_aggregates():
+    """API endpoint for precomputed sector statistics"""
+    index = request.args.get('index')
+    sector = request.args.get('sector')
+    
+    if index and sector:
+        group = sector_aggregates.get_group(index, sector)
+        if not group:
+            return jsonify({'error': f'No aggregates for {index}:{sector}'}), 404
+        return jsonify({'version': sector_aggregates.version, 'data': group})
+    
+    document = sector_aggregates.get_document()
+    return jsonify({'version': document.get('version'), 'data': document.get('groups', {})})
     
 @main.route('/api/delete-portfolio/<portfolio_id>', methods=['POST'])
 @login_required
@@ -247,25 +281,51 @@ def api_build_portfolio_data():
 
 @main.route('/api/chart/<chart_type>', methods=['GET'])
 def api_chart(chart_type):
-    """API endpoint for chart data"""
+    """API endpoint for chart data, served as the pre-encoded payload of the chart document"""
     try:
-        if chart_type == 'value':
-            logging.info('Getting value chart data')
-            charts = chart.get_chart_data(enum.StockType.VALUE.value)
-        elif chart_type == 'growth':
-            charts = chart.get_chart_data(enum.StockType.GROWTH.value)
-        elif chart_type == 'dividend':
-            charts = chart.get_chart_data(enum.StockType.DIVIDEND.value)
-        else:
+        stock_types = {
+            'value': enum.StockType.VALUE.value,
+            'growth': enum.StockType.GROWTH.value,
+            'dividend': enum.StockType.DIVIDEND.value,
+        }
+        if chart_type not in stock_types:
             return jsonify({'error': 'Invalid chart type'}), 400
         
-        return jsonify({'data': charts})
+        payload = chart.get_chart_payload(stock_types[chart_type])
+        return current_app.response_class(payload, mimetype='application/json')
     except Exception as e:
         current_app.logger.error(f"Error fetching chart data: {e}")
         import traceback
         current_app.logger.error(f"Traceback: {traceback.format_exc()}")
         return jsonify({'error': str(e)}), 500
 
+@main.route('/api/chart/<chart_type>/history', methods=['GET'])
+def api_chart_history(chart_type):
+    """API endpoint for sector time series, downsampled to the requested pixel width"""
+    try:
+        stock_types = {
+            'value': enum.StockType.VALUE.value,
+            'growth': enum.StockType.GROWTH.value,
+            'dividend': enum.StockType.DIVIDEND.value,
+        }
+        if chart_type not in stock_types:
+            return jsonify({'error': 'Invalid chart type'}), 400
+
+        try:
+            history = chart.get_history(
+                stock_types[chart_type],
+                days=int(request.args.get('days', 90)),
+                width=int(request.args.get('width', 300)),
+                mode=request.args.get('mode', 'lttb'),
+                metric=request.args.get('metric'),
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(history)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching chart history: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @main.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
     """Clear all cached data"""
@@ -494,8 +554,8 @@ def api_advanced_portfolio():
         
         current_app.logger.info(f"Advanced optimization parameters: method={method}, amount={investing_amount}, max_price={max_stock_price}")
         
-        # Get strength data
-        strength_df = strengthCalculator.calculate_strength_value(stock_type, sector, index)
+        # Get the strongest stocks passing the filters
+        strength_df = _portfolio_candidates(stock_type, sector, index, 10, max_stock_price, risk_tolerance)
         
         if strength_df.empty:
             return jsonify({'success': False, 'error': 'No strength data available'})
@@ -539,8 +599,9 @@ def api_compare_optimization_methods():
         index = data.get('index', 'S&P 500')
         stock_type = data.get('stock_type', 'Value')
         
-        # Get strength data
-        strength_df = strengthCalculator.calculate_strength_value(stock_type, sector, index)
+        # Get the strongest stocks passing the filters
+        strength_df = _portfolio_candidates(stock_type, sector, index, 10, max_stock_price, risk_tolerance,
+                                            columns=STRENGTH_PORTFOLIO_COLUMNS)
         
         if strength_df.empty:
             return jsonify({'success': False, 'error': 'No strength data available'})
@@ -599,8 +660,8 @@ def api_portfolio_backtest():
         index = data.get('index', 'S&P 500')
         stock_type = data.get('stock_type', 'Value')
         
-        # Get strength data
-        strength_df = strengthCalculator.calculate_strength_value(stock_type, sector, index)
+        # Get the strongest stocks passing the filters
+        strength_df = _portfolio_candidates(stock_type, sector, index, 10, max_stock_price, risk_tolerance)
         
         if strength_df.empty:
             return jsonify({'success': False, 'error': 'No strength data available'})
@@ -3,9 +3,13 @@ import threading
 import time
 from datetime import datetime
 
+import pandas as pd
 import schedule
 
 from services.annualReturn import AnnualReturn
+from services.chart import materialize_charts
+from services.covariance import covariance_engine
+from services.sector_aggregates import sector_aggregates
 from services.sourceDataMapper import SourceDataMapperService
 from services.strengthCalculator import StrengthCalculator
 from utilities.redis_data import redis_manager
@@ -31,6 +35,7 @@ class DataScheduler:
             # Define indices to cache
             indices = ['S&P 500', 'DJIA']
             
+            sector_frames = []
             for index in indices:
                 # Fetch and cache general data first
                 logger.info(f"Fetching and caching general {index} data")
@@ -47,14 +52,32 @@ class DataScheduler:
                     if not df.empty:
                         redis_manager.save_stock_data(df, index, sector)
                         logger.info(f"Cached {index}:{sector} data with {len(df)} records")
+                        sector_frames.append(df)
+                        self._update_strength(index, sector, df)
                     else:
                         logger.warning(f"No data found for {index}:{sector}")
             
+            # One groupby over every index/sector, including the per-index rollups
+            if sector_frames:
+                sector_aggregates.refresh(pd.concat(sector_frames, ignore_index=True), rollup=True)
+                
+                # Charts read the stock data and the aggregates just published
+                materialize_charts()
+            
             logger.info("Completed scheduled stock data fetch and cache")
             
         except Exception as e:
             logger.error(f"Error in scheduled stock data fetch: {e}")
 
+    def _update_strength(self, index, sector, df):
+        """Rescore the changed rows of a precalculated strength dataset"""
+        try:
+            report = self.strength_calculator.refresh_strength(index, sector, df)
+            if report is not None:
+                logger.info(f"Updated strength of {index}:{sector}: {report['rescored']} rows rescored")
+        except Exception as e:
+            logger.warning(f"Failed to update strength of {index}:{sector}: {e}")
+
     def fetch_and_cache_annual_returns(self):
         """Fetch and cache annual returns data"""
         logger.info("Starting scheduled annual returns fetch and cache")
@@ -68,6 +91,13 @@ class DataScheduler:
             if not annual_returns_df.empty:
                 redis_manager.save_annual_returns(annual_returns_df)
                 logger.info(f"Cached annual returns data with {len(annual_returns_df)} records")
+                
+                # Multi-horizon metrics reuse the price history the returns just refreshed
+                metrics_df = self.annual_return.get_return_metrics(annual_returns_df['Ticker'].tolist())
+                logger.info(f"Cached return metrics for {len(metrics_df)} tickers")
+                
+                # One covariance of the whole universe; optimizations slice it
+                covariance_engine.refresh(annual_returns_df['Ticker'].tolist())
             else:
                 logger.warning("No annual returns data to cache")
             
@@ -85,9 +115,11 @@ class DataScheduler:
             self.strength_calculator.clear_strength_cache()
             
             # Precalculate all strength data combinations
-            self.strength_calculator.precalculate_all_strength_data()
+            report = self.strength_calculator.precalculate_all_strength_data()
+            if report['failed']:
+                logger.warning(f"Strength precalculation failed for {report['failed']}")
             
-            logger.info("Completed scheduled strength data precalculation")
+            logger.info(f"Completed scheduled strength data precalculation in {report['seconds']:.1f}s")
             
         except Exception as e:
             logger.error(f"Error in scheduled strength data precalculation: {e}")
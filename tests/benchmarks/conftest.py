@@ -0,0 +1,87 @@
+"""
+Offline finviz fixtures for the parser benchmarks
+
+Every module that imported ``web_scrap`` gets a replacement that serves the
+matching page from tests/fixtures/finviz instead of the network.
+"""
+
+import os
+import re
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+import pytest
+from bs4 import BeautifulSoup
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fixtures', 'finviz')
+
+SCRAPING_MODULES = [
+    'finvizfinance.quote',
+    'finvizfinance.news',
+    'finvizfinance.insider',
+    'finvizfinance.group.overview',
+    'finvizfinance.screener.overview',
+]
+
+_pages = {}
+
+
+def fixture_name(url):
+    """Map a finviz url to the fixture file that was recorded for it"""
+    if 'screener.ashx' in url:
+        v_page = re.search(r'v=(\d+)', url).group(1)
+        row = re.search(r'&r=(\d+)', url)
+        page = (int(row.group(1)) - 1) // 20 + 1 if row else 1
+        return f'screener_v{v_page}_p{page}.html'
+    if 'groups.ashx' in url:
+        return 'group_v{}.html'.format(re.search(r'v=(\d+)', url).group(1))
+    if 'quote.ashx' in url:
+        return 'quote.html'
+    if 'news.ashx' in url:
+        return 'news.html'
+    if 'insidertrading.ashx' in url:
+        return 'insider.html'
+    raise ValueError(f'No fixture recorded for {url}')
+
+
+def load_page(name):
+    if name not in _pages:
+        with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as fh:
+            _pages[name] = fh.read()
+    return _pages[name]
+
+
+def offline_web_scrap(url):
+    """Parse the recorded page the same way util.web_scrap parses a response"""
+    return BeautifulSoup(load_page(fixture_name(url)), 'lxml')
+
+
+@pytest.fixture
+def offline_finviz(monkeypatch):
+    import importlib
+    for module_name in SCRAPING_MODULES:
+        module = importlib.import_module(module_name)
+        monkeypatch.setattr(module, 'web_scrap', offline_web_scrap)
+    # Paging sleeps would dominate the timings
+    monkeypatch.setattr('finvizfinance.screener.overview.sleep', lambda seconds: None)
+    yield
+
+
+@pytest.fixture
+def measure(benchmark):
+    """Benchmark a parser and record rows/sec and peak memory in extra_info"""
+    def run(func, rows_of):
+        result = benchmark(func)
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = rows_of(result)
+        benchmark.extra_info['rows'] = rows
+        benchmark.extra_info['peak_memory_kb'] = peak / 1024
+        if benchmark.stats:  # None with --benchmark-disable
+            benchmark.extra_info['rows_per_sec'] = rows / benchmark.stats.stats.mean
+        return result
+    return run
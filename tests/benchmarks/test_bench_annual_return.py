@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cross-sectional return/volatility computation
+
+Run with: python -m pytest tests/benchmarks --benchmark-only
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.annualReturn import AnnualReturn
+from test_return_metrics import loop_return_metrics, ragged_closes
+
+
+@pytest.mark.parametrize('num_tickers', [500, 5000])
+def test_vectorized_return_metrics(benchmark, num_tickers):
+    closes = ragged_closes(num_tickers)
+    result = benchmark(AnnualReturn().compute_return_metrics, closes)
+    benchmark.extra_info['tickers'] = num_tickers
+    assert len(result) == num_tickers - 2  # the empty and single-close tickers drop out
+
+
+def test_loop_return_metrics(benchmark):
+    closes = ragged_closes(500)
+    result = benchmark.pedantic(loop_return_metrics, args=(closes,), rounds=3)
+    benchmark.extra_info['tickers'] = 500
+    assert len(result) == 498
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the finvizfinance parsers against the offline fixture corpus
+
+Run with: python -m pytest tests/benchmarks --benchmark-only
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, is_string_dtype
+
+from finvizfinance.util import NUMBER_COL
+
+SCREENER_ROWS = 33  # 20 rows on page 1 + 13 rows on page 2
+
+
+def assert_number_column(series):
+    """Number columns hold floats (None for '-'), even when the frame dtype is object"""
+    if is_numeric_dtype(series):
+        return
+    assert series.dropna().map(type).eq(float).all(), series.name
+
+
+def _screener(view):
+    from finvizfinance.screener.overview import Overview
+    from finvizfinance.screener.valuation import Valuation
+    from finvizfinance.screener.financial import Financial
+    from finvizfinance.screener.ownership import Ownership
+    from finvizfinance.screener.performance import Performance
+    from finvizfinance.screener.technical import Technical
+    return {
+        'overview': Overview,
+        'valuation': Valuation,
+        'financial': Financial,
+        'ownership': Ownership,
+        'performance': Performance,
+        'technical': Technical,
+    }[view]()
+
+
+@pytest.mark.parametrize('view', ['overview', 'valuation', 'financial', 'ownership', 'performance', 'technical'])
+def test_screener_view(offline_finviz, measure, view):
+    screener = _screener(view)
+    screener.set_filter(filters_dict={'Index': 'S&P 500', 'Sector': 'Technology'})
+
+    df = measure(lambda: screener.screener_view(verbose=0, sleep_sec=0), len)
+
+    assert df.shape[0] == SCREENER_ROWS
+    assert df['Ticker'].is_unique
+    assert is_string_dtype(df['Ticker'])
+    for col in df.columns:
+        if col in NUMBER_COL:
+            assert_number_column(df[col])
+
+
+@pytest.mark.parametrize('view', ['overview', 'valuation'])
+def test_group_screener_view(offline_finviz, measure, view):
+    from finvizfinance.group.overview import Overview
+    from finvizfinance.group.valuation import Valuation
+    group = {'overview': Overview, 'valuation': Valuation}[view]()
+
+    df = measure(lambda: group.screener_view(group='Sector', order='Name'), len)
+
+    assert df.shape[0] == 11
+    assert is_string_dtype(df['Name'])
+    for col in df.columns[2:]:
+        assert is_numeric_dtype(df[col]), col
+
+
+def test_quote_full_info(offline_finviz, measure):
+    from finvizfinance.quote import finvizfinance
+
+    def parse():
+        return finvizfinance('AAPL').ticker_full_info()
+
+    info = measure(parse, lambda info: sum(len(v) for v in info.values()))
+
+    assert info['fundament']['Sector'] == 'Technology'
+    assert len(info['fundament']) > 70
+    assert info['ratings_outer'].shape == (25, 5)
+    assert info['news'].shape == (100, 3)
+    assert pd.api.types.is_datetime64_any_dtype(info['news']['Date'])
+    assert info['inside trader'].shape[0] == 40
+    assert is_numeric_dtype(info['inside trader']['Value ($)'])
+
+
+def test_news(offline_finviz, measure):
+    from finvizfinance.news import News
+
+    news = measure(lambda: News().get_news(), lambda news: len(news['news']) + len(news['blogs']))
+
+    assert news['news'].shape == (100, 4)
+    assert news['blogs'].shape == (100, 4)
+    assert list(news['news'].columns) == ['Date', 'Title', 'Source', 'Link']
+
+
+def test_insider(offline_finviz, measure):
+    from finvizfinance.insider import Insider
+
+    df = measure(lambda: Insider().get_insider(), len)
+
+    assert df.shape == (100, 11)
+    for col in ['Cost', '#Shares', 'Value ($)', '#Shares Total']:
+        assert is_numeric_dtype(df[col]), col
+
+
+def test_earnings_partition(offline_finviz, measure):
+    from finvizfinance.earnings import Earnings
+
+    def partition():
+        return Earnings('This Week').partition_days(mode='financial')
+
+    days = measure(partition, lambda days: sum(len(df) for df in days.values()))
+
+    assert sum(len(df) for df in days.values()) == SCREENER_ROWS
+    assert all(df['Earnings'].nunique() == 1 for df in days.values())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark the prefix-sum portfolio sizing against the recursive search
+
+Run with: python -m pytest tests/benchmarks --benchmark-only
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from services.optimization import optimal_number_of_stocks, optimization, prefix_expected_returns
+from test_optimization import RecursiveOptimization, candidates
+
+
+@pytest.mark.parametrize('num_rows', [50, 500])
+def test_prefix_sizing(benchmark, num_rows):
+    df = candidates(num_rows, 0)
+    strength, expected_return = df['strength'].to_numpy(), df['expected_annual_return'].to_numpy()
+    count = benchmark(lambda: optimal_number_of_stocks(prefix_expected_returns(strength, expected_return),
+                                                       num_rows, 1, 20))
+    benchmark.extra_info['rows'] = num_rows
+    assert 1 <= count <= num_rows
+
+
+@pytest.mark.parametrize('num_rows', [50, 500])
+def test_prefix_optimize(benchmark, num_rows):
+    df = candidates(num_rows, 0)
+    result = benchmark(optimization().optimize_expected_return, df, num_rows, 1, 20)
+    benchmark.extra_info['rows'] = num_rows
+    assert not result.empty
+
+
+@pytest.mark.parametrize('num_rows', [50, 500])
+def test_recursive_optimize(benchmark, num_rows):
+    df = candidates(num_rows, 0)
+    result = benchmark(lambda: RecursiveOptimization().optimize_expected_return(df, num_rows, 1, 20))
+    benchmark.extra_info['rows'] = num_rows
+    assert not result.empty
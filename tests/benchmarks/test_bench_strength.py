@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark the matrix strength engine against the per-attribute loop
+
+Run with: python -m pytest tests/benchmarks --benchmark-only
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from enums.enum import StockType
+from services.strength_engine import FactorModelRegistry, IncrementalStrength, StrengthEngine, strength_models
+from test_strength_engine import averages, loop_calculate_strength, strength_frame
+
+
+@pytest.mark.parametrize('num_rows', [500, 10000])
+def test_matrix_strength(benchmark, num_rows):
+    df = strength_frame(num_rows)
+    avg = averages(df)
+    result = benchmark(StrengthEngine().calculate, df, avg, StockType.VALUE.value)
+    benchmark.extra_info['rows'] = num_rows
+    assert len(result) == num_rows
+
+
+@pytest.mark.parametrize('num_rows', [500, 10000])
+def test_loop_strength(benchmark, num_rows):
+    df = strength_frame(num_rows)
+    avg = averages(df)
+    result = benchmark(lambda: loop_calculate_strength(df.copy(), avg, StockType.VALUE.value))
+    benchmark.extra_info['rows'] = num_rows
+    assert len(result) == num_rows
+
+
+@pytest.mark.parametrize('num_rows', [500, 10000])
+def test_matrix_score_only(benchmark, num_rows):
+    """The scoring product alone, without the frame-wide rounding and sort"""
+    df = strength_frame(num_rows)
+    avg = averages(df)
+    scores = benchmark(StrengthEngine().score, df, avg, StockType.VALUE.value)
+    benchmark.extra_info['rows'] = num_rows
+    assert scores.shape == (num_rows,)
+
+
+@pytest.mark.parametrize('num_rows', [500, 10000])
+def test_incremental_single_ticker_update(benchmark, num_rows):
+    """One changed ticker within tolerance, against rescoring the dataset"""
+    df = strength_frame(num_rows)
+    state = IncrementalStrength(df, tolerance=0.05)
+    changes = df.iloc[[3]][['Ticker', 'pe']]
+    report = benchmark(state.update, changes)
+    benchmark.extra_info['rows'] = num_rows
+    assert report['rescored'] == 1
+
+
+@pytest.mark.parametrize('num_models', [2, 8])
+def test_scores_of_many_models(benchmark, num_models):
+    """Extra factor models only add columns to the one product"""
+    registry = FactorModelRegistry()
+    for model in strength_models.models():
+        registry.register(model.name, model.weights)
+    for i in range(num_models - 2):
+        registry.register(f'Tilt{i}', {'dividend': 1 + i, 'beta': -1, 'return_risk_ratio': 0.5 * i})
+    df = strength_frame(10000)
+    avg = averages(df)
+    scores = benchmark(StrengthEngine(registry=registry).scores, df, avg, registry.models())
+    benchmark.extra_info['models'] = num_models
+    assert scores.shape == (10000, num_models)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark joining annual returns onto a full S&P 500 screener frame
+
+Run with: python -m pytest tests/benchmarks --benchmark-only
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import services.annualReturn as annual_return_module
+from services.annualReturn import AnnualReturn
+from utilities.constant import METRIC_SCHEMA, SECTORS
+
+NUM_TICKERS = 503
+NUM_EXTRA_COLUMNS = 45  # the other finviz views add about this many numeric columns
+
+
+def sp500_frame(num_tickers=NUM_TICKERS):
+    """Screener frame shaped like the cached S&P 500 data, as read back from Redis"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'Ticker': [f'T{i:03d}' for i in range(num_tickers)],
+        'Sector': [SECTORS[i % len(SECTORS)] for i in range(num_tickers)],
+        'Index': 'S&P 500',
+        'Last_Updated': '2024-06-03T15:00:00',
+        'Earnings': 'Jul 25/a',
+    })
+    for name in list(METRIC_SCHEMA.values()) + [f'metric_{j}' for j in range(NUM_EXTRA_COLUMNS)]:
+        values = rng.normal(10, 5, num_tickers)
+        values[rng.random(num_tickers) < 0.05] = np.nan
+        df[name] = values
+    # JSON round trips through Redis hand back rows as records
+    return pd.DataFrame(df.to_dict(orient='records'))
+
+
+def annual_returns(tickers):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'expected_annual_return': rng.normal(0.1, 0.1, len(tickers)),
+        'expected_annual_risk': rng.uniform(0.1, 0.8, len(tickers)),
+        'return_risk_ratio': rng.normal(0.5, 0.3, len(tickers)),
+    })
+
+
+def legacy_update_with_return_data(df, return_rate):
+    """The per-column conversion pipeline the schema replaced, for comparison"""
+    for a in ['insider_own', 'dividend', 'roi', 'roe']:
+        df[a] = np.round(df[a].astype(float), decimals=3)
+    df = pd.merge(df, return_rate, on='Ticker', how='inner')
+    df = np.round(df, decimals=3)
+    df = df.drop_duplicates()
+    df = df.replace(np.nan, 0)
+    string_columns = ['Ticker', 'Sector', 'Index', 'Last_Updated', 'Earnings']
+    for col in df.columns:
+        if col in string_columns:
+            df[col] = df[col].astype(str)
+        else:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df
+
+
+@pytest.fixture
+def annual_return(monkeypatch):
+    annual_return = AnnualReturn()
+    monkeypatch.setattr(annual_return, 'get_returns_for_tickers', annual_returns)
+    monkeypatch.setattr(annual_return_module.redis_manager, 'get_return_metrics', lambda: pd.DataFrame())
+    return annual_return
+
+
+def test_schema_update_with_return_data(benchmark, annual_return):
+    screen = sp500_frame()
+    result = benchmark(annual_return.update_with_return_data, screen)
+    benchmark.extra_info['rows'] = len(screen)
+    assert len(result) == NUM_TICKERS
+    assert result['Sector'].dtype == 'category'
+    assert not result.isna().any().any()
+
+
+def test_legacy_update_with_return_data(benchmark, annual_return):
+    screen = sp500_frame()
+    return_rate = annual_returns(screen['Ticker'].tolist())
+    result = benchmark(lambda: legacy_update_with_return_data(screen.copy(), return_rate))
+    benchmark.extra_info['rows'] = len(screen)
+
+    expected = annual_return.update_with_return_data(screen)
+    assert list(result.columns) == list(expected.columns)
+    numeric = expected.select_dtypes('number').columns
+    assert np.allclose(result[numeric].to_numpy(), expected[numeric].to_numpy())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test that the async annual return API keeps the event loop free
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import services.message_queue as message_queue
+from services.annualReturn import AnnualReturn
+
+
+class SlowAnnualReturn(AnnualReturn):
+    """Blocking get_annual_return that records how many chunks run at once"""
+
+    def __init__(self, seconds=0.1, slow_tickers=()):
+        super().__init__()
+        self.seconds = seconds
+        self.slow_tickers = set(slow_tickers)
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_annual_return(self, ticker_list):
+        with self._lock:
+            self.started.append(tuple(ticker_list))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(1.0 if self.slow_tickers & set(ticker_list) else self.seconds)
+        with self._lock:
+            self.running -= 1
+        return pd.DataFrame({'Ticker': ticker_list, 'expected_annual_return': 0.1,
+                             'expected_annual_risk': 0.2, 'return_risk_ratio': 0.5})
+
+
+def test_gather_limits_concurrency_without_blocking_the_loop():
+    annual_return = SlowAnnualReturn()
+    tickers = [f'T{i}' for i in range(8)]
+
+    async def main():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.ensure_future(heartbeat())
+        results = await annual_return.gather_result(tickers, chunk_size=2, max_concurrency=2)
+        beat.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert [list(df['Ticker']) for df in results] == [tickers[i:i + 2] for i in range(0, 8, 2)]
+    assert annual_return.peak == 2
+    # two rounds of 0.1s downloads leave plenty of room for other coroutines
+    assert ticks >= 10
+
+
+def test_chunk_timeout_returns_empty_frame():
+    annual_return = SlowAnnualReturn(slow_tickers={'SLOW'})
+    results = asyncio.run(annual_return.gather_result(['A', 'SLOW', 'B'], chunk_size=1, timeout=0.3))
+    assert [len(df) for df in results] == [1, 0, 1]
+
+
+def test_cancel_stops_chunks_waiting_for_a_slot():
+    annual_return = SlowAnnualReturn(seconds=0.2)
+
+    async def main():
+        task = asyncio.ensure_future(annual_return.gather_result(['A', 'B', 'C', 'D'], chunk_size=1,
+                                                                 max_concurrency=1))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.3)
+
+    asyncio.run(main())
+    assert annual_return.started == [('A',)]
+
+
+def test_handler_saves_per_ticker_returns(monkeypatch):
+    saved = []
+    monkeypatch.setattr('services.annualReturn.AnnualReturn', SlowAnnualReturn)
+    monkeypatch.setattr(message_queue.redis_manager, 'save_ticker_returns', lambda df: saved.append(df) or True)
+
+    result = asyncio.run(message_queue.calculate_annual_returns_handler({'tickers': [f'T{i}' for i in range(25)]}))
+    assert result == {'success': True, 'data_count': 25}
+    assert len(saved) == 1 and len(saved[0]) == 25
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test the per-ticker annual return cache used by update_with_return_data
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import services.annualReturn as annual_return_module
+from services.annualReturn import AnnualReturn
+
+
+class FakeRedis:
+    """The few Redis commands the per-ticker cache uses, kept in a dict"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+        self.ttls[key] = ttl
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def delete(self, *keys):
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match, count=None):
+        prefix = match.rstrip('*')
+        return iter([key for key in list(self.values) if key.startswith(prefix)])
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+
+def _returns(tickers, value):
+    return pd.DataFrame({
+        'Ticker': tickers,
+        'expected_annual_return': value,
+        'expected_annual_risk': 0.3,
+        'return_risk_ratio': value / 0.3,
+    })
+
+
+def _use_fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(annual_return_module.redis_manager, 'r', fake)
+    monkeypatch.setattr(annual_return_module.redis_manager, 'available', True)
+    monkeypatch.setattr(annual_return_module.redis_manager, 'get_return_metrics', lambda: pd.DataFrame())
+    return fake
+
+
+def test_only_missing_and_stale_tickers_are_fetched(monkeypatch):
+    fake = _use_fake_redis(monkeypatch)
+    manager = annual_return_module.redis_manager
+    manager.save_ticker_returns(_returns(['AAA', 'BBB', 'CCC'], 0.1))
+    assert fake.ttls['annual_return:AAA'] == 48 * 60 * 60
+    stale = json.loads(fake.values['annual_return:CCC'])
+    stale['timestamp'] = (datetime.now() - timedelta(hours=30)).isoformat()
+    fake.values['annual_return:CCC'] = json.dumps(stale)
+
+    requested = []
+
+    def download(tickers, chunk_size=50):
+        requested.append(list(tickers))
+        df = _returns(tickers, 0.2)
+        manager.save_ticker_returns(df)
+        return df, []
+
+    annual_return = AnnualReturn()
+    monkeypatch.setattr(annual_return, 'download_annual_returns', download)
+
+    screen = pd.DataFrame({'Ticker': ['DDD', 'AAA', 'CCC', 'BBB'], 'pe': [10.0, 20.0, 30.0, 40.0]})
+    df = annual_return.update_with_return_data(screen)
+
+    assert requested == [['DDD', 'CCC']]
+    assert list(df['Ticker']) == ['DDD', 'AAA', 'CCC', 'BBB']
+    assert list(df['expected_annual_return']) == [0.2, 0.1, 0.2, 0.1]
+
+    # everything is fresh now: the same screen costs no download
+    annual_return.update_with_return_data(screen)
+    assert len(requested) == 1
+
+
+def test_stale_records_are_kept_when_refresh_fails(monkeypatch):
+    fake = _use_fake_redis(monkeypatch)
+    annual_return_module.redis_manager.save_ticker_returns(_returns(['AAA'], 0.1))
+    record = json.loads(fake.values['annual_return:AAA'])
+    record['timestamp'] = (datetime.now() - timedelta(days=1, hours=1)).isoformat()
+    fake.values['annual_return:AAA'] = json.dumps(record)
+
+    annual_return = AnnualReturn()
+    monkeypatch.setattr(annual_return, 'download_annual_returns', lambda tickers: (pd.DataFrame(), list(tickers)))
+
+    df = annual_return.get_returns_for_tickers(['AAA', 'GONE'])
+    assert list(df['Ticker']) == ['AAA']
+    assert df['expected_annual_return'].iloc[0] == 0.1
+
+
+def test_return_metrics_join_keeps_screener_beta(monkeypatch):
+    _use_fake_redis(monkeypatch)
+    manager = annual_return_module.redis_manager
+    manager.save_ticker_returns(_returns(['AAA', 'BBB'], 0.1))
+    metrics = pd.DataFrame({'Ticker': ['AAA', 'BBB'], 'return_1y': [5.0, 7.0], 'beta_spy': [1.4, 0.6]})
+    monkeypatch.setattr(manager, 'get_return_metrics', lambda: metrics)
+
+    screen = pd.DataFrame({'Ticker': ['AAA', 'BBB'], 'pe': [10.0, 20.0], 'beta': [1.2, 0.8]})
+    df = AnnualReturn().update_with_return_data(screen)
+    assert list(df['beta']) == [1.2, 0.8]
+    assert list(df['beta_spy']) == [1.4, 0.6]
+    assert not {'beta_x', 'beta_y'} & set(df.columns)
+
+    # a metrics table cached under the old column name joins the same way
+    monkeypatch.setattr(manager, 'get_return_metrics', lambda: metrics.rename(columns={'beta_spy': 'beta'}))
+    df = AnnualReturn().update_with_return_data(screen)
+    assert list(df['beta']) == [1.2, 0.8] and list(df['beta_spy']) == [1.4, 0.6]
+
+
+def test_unresolvable_tickers_are_not_downloaded_again(monkeypatch):
+    fake = _use_fake_redis(monkeypatch)
+    requested = []
+
+    def process_chunk(chunk, start_date, end_date):
+        requested.append(list(chunk))
+        good = [ticker for ticker in chunk if ticker != 'BAD']
+        return _returns(good, 0.1), [ticker for ticker in chunk if ticker == 'BAD']
+
+    annual_return = AnnualReturn()
+    monkeypatch.setattr(annual_return, '_process_chunk', process_chunk)
+
+    df = annual_return.get_returns_for_tickers(['AAA', 'BAD'])
+    assert list(df['Ticker']) == ['AAA']
+    assert fake.ttls['annual_return_failed:BAD'] == 6 * 60 * 60
+    assert 'annual_return_failed:AAA' not in fake.values
+
+    # the failure marker keeps the next request from downloading it again
+    annual_return.get_returns_for_tickers(['AAA', 'BAD'])
+    assert requested == [['AAA', 'BAD']]
+
+    # clearing the cache forgets records and failures alike
+    assert annual_return_module.redis_manager.clear_annual_returns()
+    assert not [key for key in fake.values if key.startswith('annual_return')]
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the concurrent chunked Yahoo download path of AnnualReturn
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import services.annualReturn as annual_return_module
+from services.annualReturn import AnnualReturn, DownloadRateLimiter
+from utilities.price_store import PriceStore
+
+
+def _prices(start, end, seed):
+    dates = pd.bdate_range(start, end, inclusive='left')
+    close = 100 + np.random.default_rng(seed).normal(0, 1, len(dates)).cumsum()
+    return pd.DataFrame({'Close': close, 'Volume': 1000.0}, index=dates)
+
+
+def test_chunks_retry_failed_tickers_and_save_progressively(tmp_path, monkeypatch):
+    calls = []
+    saves = []
+    lock = threading.Lock()
+    flaky = {'FLAKY'}
+
+    def download(tickers, start, end, **kwargs):
+        with lock:
+            calls.append(tuple(tickers))
+            if 'BOOM' in tickers and len(tickers) > 1:
+                raise ConnectionError('chunk failed')
+            fail_now = flaky & set(tickers)
+            flaky.difference_update(fail_now)
+        frames = {t: _prices(start, end, i) for i, t in enumerate(tickers)
+                  if t not in fail_now and t != 'GONE'}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    monkeypatch.setattr(annual_return_module, 'price_store', PriceStore(str(tmp_path)))
+    monkeypatch.setattr(annual_return_module.yf, 'download', download)
+    monkeypatch.setattr(annual_return_module.redis_manager, 'save_ticker_returns',
+                        lambda df: saves.append(len(df)) or True)
+    monkeypatch.setattr(annual_return_module, 'yahoo_rate_limiter', DownloadRateLimiter(0))
+
+    annual_return = AnnualReturn()
+    annual_return.retry_backoff = 0
+    tickers = ['A', 'B', 'FLAKY', 'C', 'BOOM', 'D', 'GONE', 'E']
+    df, failed = annual_return.download_annual_returns(tickers, chunk_size=3)
+
+    assert sorted(df['Ticker']) == ['A', 'B', 'BOOM', 'C', 'D', 'E', 'FLAKY']
+    assert failed == ['GONE']
+    # only the failed tickers of a chunk are retried, one by one on the last attempt
+    assert ('FLAKY',) in calls and ('A', 'B') not in calls
+    assert calls.count(('C', 'BOOM', 'D')) == 2
+    assert ('C',) in calls and ('BOOM',) in calls and ('D',) in calls
+    assert calls.count(('GONE',)) == 2
+    # the tickers of every finished chunk are saved as it completes
+    assert len(saves) == 3 and sum(saves) == 7
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = DownloadRateLimiter(50)
+    stamps = []
+
+    def call():
+        limiter.wait()
+        stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stamps.sort()
+    assert stamps[-1] - stamps[0] >= 4 * 0.02 * 0.9
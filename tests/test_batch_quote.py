@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test the batch quote API without network access
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+
+import finvizfinance.quote as quote
+from finvizfinance.quote import BatchQuote
+
+QUOTE_PAGE = """
+<html><body>
+<table class="fullview-title">
+  <tr><td>{ticker}</td></tr>
+  <tr><td>{ticker} Inc.</td></tr>
+  <tr><td>Technology | Software | USA</td></tr>
+</table>
+<table class="snapshot-table2">
+  <tr><td>P/E</td><td>{pe}</td><td>Market Cap</td><td>2.5B</td></tr>
+  <tr><td>Dividend %</td><td>1.50%</td><td>Volatility</td><td>1.20% 1.50%</td></tr>
+</table>
+<table class="fullview-news-outer">
+  <tr><td>Jan-05-24 09:30AM</td><td><a href="https://example.com/a">Headline</a></td></tr>
+</table>
+</body></html>
+"""
+
+
+def _fake_web_scrap(calls):
+    def web_scrap(url):
+        ticker = url.split("t=")[1]
+        calls.append(ticker)
+        pe = {"AAPL": "30.50", "MSFT": "35.00"}[ticker]
+        return BeautifulSoup(QUOTE_PAGE.format(ticker=ticker, pe=pe), "html.parser")
+    return web_scrap
+
+
+def test_batch_fundament_loads_each_page_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(quote, "web_scrap", _fake_web_scrap(calls))
+    BatchQuote.clear_cache()
+
+    batch = BatchQuote(max_workers=2, ttl=60)
+    df = batch.ticker_fundament(["aapl", "MSFT", "AAPL"])
+
+    assert sorted(calls) == ["AAPL", "MSFT"]
+    assert list(df.index) == ["AAPL", "MSFT"]
+    assert df.loc["AAPL", "P/E"] == 30.5
+    assert df.loc["MSFT", "Market Cap"] == 2.5e9
+    assert df.loc["MSFT", "Sector"] == "Technology"
+
+    info = batch.ticker_full_info(["AAPL"], raw=False)
+    assert len(info["AAPL"]["news"]) == 1
+    assert sorted(calls) == ["AAPL", "MSFT"]  # served from the cache
+
+
+def test_batch_cache_expires_and_reports_errors(monkeypatch):
+    calls = []
+    monkeypatch.setattr(quote, "web_scrap", _fake_web_scrap(calls))
+    BatchQuote.clear_cache()
+
+    batch = BatchQuote(ttl=0)
+    batch.ticker_full_info(["AAPL"])
+    batch.ticker_full_info(["AAPL", "NOPE"])
+
+    assert calls.count("AAPL") == 2
+    assert "NOPE" in batch.errors
+
+
+def test_raw_and_formatted_fundament_share_one_page(monkeypatch):
+    calls = []
+    monkeypatch.setattr(quote, "web_scrap", _fake_web_scrap(calls))
+    BatchQuote.clear_cache()
+
+    batch = BatchQuote(ttl=60)
+    raw = batch.ticker_full_info(["AAPL"])["AAPL"]
+    formatted = batch.ticker_fundament(["AAPL"])
+    assert calls == ["AAPL"]
+    assert raw["fundament"]["P/E"] == "30.50"
+    assert formatted.loc["AAPL", "P/E"] == 30.5
+
+    # changing a result leaves the cached page alone
+    raw["fundament"]["P/E"] = "0"
+    raw["news"] = None
+    again = batch.ticker_full_info(["AAPL"])["AAPL"]
+    assert again["fundament"]["P/E"] == "30.50" and len(again["news"]) == 1
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Test the single-pass chart computation against the per-sector formulas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import enums.enum as enum
+import services.chart as chart_module
+from services.data_fetcher import DataFetchResult, DataSource
+from utilities.constant import SECTORS
+from utilities.sector_history import SectorHistoryStore
+
+
+def sector_frame(sector, rows=12, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Ticker': [f"{sector[:4].upper()}{i}" for i in range(rows)],
+        'pe': rng.uniform(5, 60, rows),
+        'fpe': rng.uniform(5, 50, rows),
+        'pb': rng.uniform(0.5, 12, rows),
+        'peg': rng.uniform(0.5, 4, rows),
+        'dividend': np.round(rng.uniform(0, 0.06, rows), 4),
+        'Sales Past 5Y': [f"{v:.2f}%" for v in rng.uniform(-10, 60, rows)],
+        'Sector': sector,
+        'Index': 'S&P 500',
+    })
+    df.loc[rng.random(rows) < 0.15, 'pe'] = np.nan
+    return df
+
+
+
+def reference_sector_chart(df, stock_type):
+    """Reference: the per-sector chart methods the single pass replaced
+
+    Scores one sector frame with the original column-by-column formulas and
+    returns the values and labels of its top five stocks.
+    """
+    if stock_type == enum.StockType.VALUE.value:
+        pe = pd.to_numeric(df['pe'], errors='coerce').fillna(50)
+        pb = pd.to_numeric(df['pb'], errors='coerce').fillna(10)
+        dividend = pd.to_numeric(df['dividend'], errors='coerce').fillna(0)
+        df['value_score'] = ((1 / pe.clip(lower=1)) * 40 + (1 / pb.clip(lower=0.1)) * 30
+                             + (dividend * 100) * 30).round(1)
+        top = df.nlargest(5, 'value_score')
+        return top['value_score'].tolist(), top['Ticker'].tolist()
+    if stock_type == enum.StockType.GROWTH.value:
+        fpe = pd.to_numeric(df['fpe'], errors='coerce').fillna(50)
+        peg = pd.to_numeric(df['peg'], errors='coerce').fillna(5)
+        sales = df['Sales Past 5Y'].astype(str).str.replace('%', '').str.replace('-', '0')
+        sales = pd.to_numeric(sales, errors='coerce').fillna(0) / 100
+        df['growth_score'] = (sales.clip(upper=1) * 40 + (1 / peg.clip(lower=0.1)) * 30
+                              + (1 / fpe.clip(lower=1)) * 30).round(1)
+        top = df.nlargest(5, 'growth_score')
+        return top['growth_score'].tolist(), top['Ticker'].tolist()
+    top = df.sort_values(by='dividend', ascending=False).head(5)
+    return (top['dividend'].astype(float) * 100).tolist(), top['Ticker'].tolist()
+
+@pytest.fixture
+def frames(monkeypatch, tmp_path):
+    frames = {sector: sector_frame(sector, seed=i) for i, sector in enumerate(SECTORS)}
+    fetched = []
+
+    def fetch(index, sector):
+        fetched.append(sector)
+        return DataFetchResult(success=True, data=frames[sector].copy(), source=DataSource.FINVIZ)
+
+    monkeypatch.setattr(chart_module, 'fetch_stock_data_sync', fetch)
+    monkeypatch.setattr(chart_module.sector_aggregates, 'get_group',
+                        lambda index, sector: {'mean': {'pe': float(len(sector))}})
+    monkeypatch.setattr(chart_module, 'sector_history', SectorHistoryStore(str(tmp_path)))
+    frames['fetched'] = fetched
+    return frames
+
+
+@pytest.mark.parametrize('stock_type', [enum.StockType.VALUE.value, enum.StockType.GROWTH.value,
+                                        enum.StockType.DIVIDEND.value])
+def test_single_pass_matches_per_sector_charts(monkeypatch, frames, stock_type):
+    # only the last two sectors are missing from the cache
+    cached = pd.concat([frames[sector] for sector in SECTORS[:-2]], ignore_index=True)
+    monkeypatch.setattr(chart_module.redis_manager, 'get_stock_data_sectors', lambda index, sectors: cached.copy())
+
+    service = chart_module.chart()
+    charts = service.calculate_all_chart_data()
+    assert frames['fetched'] == SECTORS[-2:]
+    assert list(charts) == [enum.StockType.VALUE.value, enum.StockType.GROWTH.value, enum.StockType.DIVIDEND.value]
+
+    for sector_chart in charts[stock_type]:
+        values, labels = reference_sector_chart(frames[sector_chart['id']].copy(), stock_type)
+        assert sector_chart['labels'] == labels
+        np.testing.assert_allclose(sector_chart['values'], values)
+        assert sector_chart['averages'] == {'pe': float(len(sector_chart['id']))}
+
+
+def test_missing_columns_and_sectors_give_empty_charts(monkeypatch, frames):
+    cached = frames['Energy'].drop(columns=['pb', 'fpe'])
+    monkeypatch.setattr(chart_module.redis_manager, 'get_stock_data_sectors', lambda index, sectors: cached)
+    monkeypatch.setattr(chart_module, 'fetch_stock_data_sync',
+                        lambda index, sector: DataFetchResult(success=False, data=pd.DataFrame(),
+                                                              source=DataSource.FINVIZ, error='offline'))
+
+    charts = chart_module.chart().calculate_all_chart_data()
+    energy = {c['id']: c for c in charts[enum.StockType.DIVIDEND.value]}['Energy']
+    assert len(energy['labels']) == 5
+    assert all(c['values'] == [] for c in charts[enum.StockType.VALUE.value])
+    assert all(c['labels'] == [] for c in charts[enum.StockType.DIVIDEND.value] if c['id'] != 'Energy')
+
+
+def test_sector_frames_load_with_one_read(monkeypatch):
+    import json
+    from datetime import datetime, timedelta
+    from utilities.redis_data import redis_manager
+
+    def blob(sector, age_hours):
+        timestamp = (datetime.now() - timedelta(hours=age_hours)).isoformat()
+        records = sector_frame(sector, rows=3).drop(columns=['Sector']).to_dict(orient='records')
+        return json.dumps({'data': records, 'timestamp': timestamp})
+
+    calls = []
+
+    class FakeRedis:
+        def mget(self, keys):
+            calls.append(keys)
+            return [blob('Energy', 1), None, blob('Utilities', 200)]
+
+    monkeypatch.setattr(redis_manager, 'r', FakeRedis())
+    monkeypatch.setattr(redis_manager, 'available', True)
+    df = redis_manager.get_stock_data_sectors('S&P 500', ['Energy', 'Technology', 'Utilities'])
+    assert calls == [['stock_data:S&P 500:Energy', 'stock_data:S&P 500:Technology', 'stock_data:S&P 500:Utilities']]
+    assert list(df['Sector']) == ['Energy'] * 3  # missing and stale sectors have no rows
+
+
+def test_charts_are_materialized_once_and_served_encoded(monkeypatch, frames):
+    import json
+    from utilities.redis_data import redis_manager
+
+    class FakeRedis:
+        def __init__(self):
+            self.hashes = {}
+
+        def pipeline(self):
+            return self
+
+        def execute(self):
+            return []
+
+        def delete(self, key):
+            self.hashes.pop(key, None)
+
+        def hset(self, key, mapping):
+            self.hashes.setdefault(key, {}).update(mapping)
+
+        def expire(self, key, ttl):
+            return True
+
+        def hget(self, key, field):
+            return self.hashes.get(key, {}).get(field)
+
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_manager, 'r', fake)
+    monkeypatch.setattr(redis_manager, 'available', True)
+    monkeypatch.setattr(redis_manager, 'get_stock_data_sectors', lambda index, sectors: pd.DataFrame())
+    monkeypatch.setattr(chart_module.redis_tracker, 'track_data_save', lambda *args, **kwargs: True)
+    monkeypatch.setattr(chart_module.redis_tracker, 'track_data_access', lambda *args, **kwargs: True)
+
+    service = chart_module.chart()
+    payload = service.get_chart_payload(enum.StockType.GROWTH.value)  # no document yet
+    assert len(frames['fetched']) == len(SECTORS)
+    document = fake.hashes['chart_data:S&P 500']
+    assert set(document) == {'Value', 'Growth', 'Dividend', 'version'}
+    assert payload == document['Growth']
+    assert json.loads(payload)['version'] == document['version']
+
+    # later requests read the stored string as is
+    assert service.get_chart_payload(enum.StockType.VALUE.value) is document['Value']
+    assert service.get_chart_data(enum.StockType.DIVIDEND.value) == json.loads(document['Dividend'])['data']
+    assert len(frames['fetched']) == len(SECTORS)
+    assert service.get_chart_payload('Momentum') is None
+
+
+def test_pipeline_stage_charts_only_cached_sectors(monkeypatch, frames):
+    import json
+
+    cached = pd.concat([frames[sector] for sector in SECTORS[:-2]], ignore_index=True)
+    monkeypatch.setattr(chart_module.redis_manager, 'get_stock_data_sectors', lambda index, sectors: cached.copy())
+    monkeypatch.setattr(chart_module.redis_manager, 'save_chart_document', lambda *args: False)
+
+    payloads = chart_module.materialize_charts('S&P 500')
+    assert frames['fetched'] == []
+    value = {c['id']: c for c in json.loads(payloads[enum.StockType.VALUE.value])['data']}
+    assert value[SECTORS[0]]['labels'] and value[SECTORS[-1]]['labels'] == []
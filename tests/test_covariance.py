@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Test the covariance engine and its use by the advanced optimizer
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import services.covariance as covariance_module
+from services.advanced_optimization import AdvancedPortfolioOptimizer
+from services.covariance import (CovarianceEngine, TRADING_DAYS, ewma_covariance, is_psd,
+                                 ledoit_wolf_covariance, repair_psd, sample_covariance)
+from utilities.price_store import PriceStore
+from utilities.redis_data import redis_manager
+
+
+def closes(tickers=6, days=300, seed=1):
+    rng = np.random.default_rng(seed)
+    factor = rng.normal(0, 0.01, days)
+    returns = factor[:, None] * np.linspace(0.5, 1.5, tickers) + rng.normal(0, 0.01, (days, tickers))
+    dates = pd.bdate_range('2024-01-01', periods=days)
+    return pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=dates,
+                        columns=[f"T{i}" for i in range(tickers)])
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+    def hset(self, key, mapping):
+        encoded = {k.encode(): v.encode() if isinstance(v, str) else v for k, v in mapping.items()}
+        self.hashes.setdefault(key, {}).update(encoded)
+
+    def expire(self, key, ttl):
+        return True
+
+    def hget(self, key, field):
+        value = self.hashes.get(key, {}).get(field.encode())
+        return value.decode() if value is not None else None
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_manager, 'r', fake)
+    monkeypatch.setattr(redis_manager, 'raw', fake)
+    monkeypatch.setattr(redis_manager, 'available', True)
+    return fake
+
+
+def test_estimators_match_references():
+    returns = closes().pct_change().dropna().to_numpy()
+    np.testing.assert_allclose(sample_covariance(returns), np.cov(returns, rowvar=False))
+
+    covariance, shrinkage = ledoit_wolf_covariance(returns)
+    assert 0 <= shrinkage <= 1
+    sklearn = pytest.importorskip('sklearn.covariance')
+    reference = sklearn.LedoitWolf().fit(returns)
+    np.testing.assert_allclose(covariance, reference.covariance_)
+    # the numpy fallback gives the same estimate
+    covariance_module.SKLEARN_AVAILABLE, available = False, covariance_module.SKLEARN_AVAILABLE
+    try:
+        fallback, fallback_shrinkage = ledoit_wolf_covariance(returns)
+    finally:
+        covariance_module.SKLEARN_AVAILABLE = available
+    np.testing.assert_allclose(fallback, reference.covariance_)
+    assert fallback_shrinkage == pytest.approx(reference.shrinkage_)
+
+    # an infinite half-life weighs every day the same
+    np.testing.assert_allclose(ewma_covariance(returns, halflife=np.inf), np.cov(returns, rowvar=False))
+    recent = ewma_covariance(returns, halflife=5)
+    assert not np.allclose(recent, np.cov(returns, rowvar=False))
+
+
+def test_repair_keeps_variances_and_makes_psd():
+    broken = np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]]) * 0.04
+    assert not is_psd(broken)
+    repaired = repair_psd(broken)
+    assert is_psd(repaired)
+    np.testing.assert_allclose(np.diag(repaired), np.diag(broken))
+    np.testing.assert_allclose(repaired, repaired.T)
+    good = np.cov(closes().pct_change().dropna().to_numpy(), rowvar=False)
+    np.testing.assert_array_equal(repair_psd(good), good)
+
+
+@pytest.mark.parametrize('method', ['sample', 'ledoit_wolf', 'ewma'])
+def test_estimate_handles_ragged_histories(method):
+    prices = closes(tickers=5)
+    prices.iloc[:200, 3] = np.nan  # listed late: 99 returns
+    prices.iloc[:280, 4] = np.nan  # too little history
+    covariance = CovarianceEngine(method=method, window=252).estimate(prices)
+    assert list(covariance.columns) == ['T0', 'T1', 'T2', 'T3']
+    assert is_psd(covariance.to_numpy())
+
+    if method == 'sample':
+        returns = prices[['T0', 'T1']].pct_change().iloc[1:].tail(252)
+        np.testing.assert_allclose(covariance.loc[['T0', 'T1'], ['T0', 'T1']], returns.cov() * TRADING_DAYS)
+    with pytest.raises(ValueError):
+        CovarianceEngine(method='shrunk')
+
+
+def test_refresh_publishes_and_subsets_are_slices(fake_redis, tmp_path, monkeypatch):
+    store = PriceStore(str(tmp_path))
+    prices = closes(tickers=8)
+    for ticker in prices.columns:
+        frame = pd.DataFrame({'Open': prices[ticker], 'High': prices[ticker], 'Low': prices[ticker],
+                              'Close': prices[ticker], 'Volume': 1.0})
+        store.append(ticker, frame)
+    monkeypatch.setattr(covariance_module, 'price_store', store)
+
+    engine = CovarianceEngine(method='sample')
+    version = engine.refresh(end=prices.index[-1])
+    full = engine.estimate(store.read(prices.columns, field='close', adjusted=True))
+
+    # another process loads the published matrix and slices it
+    reader = CovarianceEngine(method='sample')
+    subset = reader.covariance(['T5', 'NOPE', 'T1'])
+    assert reader.version == version
+    assert list(subset.index) == ['T5', 'T1']
+    np.testing.assert_allclose(subset, full.loc[['T5', 'T1'], ['T5', 'T1']])
+
+    optimizer = AdvancedPortfolioOptimizer()
+    monkeypatch.setattr('services.advanced_optimization.covariance_engine', reader)
+    df = pd.DataFrame({'Ticker': ['T1', 'NEW', 'T5'], 'price': [10.0, 20.0, 30.0],
+                       'expected_annual_return': [12.0, 8.0, 15.0], 'expected_annual_risk': [20.0, 30.0, 25.0]})
+    returns, covariance, tickers = optimizer.calculate_returns_and_covariance(df)
+    assert tickers == ['T1', 'NEW', 'T5']
+    assert covariance[1, 1] == 900.0 and covariance[0, 1] == 0.0
+    assert covariance[0, 2] == pytest.approx(full.loc['T1', 'T5'] * 100 ** 2)
+    assert is_psd(covariance)
+
+
+def test_readers_check_the_version_once_per_interval(fake_redis, monkeypatch):
+    checks = []
+    monkeypatch.setattr(covariance_module.redis_manager, 'get_covariance_version',
+                        lambda method: checks.append(method))
+
+    reader = CovarianceEngine(method='sample', check_seconds=60)
+    for _ in range(50):
+        reader.covariance(['T1', 'T2'])
+    assert len(checks) == 1
+
+    reader.check_seconds = 0
+    reader.covariance(['T1'])
+    assert len(checks) == 2
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test the pooled finvizfinance session manager against a local HTTP server
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from finvizfinance.util import SessionManager, web_scrap, session_manager
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """Answer 503 for the first request of each path ending in /flaky, 200 otherwise"""
+
+    seen = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            first = self.path not in self.seen
+            self.seen.add(self.path)
+        if self.path.endswith("/flaky") and first:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.endswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"<html><body><p id='ok'>ok</p></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _FlakyHandler.seen = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(httpd.server_address[1])
+    httpd.shutdown()
+
+
+def test_sessions_are_thread_local():
+    manager = SessionManager(pool_maxsize=4)
+    main_session = manager.get_session()
+    assert manager.get_session() is main_session
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        other_session = executor.submit(manager.get_session).result()
+    assert other_session is not main_session
+
+    adapter = main_session.get_adapter("https://finviz.com")
+    assert adapter._pool_maxsize == 4
+    assert 429 in adapter.max_retries.status_forcelist
+
+
+def test_retry_on_5xx_and_metrics(server):
+    manager = SessionManager(max_retries=2, backoff_factor=0.01, backoff_jitter=0.01)
+    response = manager.get(server + "/flaky")
+    assert response.status_code == 200
+
+    host = server.split("//")[1]
+    metrics = manager.get_metrics()[host]
+    assert metrics["requests"] == 1
+    assert metrics["retries"] == 1
+    assert metrics["errors"] == 0
+    assert metrics["status"] == {200: 1}
+
+
+def test_concurrent_requests_are_counted(server):
+    manager = SessionManager(max_retries=0)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(lambda i: manager.get(server + "/page/{}".format(i)), range(12)))
+    assert all(r.status_code == 200 for r in responses)
+
+    metrics = manager.get_metrics()
+    assert metrics[server.split("//")[1]]["requests"] == 12
+    assert 1 <= metrics["_sessions"] <= 4
+
+    manager.close()
+    assert manager.get_metrics()["_sessions"] == 0
+
+
+def test_web_scrap_routes_through_session_manager(server):
+    session_manager.reset_metrics()
+    soup = web_scrap(server + "/quote")
+    assert soup.find(id="ok").text == "ok"
+    assert session_manager.get_metrics()[server.split("//")[1]]["requests"] == 1
+
+    with pytest.raises(Exception):
+        web_scrap(server + "/missing")
+    assert session_manager.get_metrics()[server.split("//")[1]]["errors"] == 1
+
+
+def test_configure_rejects_unknown_setting():
+    with pytest.raises(ValueError):
+        SessionManager().configure(pool_size=3)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test the binary frame encoding of the strength cache
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utilities.frame_codec import decode_frame, encode_frame, frame_schema
+
+
+def mixed_frame():
+    return pd.DataFrame({
+        'Ticker': ['AAPL', 'NAN', '0012', 'TRUE', None, 'ÄÖ'],
+        'price': [1.5, 2.0, np.nan, 4.0, 5.0, 6.0],
+        'shares': np.arange(6, dtype=np.int64),
+        'held': [True, False] * 3,
+        'date': pd.date_range('2024-01-01', periods=6),
+        'beta': pd.array([1, None, 3, 4, 5, 6], dtype='Int64'),
+    })
+
+
+def test_round_trip_keeps_types_and_strings():
+    df = mixed_frame()
+    data = encode_frame(df)
+    schema = frame_schema(data)
+    assert schema['rows'] == 6
+    assert [(c['name'], c['type']) for c in schema['columns']] == [
+        ('Ticker', 'str'), ('price', '<f8'), ('shares', '<i8'), ('held', '|b1'), ('date', 'datetime64[ns]'),
+        ('beta', '<f8')]
+
+    decoded = decode_frame(data)
+    assert decoded['Ticker'].tolist()[:4] == ['AAPL', 'NAN', '0012', 'TRUE']
+    assert decoded['Ticker'].isna().tolist() == [False] * 4 + [True, False]
+    assert decoded['Ticker'].iloc[5] == 'ÄÖ'
+    pd.testing.assert_series_equal(decoded['price'], df['price'])
+    pd.testing.assert_series_equal(decoded['shares'], df['shares'])
+    pd.testing.assert_series_equal(decoded['held'], df['held'])
+    assert (decoded['date'] == df['date']).all()
+    assert np.isnan(decoded['beta'].iloc[1]) and decoded['beta'].iloc[2] == 3.0
+
+
+def test_categories_are_restored():
+    df = mixed_frame().assign(Sector=pd.Categorical(['Energy', 'Technology', None, 'Energy', 'Energy', 'Utilities']))
+    data = encode_frame(df)
+    assert frame_schema(data)['columns'][-1]['category']
+
+    decoded = decode_frame(data)
+    assert isinstance(decoded['Sector'].dtype, pd.CategoricalDtype)
+    assert decoded['Sector'].tolist() == df['Sector'].tolist()
+    assert not isinstance(decoded['Ticker'].dtype, pd.CategoricalDtype)
+
+
+def test_projection_reads_columns_in_place():
+    data = encode_frame(mixed_frame())
+    projected = decode_frame(data, ['price', 'Ticker'])
+    assert list(projected.columns) == ['price', 'Ticker']
+
+    # by default the frame owns its data and can be written
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    decoded = decode_frame(data)
+    assert not np.shares_memory(decoded['price'].to_numpy(), buffer)
+    decoded.loc[0, 'price'] = 9.0
+    decoded.iloc[1, decoded.columns.get_loc('shares')] = 7
+    assert decoded['price'].iloc[0] == 9.0 and decoded['shares'].iloc[1] == 7
+
+    # read-only callers can keep the numeric columns as views of the encoded bytes
+    viewed = decode_frame(data, ['price', 'held', 'date'], copy=False)
+    for column in ['price', 'held', 'date']:
+        assert np.shares_memory(viewed[column].to_numpy(), buffer)
+    assert not viewed['price'].to_numpy().flags.writeable
+
+    with pytest.raises(ValueError):
+        decode_frame(data, ['pe'])
+    with pytest.raises(ValueError):
+        decode_frame(b'[{"Ticker": "AAPL"}]')
+
+
+def test_empty_frame():
+    decoded = decode_frame(encode_frame(mixed_frame().iloc[:0]))
+    assert decoded.empty and list(decoded.columns) == list(mixed_frame().columns)
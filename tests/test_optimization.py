@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test the prefix-sum portfolio sizing against the recursive search it replaced
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.optimization import optimization, prefix_expected_returns
+
+
+class RecursiveOptimization:
+    """The recursive search, with its state kept per instance"""
+
+    def __init__(self):
+        self.optimal_number_stocks = 0
+        self.previous_highest_expected_return = 0
+
+    def optimize_expected_return(self, df, number_of_stocks, threshold, desired_return):
+        if number_of_stocks < float(threshold):
+            return
+        df = df.head(number_of_stocks)
+        df = self.calculate_weighted_expected_return(df)
+        actual_expected_return = float(df['weighted_expected_return'].sum())
+        actual_greater_than_desired = actual_expected_return > float(desired_return)
+        if actual_greater_than_desired:
+            self.optimal_number_stocks = number_of_stocks
+        elif actual_expected_return > self.previous_highest_expected_return:
+            self.optimal_number_stocks = number_of_stocks
+            self.previous_highest_expected_return = actual_expected_return
+        self.optimize_expected_return(df, number_of_stocks - 1, threshold, actual_expected_return)
+        return self.calculate_weighted_expected_return(df.head(self.optimal_number_stocks))
+
+    def calculate_weighted_expected_return(self, df):
+        df = df.copy()
+        strength = list(map(float, df['strength']))
+        df['weight'] = np.divide(strength, sum(strength))
+        df['weighted_expected_return'] = df['expected_annual_return'].astype(float) * df['weight']
+        return df
+
+
+def candidates(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Ticker': [f"T{i}" for i in range(rows)],
+        'strength': np.sort(rng.uniform(0.1, 3, rows))[::-1],
+        'expected_annual_return': rng.uniform(1, 40, rows).round(2),
+    })
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_recursive_search(seed):
+    rng = np.random.default_rng(seed)
+    rows = int(rng.integers(1, 15))
+    number_of_stocks = int(rng.integers(1, 18))
+    threshold = int(rng.integers(1, number_of_stocks + 1))
+    desired_return = float(rng.uniform(0, 40))
+    df = candidates(rows, seed)
+
+    expected = RecursiveOptimization().optimize_expected_return(df, number_of_stocks, threshold, desired_return)
+    result = optimization().optimize_expected_return(df, number_of_stocks, threshold, desired_return)
+    assert result['Ticker'].tolist() == expected['Ticker'].tolist()
+    np.testing.assert_allclose(result['weight'], expected['weight'])
+    np.testing.assert_allclose(result['weighted_expected_return'], expected['weighted_expected_return'])
+    assert 'weight' not in df.columns  # the input frame is left alone
+
+
+def test_prefix_returns_and_edge_cases():
+    df = candidates(5, 0)
+    returns = prefix_expected_returns(df['strength'], df['expected_annual_return'])
+    for n in range(1, 6):
+        head = df.head(n)
+        assert returns[n - 1] == pytest.approx(np.average(head['expected_annual_return'], weights=head['strength']))
+
+    optimizer = optimization()
+    assert optimizer.optimize_expected_return(df, 2, 3, 10) is None
+    assert optimizer.optimize_expected_return(df.iloc[:0], 3, 3, 10).empty
+
+
+def test_concurrent_calls_do_not_share_state():
+    optimizer = optimization()
+    frames = [candidates(12, seed) for seed in range(16)]
+    expected = [RecursiveOptimization().optimize_expected_return(df, 12, 4, 20)['Ticker'].tolist() for df in frames]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda df: optimizer.optimize_expected_return(df, 12, 4, 20), frames * 4))
+    assert [r['Ticker'].tolist() for r in results] == expected * 4
+
+
+def test_concurrent_user_portfolios_are_built_from_their_own_frames():
+    from services.portfolio import portfolio
+
+    builder = portfolio()
+    frames = [candidates(8, seed).assign(price=10.0, expected_annual_risk=20.0) for seed in range(8)]
+    tickers = [frame['Ticker'].tolist()[:5] for frame in frames]
+
+    def build(i):
+        return builder.build_portfolio_from_user_input_tickers(frames[i], tickers[i], 5, 1000, None)
+
+    expected = [build(i) for i in range(len(frames))]
+    assert all(len(frame) for frame in expected)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(build, list(range(len(frames))) * 4))
+    for i, result in enumerate(results):
+        pd.testing.assert_frame_equal(result, expected[i % len(frames)])
+    assert 'invested_amount' not in frames[0].columns
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the local price history store and the incremental refresh in AnnualReturn
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import services.annualReturn as annual_return_module
+from services.annualReturn import AnnualReturn
+from utilities.price_store import PriceStore
+
+
+def _prices(start, end, base=100.0):
+    dates = pd.bdate_range(start, end, inclusive='left')
+    close = base + np.arange(len(dates), dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1000.0}, index=dates)
+
+
+def test_append_dedupes_and_reads_wide(tmp_path):
+    store = PriceStore(str(tmp_path))
+    assert store.append('AAPL', _prices('2024-01-01', '2024-02-01')) == 23
+    # overlapping append only adds the new dates; the later row wins
+    overlap = _prices('2024-01-25', '2024-02-10', base=500.0)
+    assert store.append('AAPL', overlap) == 7
+    store.append('MSFT', _prices('2024-01-15', '2024-02-10'))
+
+    history = store.read_ticker('AAPL')
+    assert history.index.is_monotonic_increasing and history.index.is_unique
+    assert history.loc['2024-01-25', 'close'] == 500.0
+    # without dividends or splits the adjusted close is the close
+    assert history['adj_close'].equals(history['close'])
+
+    wide = store.read(['AAPL', 'MSFT', 'NOPE'], start='2024-01-10', end='2024-02-09')
+    assert list(wide.columns) == ['AAPL', 'MSFT']
+    assert wide.index[0] == pd.Timestamp('2024-01-10')
+    assert wide.index[-1] == pd.Timestamp('2024-02-09')
+    assert wide['MSFT'].isna().sum() == 3  # before its first stored day
+
+    # reopening sees the same files
+    assert PriceStore(str(tmp_path)).date_range('AAPL')[1] == pd.Timestamp('2024-02-09')
+
+
+def test_dividends_and_splits_adjust_on_read(tmp_path):
+    store = PriceStore(str(tmp_path))
+    first = _prices('2024-01-01', '2024-02-01')
+    first['Dividends'] = 0.0
+    first.loc['2024-01-16', 'Dividends'] = 1.1  # previous close is 110
+    store.append('AAPL', first, requested_start='2024-01-01')
+
+    raw = store.read(['AAPL'], field='close')['AAPL']
+    adjusted = store.read(['AAPL'], field='adj_close')['AAPL']
+    assert raw.loc['2024-01-15'] == 110.0
+    assert adjusted.loc['2024-01-15'] == pytest.approx(110.0 * 0.99)
+    assert adjusted.loc['2024-01-16':].equals(raw.loc['2024-01-16':])
+
+    # a 2:1 split arrives with the next incremental download; stored rows are not rewritten
+    stored_before = store.read_ticker('AAPL')['close']
+    later = _prices('2024-02-01', '2024-02-08', base=61.0)
+    later['Stock Splits'] = 0.0
+    later.loc['2024-02-05', 'Stock Splits'] = 2.0
+    store.append('AAPL', later)
+
+    history = store.read_ticker('AAPL', adjusted=True)
+    assert store.read_ticker('AAPL')['close'].loc[:'2024-01-31'].equals(stored_before)
+    assert history.loc['2024-01-31', 'close'] == 122.0 / 2
+    assert history.loc['2024-01-15', 'close'] == pytest.approx(110.0 * 0.99 / 2)
+    assert history.loc['2024-02-01', 'close'] == 61.0
+    np.testing.assert_allclose(store.adjustment_factors('AAPL', ['2024-01-15', '2024-01-31', '2024-02-01']),
+                               [0.495, 0.5, 1.0])
+
+    # a full reload comes split-adjusted already, so only the dividend is kept
+    store.append('AAPL', _prices('2024-01-01', '2024-02-08', base=50.0).assign(Dividends=0.0))
+    assert store.adjustment_factors('AAPL', ['2024-01-02'])[0] == 1.0
+
+
+def test_legacy_histories_are_downloaded_again(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append('AAPL', _prices('2024-01-01', '2024-02-01'), requested_start='2024-01-01')
+    store._save_meta('AAPL', {'requested_start': '2024-01-01'})  # written before raw closes
+    assert store.missing_ranges(['AAPL'], '2024-01-01', '2024-02-01') == {
+        (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-01')): ['AAPL']}
+
+
+def test_missing_ranges(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append('AAPL', _prices('2024-01-01', '2024-02-01'), requested_start='2024-01-01')
+    store.append('MSFT', _prices('2024-01-01', '2024-02-06'), requested_start='2024-01-01')
+
+    ranges = store.missing_ranges(['AAPL', 'MSFT', 'NEW'], '2024-01-01', '2024-02-06')
+    assert ranges == {
+        (pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-06')): ['AAPL'],
+        (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-06')): ['NEW'],
+    }
+    # an earlier start than ever requested backfills the head
+    assert store.missing_ranges(['MSFT'], '2023-06-01', '2024-02-06') == {
+        (pd.Timestamp('2023-06-01'), pd.Timestamp('2024-02-06')): ['MSFT']}
+
+
+def test_annual_return_downloads_only_missing_days(tmp_path, monkeypatch):
+    calls = []
+
+    def download(tickers, start, end, **kwargs):
+        calls.append((tuple(tickers), pd.Timestamp(start), pd.Timestamp(end)))
+        frames = {t: _prices(start, end, base=100.0 + i) for i, t in enumerate(tickers)}
+        return pd.concat(frames, axis=1)
+
+    class FixedDatetime(datetime):
+        now_value = datetime(2024, 6, 3, 15, 0)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.now_value
+
+    monkeypatch.setattr(annual_return_module, 'price_store', PriceStore(str(tmp_path)))
+    monkeypatch.setattr(annual_return_module.yf, 'download', download)
+    monkeypatch.setattr(annual_return_module, 'datetime', FixedDatetime)
+
+    annual_return = AnnualReturn()
+    first = annual_return.get_annual_return(['AAPL', 'MSFT'])
+    assert list(first['Ticker']) == ['AAPL', 'MSFT']
+    assert list(first.columns) == ['Ticker', 'expected_annual_return', 'expected_annual_risk', 'return_risk_ratio']
+    assert len(calls) == 1
+
+    # same day again: nothing to download
+    assert annual_return.get_annual_return(['AAPL', 'MSFT']).equals(first)
+    assert len(calls) == 1
+
+    # two trading days later only the days after the last stored row are requested
+    FixedDatetime.now_value = datetime(2024, 6, 5, 15, 0)
+    annual_return.get_annual_return(['AAPL', 'MSFT'])
+    assert calls[-1] == (('AAPL', 'MSFT'), pd.Timestamp('2024-06-01'), pd.Timestamp('2024-06-05'))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the vectorized return/volatility computation against the per-ticker loop
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pytest
+import pandas as pd
+
+from services.annualReturn import AnnualReturn
+
+
+def ragged_closes(num_tickers, num_days=252, seed=0):
+    """Random-walk closes with late listings, gaps and a few degenerate tickers"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=num_days)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (num_days, num_tickers)), axis=0))
+    prices[rng.random(prices.shape) < 0.02] = np.nan
+    starts = rng.integers(0, num_days // 2, num_tickers)
+    prices[np.arange(num_days)[:, None] < np.where(rng.random(num_tickers) < 0.2, starts, 0)] = np.nan
+    closes = pd.DataFrame(prices, index=dates, columns=[f'T{i:05d}' for i in range(num_tickers)])
+    closes.iloc[:, 0] = np.nan            # no data
+    closes.iloc[:-1, 1] = np.nan          # a single close
+    closes.iloc[:-2, 2] = np.nan          # two closes: one return, no volatility
+    closes.iloc[:, 3] = 50.0              # flat price: zero volatility
+    return closes
+
+
+def loop_return_metrics(closes):
+    """Reference: the per-ticker loop the vectorized path replaced"""
+    results = []
+    for ticker in closes.columns:
+        close_prices = closes[ticker].dropna()
+        if len(close_prices) > 1:
+            initial_price = close_prices.iloc[0]
+            final_price = close_prices.iloc[-1]
+            annual_return = ((final_price - initial_price) / initial_price) * 100
+            returns = close_prices.pct_change().dropna()
+            volatility = returns.std() * (252 ** 0.5) * 100
+            results.append({
+                'Ticker': ticker,
+                'expected_annual_return': round(annual_return, 3),
+                'expected_annual_risk': round(volatility, 3),
+                'return_risk_ratio': round(annual_return / volatility, 3) if volatility > 0 else 0
+            })
+    return pd.DataFrame(results)
+
+
+def test_vectorized_metrics_match_loop():
+    closes = ragged_closes(300)
+    expected = loop_return_metrics(closes)
+    result = AnnualReturn().compute_return_metrics(closes)
+
+    assert list(result.columns) == list(expected.columns)
+    assert list(result['Ticker']) == list(expected['Ticker'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, atol=1e-3)
+
+    flat = result.set_index('Ticker').loc['T00003']
+    assert flat['expected_annual_risk'] == 0 and flat['return_risk_ratio'] == 0
+    assert np.isnan(result.set_index('Ticker').loc['T00002', 'expected_annual_risk'])
+
+
+def test_empty_matrix_keeps_schema():
+    result = AnnualReturn().compute_return_metrics(pd.DataFrame())
+    assert result.empty
+    assert list(result.columns) == ['Ticker', 'expected_annual_return', 'expected_annual_risk', 'return_risk_ratio']
+
+
+def test_horizon_metrics():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range('2019-01-01', periods=1300)
+    spy_returns = rng.normal(0.0005, 0.01, len(dates))
+    spy = pd.Series(100 * np.cumprod(1 + spy_returns), index=dates)
+    levered = 50 * np.cumprod(1 + 2 * spy_returns)
+    young = np.where(np.arange(len(dates)) >= 1100, levered, np.nan)
+    closes = pd.DataFrame({'LEV': levered, 'YOUNG': young}, index=dates)
+    closes.iloc[-5, 0] = np.nan  # a missing day inside the risk window
+
+    metrics = AnnualReturn().compute_horizon_metrics(closes, benchmark=spy).set_index('Ticker')
+
+    lev = closes['LEV'].ffill()
+    assert metrics.loc['LEV', 'return_1m'] == round((lev.iloc[-1] / lev.iloc[-22] - 1) * 100, 3)
+    assert metrics.loc['LEV', 'return_5y'] == round((lev.iloc[-1] / lev.iloc[-1261] - 1) * 100, 3)
+    assert metrics.loc['YOUNG', 'return_6m'] == round((lev.iloc[-1] / lev.iloc[-127] - 1) * 100, 3)
+    assert np.isnan(metrics.loc['YOUNG', 'return_1y'])
+    assert metrics.loc['LEV', 'beta_spy'] == pytest.approx(2.0, abs=0.02)
+
+    window = closes['LEV'].iloc[-253:].dropna()
+    daily = window.pct_change().dropna()
+    downside = np.sqrt((np.minimum(daily, 0) ** 2).mean()) * (252 ** 0.5) * 100
+    drawdown = ((window / window.cummax()) - 1).min() * 100
+    assert metrics.loc['LEV', 'downside_deviation'] == pytest.approx(downside, abs=1e-3)
+    assert metrics.loc['LEV', 'max_drawdown'] == pytest.approx(drawdown, abs=1e-3)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test the stock frame column schema
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from utilities.schema import ColumnSpec, apply_schema
+
+
+def test_apply_schema_casts_rounds_and_fills():
+    df = pd.DataFrame({
+        'Ticker': ['AAA', 'BBB'],
+        'pe': ['12.34567', 'nan'],
+        'beta': [1.23456, np.nan],
+        'Sector': ['Energy', 'Energy'],
+        'Earnings': ['Jul 25/a', None],
+        'Company': ['Acme', 'Beta Corp'],
+    })
+    typed = apply_schema(df)
+
+    assert list(typed.columns) == list(df.columns)
+    assert typed['Ticker'].dtype == 'category'
+    assert typed['Sector'].dtype == 'category'
+    assert list(typed['pe']) == [12.346, 0.0]
+    assert list(typed['beta']) == [1.235, 0.0]
+    assert list(typed['Earnings']) == ['Jul 25/a', '']
+    # columns outside the schema are numeric, as the screener frames always were
+    assert list(typed['Company']) == [0.0, 0.0]
+
+    # a typed frame goes through unchanged
+    assert apply_schema(typed).equals(typed)
+
+
+def test_custom_specs():
+    df = pd.DataFrame({'Ticker': ['AAA'], 'price': [101.256], 'weight': [np.nan]})
+    schema = {'Ticker': ColumnSpec('str'), 'price': ColumnSpec('float64', decimals=1)}
+    typed = apply_schema(df, schema, default=ColumnSpec('float64', fill=-1.0))
+    assert typed['price'].iloc[0] == 101.3
+    assert typed['weight'].iloc[0] == -1.0
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test the streaming screener API against the recorded finviz pages
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import re
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import finvizfinance.screener.overview as overview
+import services.data_fetcher as data_fetcher
+from finvizfinance.screener.valuation import Valuation
+from finvizfinance.util import NUMBER_COL
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'finviz')
+
+
+def _offline_web_scrap(urls):
+    def web_scrap(url):
+        urls.append(url)
+        v_page = re.search(r'v=(\d+)', url).group(1)
+        row = re.search(r'&r=(\d+)', url)
+        page = (int(row.group(1)) - 1) // 20 + 1 if row else 1
+        with open(os.path.join(FIXTURE_DIR, f'screener_v{v_page}_p{page}.html'), encoding='utf-8') as fh:
+            return BeautifulSoup(fh.read(), 'lxml')
+    return web_scrap
+
+
+def test_iter_yields_typed_page_batches(monkeypatch):
+    urls = []
+    monkeypatch.setattr(overview, 'web_scrap', _offline_web_scrap(urls))
+
+    batches = Valuation().screener_view_iter(sleep_sec=0)
+    first = next(batches)
+    assert len(urls) == 1  # the second page is only requested on demand
+    rest = list(batches)
+
+    assert [len(first)] + [len(b) for b in rest] == [20, 13]
+    for col in first.columns:
+        if col in NUMBER_COL:
+            assert first[col].dtype == float, col
+
+    full = Valuation().screener_view(verbose=0, sleep_sec=0)
+    streamed = pd.concat([first] + rest, ignore_index=True)
+    assert list(streamed['Ticker']) == list(full['Ticker'])
+    assert streamed['P/E'].equals(pd.to_numeric(full['P/E']))
+
+    limited = list(Valuation().screener_view_iter(limit=25, sleep_sec=0))
+    assert [len(b) for b in limited] == [20, 5]
+
+
+def test_async_iter_matches_sync(monkeypatch):
+    monkeypatch.setattr(overview, 'web_scrap', _offline_web_scrap([]))
+
+    async def collect():
+        return [batch async for batch in Valuation().screener_view_async(sleep_sec=0)]
+
+    batches = asyncio.run(collect())
+    assert [len(b) for b in batches] == [20, 13]
+
+
+def test_data_fetcher_consumes_batches(monkeypatch):
+    monkeypatch.setattr(overview, 'web_scrap', _offline_web_scrap([]))
+    monkeypatch.setattr(data_fetcher, 'FINVIZ_REQUEST_INTERVAL', 0)
+
+    batches = list(data_fetcher.iter_finviz_batches('S&P 500', 'Technology'))
+    assert [len(b) for b in batches] == [20, 13]
+    assert {'Ticker', 'pe', 'beta', 'Sector', 'Index'} <= set(batches[0].columns)
+    assert (batches[1]['Sector'] == 'Technology').all()
+
+    result = data_fetcher._fetch_from_finviz_sync('S&P 500', 'Technology')
+    assert result.success
+    assert len(result.data) == 33
+    assert result.data['Ticker'].is_unique
+
+
+def test_view_failing_part_way_is_dropped_not_zero_filled(monkeypatch):
+    fetch = _offline_web_scrap([])
+
+    def web_scrap(url):
+        # the financial view loses its second page
+        if 'v=161' in url and '&r=21' in url:
+            raise ConnectionError('finviz unavailable')
+        return fetch(url)
+
+    monkeypatch.setattr(overview, 'web_scrap', web_scrap)
+    monkeypatch.setattr(data_fetcher, 'FINVIZ_REQUEST_INTERVAL', 0)
+    batches = list(data_fetcher.iter_finviz_batches('S&P 500', 'Technology'))
+    financial = set(batches[0].columns) - set(batches[1].columns)
+    assert financial
+
+    result = data_fetcher._fetch_from_finviz_sync('S&P 500', 'Technology')
+    assert len(result.data) == 33
+    assert not financial & set(result.data.columns)
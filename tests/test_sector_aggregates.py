@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the sector aggregates service without Redis
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+import pytest
+
+from services.sector_aggregates import SectorAggregates
+
+
+def _frame():
+    return pd.DataFrame({
+        'Ticker': ['AAA', 'BBB', 'CCC', 'DDD', 'EEE'],
+        'pe': ['10', '20', '30', 'nan', '8'],
+        'dividend': [0.01, 0.02, 0.03, 0.04, 0.0],
+        'Beta': [1.0, 1.2, 0.8, 1.1, 0.9],
+        'Sector': ['Technology', 'Technology', 'Technology', 'Energy', 'Energy'],
+        'Index': ['S&P 500'] * 5,
+    })
+
+
+def test_compute_matches_pandas():
+    groups = SectorAggregates().compute(_frame(), rollup=True)
+
+    assert set(groups) == {'S&P 500:Technology', 'S&P 500:Energy', 'S&P 500:Any'}
+    tech = groups['S&P 500:Technology']
+    assert tech['count'] == 3
+    assert tech['mean']['pe'] == 20.0
+    assert tech['median']['dividend'] == 0.02
+    assert tech['q25']['pe'] == 15.0
+    assert tech['q75']['pe'] == 25.0
+    # raw finviz column names are mapped onto the schema
+    assert tech['mean']['beta'] == 1.0
+
+    assert groups['S&P 500:Energy']['mean']['pe'] == 8.0
+    assert groups['S&P 500:Any']['count'] == 5
+    assert groups['S&P 500:Any']['mean']['pe'] == pytest.approx(17.0)
+
+
+def test_refresh_merges_groups_and_serves_lookups():
+    aggregates = SectorAggregates()
+    first = aggregates.refresh(_frame(), rollup=True)
+
+    energy = _frame().iloc[3:].assign(pe=['12', '14'])
+    second = aggregates.refresh(energy)
+
+    assert second != first
+    assert aggregates.get('S&P 500', 'Energy')['pe'] == 13.0
+    # groups outside the refreshed slice keep their values
+    assert aggregates.get('S&P 500', 'Technology')['pe'] == 20.0
+    assert aggregates.get('S&P 500', 'Any', 'median')['pe'] == 15.0
+    assert aggregates.get('DJIA', 'Energy').empty
+
+    with pytest.raises(ValueError):
+        aggregates.get('S&P 500', 'Energy', 'max')
+
+
+def test_lookups_check_the_version_once_per_interval(monkeypatch):
+    import services.sector_aggregates as module
+
+    checks = []
+    monkeypatch.setattr(module.redis_manager, 'get_sector_aggregates_version', lambda: checks.append(1))
+    monkeypatch.setattr(module.redis_manager, 'save_sector_aggregates', lambda document, version: True)
+
+    aggregates = SectorAggregates(check_seconds=60)
+    aggregates.refresh(_frame(), rollup=True)
+    assert len(checks) == 1
+
+    for _ in range(100):
+        aggregates.get('S&P 500', 'Technology')
+        aggregates.get_group('S&P 500', 'Energy')
+    assert len(checks) == 1
+
+    aggregates.check_seconds = 0
+    aggregates.get('S&P 500', 'Technology')
+    assert len(checks) == 2
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test the sector history store, the downsamplers and the time-series charts
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import enums.enum as enum
+import services.chart as chart_module
+from utilities.sector_history import SECTOR_HISTORY_FIELDS, SectorHistoryStore, lttb, min_max
+
+
+def _day(offset):
+    return (datetime.now() - timedelta(days=offset)).date()
+
+
+def test_append_replaces_same_day_and_reads_range(tmp_path):
+    store = SectorHistoryStore(str(tmp_path))
+    assert store.append('S&P 500', pd.DataFrame({'pe': [20.0, 30.0]}, index=['Energy', 'Utilities']),
+                        date='2024-01-01') == 2
+    store.append('S&P 500', pd.DataFrame({'pe': [21.0], 'value_score': [4.5]}, index=['Energy']), date='2024-01-02')
+    # same day again replaces the record, an older day is skipped
+    store.append('S&P 500', pd.DataFrame({'pe': [22.0]}, index=['Energy']), date='2024-01-02')
+    assert store.append('S&P 500', pd.DataFrame({'pe': [1.0]}, index=['Energy']), date='2023-12-31') == 0
+
+    history = store.read('S&P 500', 'Energy')
+    assert list(history.columns) == SECTOR_HISTORY_FIELDS
+    assert list(history.index) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')]
+    assert list(history['pe']) == [20.0, 22.0]
+    assert np.isnan(history['value_score'].iloc[1])
+    assert list(store.read('S&P 500', 'Energy', start='2024-01-02')['pe']) == [22.0]
+    assert store.read('S&P 500', 'Missing').empty
+
+    # a torn record is dropped and reopening sees the same files
+    path = os.path.join(str(tmp_path), store._name('S&P 500', 'Energy'))
+    with open(path, 'ab') as fh:
+        fh.write(b'\0' * 12)
+    reopened = SectorHistoryStore(str(tmp_path))
+    assert reopened.last_date('S&P 500', 'Energy') == pd.Timestamp('2024-01-02')
+    reopened.append('S&P 500', pd.DataFrame({'pe': [23.0]}, index=['Energy']), date='2024-01-03')
+    assert list(reopened.read('S&P 500', 'Energy')['pe']) == [20.0, 22.0, 23.0]
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[500] = 10.0
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50 and kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert 500 in kept
+    assert list(lttb(x[:10], y[:10], 50)) == list(range(10))
+
+
+def test_min_max_keeps_every_bucket_extreme():
+    y = np.random.default_rng(0).normal(size=1000)
+    kept = min_max(y, 25)
+    assert len(kept) <= 50 and np.all(np.diff(kept) > 0)
+    assert y.argmax() in kept and y.argmin() in kept
+    assert list(min_max(y[:20], 25)) == list(range(20))
+
+
+def test_history_is_downsampled_to_width(monkeypatch, tmp_path):
+    store = SectorHistoryStore(str(tmp_path))
+    monkeypatch.setattr(chart_module, 'sector_history', store)
+    for offset in range(400, -1, -1):
+        store.append('S&P 500', pd.DataFrame({'value_score': [float(offset)], 'pe': [20.0]}, index=['Energy']),
+                     date=_day(offset))
+
+    service = chart_module.chart()
+    history = service.get_history(enum.StockType.VALUE.value, days=365, width=60)
+    energy = {series['id']: series for series in history['data']}['Energy']
+    assert len(energy['values']) == 60
+    assert energy['dates'][0] == _day(364).isoformat() and energy['dates'][-1] == _day(0).isoformat()
+    assert energy['values'][0] == 364.0 and energy['values'][-1] == 0.0
+
+    minmax = service.get_history(enum.StockType.VALUE.value, days=30, width=10, mode='minmax', metric='pe')
+    energy = {series['id']: series for series in minmax['data']}['Energy']
+    assert minmax['metric'] == 'pe' and len(energy['values']) <= 10
+    assert all(series['values'] == [] for series in minmax['data'] if series['id'] != 'Energy')
+
+    assert service.get_history('Momentum') is None
+    with pytest.raises(ValueError):
+        service.get_history(enum.StockType.VALUE.value, metric='beta')
+    with pytest.raises(ValueError):
+        service.get_history(enum.StockType.VALUE.value, mode='average')
+
+
+def test_materialize_records_daily_aggregates(monkeypatch, tmp_path):
+    store = SectorHistoryStore(str(tmp_path))
+    monkeypatch.setattr(chart_module, 'sector_history', store)
+    charts = {
+        enum.StockType.VALUE.value: [{'id': 'Energy', 'values': [3.0, 1.0], 'labels': ['A', 'B'], 'title': 'Energy',
+                                      'averages': {'pe': 18.0, 'dividend': 0.02}}],
+        enum.StockType.DIVIDEND.value: [{'id': 'Energy', 'values': [], 'labels': [], 'title': 'Energy',
+                                         'averages': {'pe': 18.0, 'dividend': 0.02}}],
+    }
+    chart_module.chart()._record_history(charts, date='2024-03-01')
+
+    row = store.read('S&P 500', 'Energy').iloc[0]
+    assert row['pe'] == 18.0 and row['dividend'] == 0.02 and row['value_score'] == 2.0
+    assert np.isnan(row['dividend_score'])
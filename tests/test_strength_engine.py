@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Test the matrix strength engine against the per-attribute loop it replaced
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enums.enum import StockType
+from services.strength_engine import (STRENGTH_ATTRIBUTES, FactorModelRegistry, IncrementalStrength,
+                                     StrengthEngine, strength_models)
+
+
+def strength_frame(num_rows, seed=0):
+    """Screener-like frame with missing values in every attribute"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Ticker': [f'T{i:05d}' for i in range(num_rows)],
+        'Sector': rng.choice(['Technology', 'Energy', 'Utilities'], num_rows),
+        'Company': np.where(rng.random(num_rows) < 0.1, None, 'Acme'),
+        'dividend': rng.uniform(0, 0.06, num_rows),
+        'pe': rng.uniform(5, 60, num_rows),
+        'fpe': rng.uniform(5, 50, num_rows),
+        'pb': rng.uniform(0.5, 12, num_rows),
+        'beta': rng.normal(1, 0.4, num_rows),
+        'return_risk_ratio': rng.normal(0.4, 0.3, num_rows),
+        'price': rng.uniform(5, 900, num_rows),
+        'volume': rng.integers(1000, 10 ** 7, num_rows),
+    })
+    for col in STRENGTH_ATTRIBUTES + ['price']:
+        df.loc[rng.random(num_rows) < 0.05, col] = np.nan
+    return df
+
+
+def averages(df):
+    return df[[col for col in STRENGTH_ATTRIBUTES if col in df.columns]].mean()
+
+
+def loop_calculate_strength(df, avg_metric_df, stock_type):
+    """Reference: the per-attribute loop of StrengthCalculator._calculate_strength
+
+    Its in-place replace('nan') calls are left out; under copy-on-write they
+    never changed the frame.
+    """
+    attributes = ["dividend", "pe", "fpe", "pb", "beta", "return_risk_ratio"]
+    df["strength"] = 0
+    for col in attributes:
+        if col not in df.columns:
+            continue
+        if col == 'beta':
+            df["strength"] = df["strength"] - np.where(df[col].isnull(), 0, df[col].astype(float))
+        elif col == 'return_risk_ratio':
+            df["strength"] = df["strength"] + np.where(df[col].isnull(), 0, df[col].astype(float))
+        else:
+            if col in avg_metric_df and avg_metric_df[col] != 0:
+                new_col = np.where(df[col].isnull(), 0, df[col].astype(float) - avg_metric_df[col])
+                new_col = np.divide(1, avg_metric_df[col]) * new_col
+                if col == 'dividend':
+                    df["strength"] = df["strength"] + new_col
+                else:
+                    df["strength"] = df["strength"] - new_col
+    if stock_type == StockType.VALUE.value:
+        df["strength"] = 1 * df["strength"]
+    elif stock_type == StockType.GROWTH.value:
+        df["strength"] = -1 * df["strength"]
+    else:
+        raise ValueError("Stock Type must be Value or Growth")
+    df = df.replace(np.nan, 0)
+    df = np.round(df, decimals=3)
+    return df.sort_values(by=["strength"], ascending=[False])
+
+
+@pytest.mark.parametrize('stock_type', [StockType.VALUE.value, StockType.GROWTH.value])
+def test_engine_matches_loop(stock_type):
+    df = strength_frame(2000)
+    avg = averages(df)
+    expected = loop_calculate_strength(df.copy(), avg, stock_type)
+    result = StrengthEngine().calculate(df.copy(), avg, stock_type)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_engine_matches_loop_on_edge_cases():
+    df = strength_frame(300, seed=1).drop(columns=['fpe'])
+    # a zero average drops the attribute, a missing one too
+    avg = averages(df).drop('pb')
+    avg['pe'] = 0
+    expected = loop_calculate_strength(df.copy(), avg, StockType.VALUE.value)
+    pd.testing.assert_frame_equal(StrengthEngine().calculate(df.copy(), avg, StockType.VALUE.value), expected)
+
+    # a NaN average turns every score into 0, as it always did
+    avg['dividend'] = np.nan
+    result = StrengthEngine().calculate(df.copy(), avg, StockType.GROWTH.value)
+    pd.testing.assert_frame_equal(result, loop_calculate_strength(df.copy(), avg, StockType.GROWTH.value))
+    assert (result['strength'] == 0).all()
+
+    with pytest.raises(ValueError):
+        StrengthEngine().calculate(df, avg, StockType.DIVIDEND.value)
+
+
+def test_calculate_all_derives_every_stock_type():
+    df = strength_frame(500, seed=2)
+    avg = averages(df)
+    tables = StrengthEngine().calculate_all(df, avg)
+    assert set(tables) == {StockType.VALUE.value, StockType.GROWTH.value}
+    for stock_type, table in tables.items():
+        pd.testing.assert_frame_equal(table, loop_calculate_strength(df.copy(), avg, stock_type))
+
+
+def test_registered_models_score_in_one_pass():
+    registry = FactorModelRegistry()
+    for model in strength_models.models():
+        registry.register(model.name, model.weights)
+    registry.register('Quality', {'return_risk_ratio': 2, 'beta': -0.5, 'pb': -1})
+    df = strength_frame(300, seed=7)
+    avg = averages(df)
+
+    engine = StrengthEngine(registry=registry)
+    scores = engine.scores(df, avg, registry.models())
+    assert scores.shape == (300, 3)
+    tables = engine.calculate_all(df, avg)
+    assert list(tables) == [StockType.VALUE.value, StockType.GROWTH.value, 'Quality']
+    pd.testing.assert_frame_equal(tables[StockType.VALUE.value], loop_calculate_strength(df.copy(), avg, StockType.VALUE.value))
+
+    rrr = df['return_risk_ratio'].fillna(0)
+    beta = df['beta'].fillna(0)
+    pb = ((df['pb'] - avg['pb']) / avg['pb']).fillna(0)
+    expected = np.round(2 * rrr - 0.5 * beta - pb, 3).sort_values(ascending=False)
+    np.testing.assert_allclose(tables['Quality']['strength'].to_numpy(), expected.to_numpy(), atol=1e-3)
+
+    with pytest.raises(ValueError):
+        registry.register('Broken', {'volume': 1})
+    with pytest.raises(ValueError):
+        engine.calculate(df, avg, 'Momentum')
+
+
+def test_reregistering_a_model_bumps_its_cache_version(monkeypatch):
+    import services.strengthCalculator as strength_module
+
+    registry = FactorModelRegistry()
+    monkeypatch.setattr(strength_module, 'strength_models', registry)
+    calculator = strength_module.StrengthCalculator()
+
+    first = registry.register('Tilt', {'dividend': 1})
+    assert registry.register('Tilt', {'dividend': 1.0}) is first
+    assert calculator._get_cache_key('Tilt', 'Energy', 'DJIA') == 'strength_data:Tilt@1:Energy:DJIA'
+    registry.register('Tilt', {'dividend': 2})
+    assert calculator._get_cache_key('Tilt', 'Energy', 'DJIA') == 'strength_data:Tilt@2:Energy:DJIA'
+
+
+def test_precalculation_loads_each_dataset_once(monkeypatch):
+    import services.strengthCalculator as strength_module
+    from services.data_fetcher import DataFetchResult, DataSource
+
+    fetched = []
+    batches = []
+
+    def fetch(index, sector):
+        fetched.append((index, sector))
+        return DataFetchResult(success=True, data=strength_frame(20), source=DataSource.FINVIZ)
+
+    monkeypatch.setattr(strength_module, 'fetch_stock_data_sync', fetch)
+    monkeypatch.setattr(strength_module.AnnualReturn, 'get_return_table', lambda tickers: pd.DataFrame())
+    monkeypatch.setattr(strength_module.AnnualReturn, 'update_with_return_data', lambda df, table=None: df)
+    monkeypatch.setattr(strength_module.redis_manager, 'save_strength_batch', lambda frames: batches.append(frames))
+
+    calculator = strength_module.StrengthCalculator()
+    monkeypatch.setattr(calculator, '_track_strength_save', lambda *args: None)
+    report = calculator.precalculate_all_strength_data()
+
+    assert len(fetched) == len(set(fetched)) == 22
+    assert report['failed'] == [] and len(report['combinations']) == 22
+    assert len(batches) == 22
+    batch = next(b for b in batches if 'strength_data:Value@1:Basic Materials:S&P 500' in b)
+    assert sorted(batch) == ['strength_data:Growth@1:Basic Materials:S&P 500', 'strength_data:Value@1:Basic Materials:S&P 500']
+    value, growth = batch['strength_data:Value@1:Basic Materials:S&P 500'], batch['strength_data:Growth@1:Basic Materials:S&P 500']
+    assert sorted(value['strength']) == sorted(-growth['strength'])
+
+
+def test_parallel_precalculation_reports_timing_and_failures(monkeypatch):
+    import services.strengthCalculator as strength_module
+    from services.data_fetcher import DataFetchResult, DataSource
+
+    lookups = []
+    running = {'now': 0, 'most': 0}
+    lock = threading.Lock()
+
+    def fetch(index, sector):
+        with lock:
+            running['now'] += 1
+            running['most'] = max(running['most'], running['now'])
+        time.sleep(0.2)
+        with lock:
+            running['now'] -= 1
+        if sector == 'Energy' and index == 'DJIA':
+            raise ConnectionError('finviz unavailable')
+        return DataFetchResult(success=True, data=strength_frame(20).assign(Ticker=lambda d: sector + d['Ticker']),
+                               source=DataSource.FINVIZ)
+
+    def return_table(tickers):
+        lookups.append(len(tickers))
+        return pd.DataFrame()
+
+    monkeypatch.setattr(strength_module, 'fetch_stock_data_sync', fetch)
+    monkeypatch.setattr(strength_module.AnnualReturn, 'get_return_table', return_table)
+    monkeypatch.setattr(strength_module.AnnualReturn, 'update_with_return_data', lambda df, table=None: df)
+    monkeypatch.setattr(strength_module.redis_manager, 'save_strength_batch', lambda frames: True)
+
+    calculator = strength_module.StrengthCalculator()
+    monkeypatch.setattr(calculator, '_track_strength_save', lambda *args: None)
+    report = calculator.precalculate_all_strength_data(max_workers=22)
+
+    # datasets load concurrently instead of one after another
+    assert running['most'] > 1
+    assert report['failed'] == ['Energy:DJIA']
+    assert lookups == [11 * 20]  # one shared lookup for the union of tickers
+    energy = next(c for c in report['combinations'] if c['sector'] == 'Energy' and c['index'] == 'DJIA')
+    assert 'finviz unavailable' in energy['error']
+    assert all(c['seconds'] >= 0.2 for c in report['combinations'])
+
+
+def test_incremental_update_rescores_only_changed_rows():
+    df = strength_frame(500, seed=4)
+    state = IncrementalStrength(df, tolerance=0.05)
+    pd.testing.assert_frame_equal(state.tables()[StockType.VALUE.value],
+                                  StrengthEngine().calculate_all(df, averages(df))[StockType.VALUE.value])
+
+    # a small move of one ticker keeps every average within tolerance
+    changes = df.iloc[[7]][['Ticker', 'pe', 'price']].assign(pe=lambda d: d['pe'] * 1.1, price=1.0)
+    report = state.update(changes)
+    assert report['changed'] == 1 and report['inserted'] == 0
+    assert not report['full'] and report['rescored'] == 1
+
+    updated = df.copy()
+    updated.loc[7, ['pe', 'price']] = changes[['pe', 'price']].to_numpy()[0]
+    pd.testing.assert_series_equal(state.averages(), averages(updated).rename(None), check_names=False)
+    # the changed row is scored against the averages the others were scored with
+    expected = StrengthEngine().calculate(updated, averages(df), StockType.VALUE.value)
+    pd.testing.assert_frame_equal(state.tables([StockType.VALUE.value])[StockType.VALUE.value], expected)
+
+
+def test_seeded_averages_keep_a_small_first_update_incremental():
+    df = strength_frame(500, seed=7)
+    # published aggregates differ from the running means by far more than tolerance
+    published = averages(df) * 1.3
+    state = IncrementalStrength(df, published, tolerance=0.05)
+
+    changes = df.iloc[[3]][['Ticker', 'pe']].assign(pe=lambda d: d['pe'] * 1.1)
+    report = state.update(changes)
+    assert not report['full'] and report['rescored'] == 1
+    pd.testing.assert_series_equal(state.applied, published.astype(float))
+
+    updated = df.copy()
+    updated.loc[3, 'pe'] = changes['pe'].iloc[0]
+    expected = StrengthEngine().calculate(updated, published, StockType.VALUE.value)
+    pd.testing.assert_frame_equal(state.tables([StockType.VALUE.value])[StockType.VALUE.value], expected)
+
+
+def test_incremental_update_rescores_everything_past_tolerance():
+    df = strength_frame(50, seed=5)
+    state = IncrementalStrength(df, tolerance=0.01)
+    new_rows = strength_frame(5, seed=6).assign(Ticker=lambda d: 'N' + d['Ticker'], pe=500.0)
+    changes = pd.concat([df.iloc[[1, 1]].assign(pb=100.0), new_rows], ignore_index=True)
+
+    report = state.update(changes)
+    assert report['changed'] == 1 and report['inserted'] == 5
+    assert report['full'] and report['rescored'] == 55 and report['drift'] > 0.01
+    assert state.rescored_rows == 55
+
+    updated = pd.concat([df.assign(pb=np.where(df.index == 1, 100.0, df['pb'])), new_rows], ignore_index=True)
+    for stock_type, table in StrengthEngine().calculate_all(updated, averages(updated)).items():
+        pd.testing.assert_frame_equal(state.tables()[stock_type], table)
+
+
+def test_update_strength_saves_the_changed_dataset(monkeypatch):
+    import services.strengthCalculator as strength_module
+
+    batches = []
+    calculator = strength_module.StrengthCalculator()
+    monkeypatch.setattr(strength_module.redis_manager, 'save_strength_batch', lambda frames: batches.append(frames))
+    monkeypatch.setattr(calculator, '_track_strength_save', lambda *args: None)
+
+    df = strength_frame(30)
+    assert calculator.update_strength('S&P 500', 'Energy', df.iloc[:1]) is None
+    calculator._incremental[('S&P 500', 'Energy')] = IncrementalStrength(df)
+    report = calculator.update_strength('S&P 500', 'Energy', df.iloc[:1].assign(price=2.0))
+    assert report['changed'] == 1 and report['rescored'] == 1
+    value = batches[-1]['strength_data:Value@1:Energy:S&P 500']
+    assert value.loc[value['Ticker'] == 'T00000', 'price'].item() == 2.0
+
+
+def test_refresh_strength_rescores_only_the_fetched_changes(monkeypatch):
+    import services.strengthCalculator as strength_module
+
+    batches = []
+    calculator = strength_module.StrengthCalculator()
+    monkeypatch.setattr(strength_module.redis_manager, 'save_strength_batch', lambda frames: batches.append(frames))
+    monkeypatch.setattr(calculator, '_track_strength_save', lambda *args: None)
+
+    df = strength_frame(40, seed=8)
+    assert calculator.refresh_strength('S&P 500', 'Energy', df) is None  # not precalculated
+    calculator._incremental[('S&P 500', 'Energy')] = IncrementalStrength(df)
+
+    # the next fetch returns the same rows in another order, with one price moved
+    fetched = df.sample(frac=1, random_state=1).reset_index(drop=True)
+    fetched.loc[fetched['Ticker'] == 'T00005', 'price'] = 1.0
+    report = calculator.refresh_strength('S&P 500', 'Energy', fetched)
+    assert report['changed'] == 1 and report['inserted'] == 0 and report['rescored'] == 1
+    assert len(batches) == 1
+
+    assert calculator.refresh_strength('S&P 500', 'Energy', fetched) is None
+    assert len(batches) == 1
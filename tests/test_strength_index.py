@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test the sorted-set strength index behind the portfolio top-K queries
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import services.portfolio as portfolio_module
+from utilities.frame_codec import decode_frame
+from utilities.redis_data import redis_manager
+
+
+class FakeRedis:
+    """Strings, hashes and sorted sets in dicts; the pipeline runs commands as they come"""
+
+    def __init__(self):
+        self.values = {}
+        self.results = []
+
+    def pipeline(self):
+        self.results = []
+        return self
+
+    def execute(self):
+        results, self.results = self.results, []
+        return results
+
+    def _done(self, result):
+        self.results.append(result)
+        return result
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+        return self._done(True)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def delete(self, *keys):
+        return self._done(sum(self.values.pop(key, None) is not None for key in keys))
+
+    def exists(self, key):
+        return self._done(int(key in self.values))
+
+    def expire(self, key, ttl):
+        return self._done(key in self.values)
+
+    def hset(self, key, mapping):
+        self.values.setdefault(key, {}).update(mapping)
+        return self._done(len(mapping))
+
+    def hmget(self, key, fields):
+        return [self.values.get(key, {}).get(field) for field in fields]
+
+    def zadd(self, key, mapping):
+        self.values.setdefault(key, {}).update(mapping)
+        return self._done(len(mapping))
+
+    @staticmethod
+    def _passes(score, bound, above):
+        if bound in ('-inf', '+inf'):
+            return True
+        exclusive = bound.startswith('(')
+        value = float(bound.lstrip('('))
+        if above:
+            return score > value if exclusive else score >= value
+        return score < value if exclusive else score <= value
+
+    def _by_score(self, key, low, high):
+        members = sorted(self.values.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        return [(m, s) for m, s in members if self._passes(s, low, True) and self._passes(s, high, False)]
+
+    def zrevrangebyscore(self, key, high, low, start=None, num=None):
+        members = [m for m, _ in self._by_score(key, low, high)][::-1]
+        return self._done(members[start:start + num] if num is not None else members)
+
+    def zrangestore(self, dest, key, low, high, byscore=False):
+        self.values[dest] = dict(self._by_score(key, low, high))
+        return self._done(len(self.values[dest]))
+
+    def zinterstore(self, dest, weights):
+        sets = [self.values.get(key, {}) for key in weights]
+        common = set.intersection(*(set(members) for members in sets))
+        self.values[dest] = {m: sum(w * members[m] for w, members in zip(weights.values(), sets)) for m in common}
+        return self._done(len(common))
+
+    def zrevrange(self, key, start, end):
+        members = sorted(self.values.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+        return self._done([m for m, _ in members][start:end + 1])
+
+
+def strength_table(rows=40, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Ticker': [f"T{i:03d}" for i in range(rows)],
+        'price': np.round(rng.uniform(5, 400, rows), 3),
+        'expected_annual_return': np.round(rng.normal(0.08, 0.15, rows), 3),
+        'expected_annual_risk': np.round(rng.uniform(0.05, 0.9, rows), 3),
+        'strength': np.round(rng.normal(0, 1, rows), 3),
+    })
+    return df.sort_values(by=['strength'], ascending=[False])
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_manager, 'r', fake)
+    monkeypatch.setattr(redis_manager, 'raw', fake)
+    monkeypatch.setattr(redis_manager, 'available', True)
+    return fake
+
+
+def _frame_top(df, count, maximum_stock_price, risk_tolerance):
+    """The filters of build_portfolio_with_top_stocks applied to the whole table"""
+    annual = portfolio_module.annualReturn
+    selected = df[(df['strength'] > 0) & (df['expected_annual_return'] > 0) & (df['price'] < maximum_stock_price)]
+    if selected.empty:
+        selected = df[df['strength'] > 0]
+    selected = annual.get_risk_tolerance_data(risk_tolerance, selected)
+    if selected.empty:
+        selected = df[df['strength'] > 0]
+    return selected.head(count).reset_index(drop=True)
+
+
+def test_save_indexes_rows_and_scores(fake_redis):
+    df = strength_table()
+    key = 'strength_data:Value@1:Any:S&P 500'
+    assert redis_manager.save_strength_batch({key: df})
+
+    table = decode_frame(fake_redis.values[key])
+    assert list(table['Ticker']) == list(df['Ticker'])
+    assert set(fake_redis.values[f"{key}:rows"]) == set(df['Ticker'])
+    assert fake_redis.values[f"{key}:by:price"]['T000'] == df.set_index('Ticker').loc['T000', 'price']
+
+    # saving again drops tickers that left the table
+    redis_manager.save_strength_data(df.iloc[:10], key)
+    assert len(fake_redis.values[f"{key}:by:strength"]) == 10
+
+
+def test_top_strength_within_bounds(fake_redis):
+    df = strength_table()
+    key = 'strength_data:Value@1:Any:S&P 500'
+    redis_manager.save_strength_data(df, key)
+
+    top = redis_manager.get_top_strength(key, 5, above={'strength': 0, 'expected_annual_risk': 0.2},
+                                         below={'price': 200})
+    expected = df[(df['strength'] > 0) & (df['expected_annual_risk'] > 0.2) & (df['price'] < 200)].head(5)
+    pd.testing.assert_frame_equal(top, expected.reset_index(drop=True))
+
+    assert redis_manager.get_top_strength(key, 5, above={'strength': 100}).empty
+    assert not [k for k in fake_redis.values if ':query:' in k]  # temporary sets are removed
+    assert redis_manager.get_top_strength('strength_data:Value@1:Any:Missing', 5) is None
+    with pytest.raises(ValueError):
+        redis_manager.get_top_strength(key, 5, above={'pe': 0})
+
+
+
+def test_top_strength_reads_back_at_most_count_members(fake_redis, monkeypatch):
+    df = strength_table(rows=200)
+    key = 'strength_data:Value@1:Any:S&P 500'
+    redis_manager.save_strength_data(df, key)
+    read = []
+    execute = fake_redis.execute
+
+    def counting_execute():
+        results = execute()
+        read.extend(len(r) for r in results if isinstance(r, list))
+        return results
+
+    monkeypatch.setattr(fake_redis, 'execute', counting_execute)
+    top = redis_manager.get_top_strength(key, 4)
+    assert list(top['Ticker']) == list(df['Ticker'].head(4))
+    filtered = redis_manager.get_top_strength(key, 4, above={'strength': 0}, below={'price': 100})
+    assert list(filtered['Ticker']) == list(df[(df['strength'] > 0) & (df['price'] < 100)]['Ticker'].head(4))
+    assert read and max(read) <= 4
+
+@pytest.mark.parametrize('maximum_stock_price,risk_tolerance', [
+    (250, 'Medium'), (400, 'Low'), (100, 'High'), (6, 'Medium'), (400, 'Unknown'),
+])
+def test_portfolio_candidates_match_frame_filters(fake_redis, maximum_stock_price, risk_tolerance):
+    df = strength_table()
+    redis_manager.save_strength_data(df, 'strength_data:Value@1:Any:S&P 500')
+    builder = portfolio_module.portfolio()
+
+    candidates = builder.get_top_strength_stocks('Value', 'Any', 'S&P 500', 5, maximum_stock_price, risk_tolerance)
+    pd.testing.assert_frame_equal(candidates, _frame_top(df, 5, maximum_stock_price, risk_tolerance))
+
+    assert builder.get_top_strength_stocks('Value', 'Any', 'Dow Jones', 5, maximum_stock_price, risk_tolerance) is None
+
+
+def test_strength_table_round_trips_with_projection(fake_redis):
+    df = strength_table().reset_index(drop=True)
+    df.loc[3, 'Ticker'] = 'NAN'  # read_json used to turn ticker-like strings into other values
+    df['Company'] = 'Company ' + df['Ticker']
+    key = 'strength_data:Value@1:Any:S&P 500'
+    redis_manager.save_strength_data(df, key)
+
+    pd.testing.assert_frame_equal(redis_manager.get_strength_data(key), df, check_dtype=False)
+    projected = redis_manager.get_strength_data(key, ['Ticker', 'strength'])
+    assert list(projected.columns) == ['Ticker', 'strength']
+    assert projected['strength'].dtype == np.float64 and projected.loc[3, 'Ticker'] == 'NAN'
+
+    assert redis_manager.get_strength_data(key, ['Ticker', 'pe']).empty
+    assert redis_manager.get_strength_data('strength_data:Value@1:Any:Missing').empty
@@ -0,0 +1,149 @@
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Binary frame layout:
+#   magic | uint32 header length | JSON header | column buffers
+# The header is the schema: row count and, per column, its name, type and the
+# offset and size of each buffer. Buffers start on 8-byte boundaries so numeric
+# columns can be read with np.frombuffer without copying. Categorical columns
+# are stored as strings and flagged "category" to be restored on decode.
+FRAME_MAGIC = b'SFRM1'
+_HEADER = struct.Struct('<I')
+_ALIGN = 8
+
+# Numeric column types stored as little-endian arrays
+_NUMERIC_TYPES = {'b': '|b1', 'i': '<i8', 'u': '<u8', 'f': '<f8'}
+
+
+def _pad(size: int) -> int:
+    return -size % _ALIGN
+
+
+def _column_type(series: pd.Series) -> str:
+    dtype = series.dtype
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        # Nullable numbers are stored as floats with NaN for missing values
+        return '<f8' if dtype.kind in 'biuf' else 'str'
+    if dtype.kind == 'M':
+        return 'datetime64[ns]'
+    if dtype.kind in _NUMERIC_TYPES:
+        return np.dtype(_NUMERIC_TYPES[dtype.kind]).str
+    return 'str'
+
+
+def encode_frame(df: pd.DataFrame) -> bytes:
+    """Encode the columns of a frame with their types; the index is dropped
+
+    Numeric and datetime columns keep their type, everything else is stored as
+    UTF-8 strings with a mask of missing values.
+    """
+    columns: List[Dict[str, Any]] = []
+    buffers: List[bytes] = []
+    offset = 0
+
+    def add(buffer: bytes) -> Dict[str, int]:
+        nonlocal offset
+        buffers.append(buffer + b'\0' * _pad(len(buffer)))
+        entry = {'offset': offset, 'size': len(buffer)}
+        offset += len(buffer) + _pad(len(buffer))
+        return entry
+
+    for name in df.columns:
+        series = df[name]
+        kind = _column_type(series)
+        column = {'name': str(name), 'type': kind}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            column['category'] = True
+        if kind == 'datetime64[ns]':
+            values = series.to_numpy(dtype='datetime64[ns]').view('<i8')
+            column['data'] = add(np.ascontiguousarray(values).tobytes())
+        elif kind != 'str':
+            values = series.to_numpy(dtype=kind, na_value=np.nan) if kind == '<f8' else series.to_numpy(dtype=kind)
+            column['data'] = add(np.ascontiguousarray(values).tobytes())
+        else:
+            missing = series.isna().to_numpy()
+            encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(series.tolist(), missing)]
+            offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            column['offsets'] = add(offsets.tobytes())
+            column['data'] = add(b''.join(encoded))
+            if missing.any():
+                column['missing'] = add(np.packbits(missing).tobytes())
+        columns.append(column)
+
+    header = json.dumps({'rows': len(df), 'columns': columns}).encode('utf-8')
+    start = len(FRAME_MAGIC) + _HEADER.size + len(header)
+    return b''.join([FRAME_MAGIC, _HEADER.pack(len(header)), header, b'\0' * _pad(start)] + buffers)
+
+
+def frame_schema(buffer: bytes) -> Dict[str, Any]:
+    """Header of an encoded frame: {"rows", "columns": [{"name", "type", ...}]}, plus the data start
+
+    Raises:
+        ValueError: when the buffer is not an encoded frame
+    """
+    if not buffer.startswith(FRAME_MAGIC):
+        raise ValueError("Not an encoded frame")
+    (length,) = _HEADER.unpack_from(buffer, len(FRAME_MAGIC))
+    start = len(FRAME_MAGIC) + _HEADER.size
+    schema = json.loads(bytes(buffer[start:start + length]))
+    start += length
+    schema['start'] = start + _pad(start)
+    return schema
+
+
+def decode_frame(buffer: bytes, columns: Optional[List[str]] = None, copy: bool = True) -> pd.DataFrame:
+    """Decode an encoded frame, optionally only some of its columns
+
+    The columns left out of a projection are never decoded. Categorical
+    columns come back as categories.
+
+    Args:
+        buffer: bytes from encode_frame
+        columns: columns to decode, in this order; all of them by default
+        copy: copy numeric columns out of the buffer so the frame is
+            writable; False keeps them as read-only views of the buffer, for
+            callers that only read the frame
+
+    Raises:
+        ValueError: when the buffer is not an encoded frame or lacks a column
+    """
+    schema = frame_schema(buffer)
+    rows, start = schema['rows'], schema['start']
+    by_name = {column['name']: column for column in schema['columns']}
+    names = list(by_name) if columns is None else list(columns)
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Encoded frame has no column {unknown}")
+
+    def view(entry, dtype):
+        return np.frombuffer(buffer, dtype=dtype, count=entry['size'] // np.dtype(dtype).itemsize,
+                             offset=start + entry['offset'])
+
+    def numbers(entry, dtype):
+        values = view(entry, dtype)
+        return values.copy() if copy else values
+
+    data = {}
+    for name in names:
+        column = by_name[name]
+        kind = column['type']
+        if kind == 'datetime64[ns]':
+            data[name] = numbers(column['data'], '<i8').view('datetime64[ns]')
+        elif kind != 'str':
+            data[name] = numbers(column['data'], kind)
+        else:
+            offsets = view(column['offsets'], '<i8').tolist()
+            first = start + column['data']['offset']
+            raw = bytes(buffer[first:first + column['data']['size']])
+            values = [raw[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+            if 'missing' in column:
+                missing = np.unpackbits(view(column['missing'], '|u1'), count=rows).astype(bool)
+                values = [None if null else value for value, null in zip(values, missing)]
+            data[name] = pd.array(values, dtype='category' if column.get('category') else 'str')
+    # The arrays are already copied when asked for, pandas must not copy them again
+    return pd.DataFrame(data, columns=names, index=pd.RangeIndex(rows), copy=False)
@@ -0,0 +1,400 @@
+"""
+Price Store
+Local daily price history of every ticker, read without a Yahoo download
+
+File format, per ticker in PRICE_STORE_DIR:
+    <TICKER>.npy   float64 matrix in NumPy .npy format, Fortran (column-major)
+                   order, one row per trading day sorted by date, columns
+                   date (days since 1970-01-01), open, high, low, close,
+                   adj_close, volume; closes are unadjusted
+    <TICKER>.json  metadata: {"format": PRICE_FORMAT, "dividends": {date:
+                   factor}, "splits": {date: factor}}; a factor applies to
+                   every row dated before its key
+Both files are written to a temporary file and renamed into place.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Price history location from environment variables
+PRICE_STORE_DIR = os.getenv(
+    'PRICE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'price_history')
+)
+
+# Column layout of every ticker file; the date is stored as days since the epoch
+FIELDS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+_COLUMNS = ['date'] + FIELDS
+# Fields scaled by the corporate action factors when read adjusted
+PRICE_FIELDS = ['open', 'high', 'low', 'close']
+# Histories written before this format held Yahoo's auto-adjusted closes
+PRICE_FORMAT = 2
+
+
+def _field_name(column) -> str:
+    """Map a Yahoo column name ('Adj Close') to a store field ('adj_close')"""
+    return str(column).strip().lower().replace(' ', '_')
+
+
+def _to_days(dates) -> np.ndarray:
+    return pd.DatetimeIndex(dates).normalize().values.astype('datetime64[D]').astype(np.int64)
+
+
+def _from_days(days: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(days.astype(np.int64).astype('datetime64[D]'), name='Date')
+
+
+class PriceStore:
+    """Local daily price history, one memory-mapped column-major file per ticker
+
+    Each ticker is a float64 matrix saved in Fortran order with the columns
+    date, open, high, low, close, adj_close and volume, so reading one field
+    across many tickers only touches that column. Files are replaced
+    atomically on write and rows are kept sorted and unique by date.
+
+    Closes are stored as Yahoo reports them without auto_adjust. Dividends
+    and splits found in appended rows become adjustment factors in the
+    ticker's metadata, and adjusted prices are computed from them on read,
+    so a corporate action never requires re-downloading the history.
+
+    When the directory cannot be written (e.g. a read-only deployment) the
+    store keeps the history in memory for the lifetime of the process.
+    """
+
+    def __init__(self, root: str = PRICE_STORE_DIR):
+        self.root = root
+        self._memory = {}
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            self.available = os.access(self.root, os.W_OK)
+        except OSError as e:
+            logging.warning(f"Price store directory {self.root} unavailable: {e}")
+            self.available = False
+        if not self.available:
+            logging.warning("Price store not writable - keeping price history in memory")
+
+    def _path(self, ticker: str, suffix: str = '.npy') -> str:
+        return os.path.join(self.root, ticker.upper().replace('/', '_') + suffix)
+
+    def _load(self, ticker: str) -> Optional[np.ndarray]:
+        """Load the raw matrix of a ticker, memory-mapped when on disk"""
+        if not self.available:
+            return self._memory.get(ticker.upper())
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode='r')
+        except Exception as e:
+            logging.error(f"Error loading price history for {ticker}: {e}")
+            return None
+
+    def _save(self, ticker: str, matrix: np.ndarray):
+        matrix = np.asfortranarray(matrix, dtype=np.float64)
+        if not self.available:
+            with self._lock:
+                self._memory[ticker.upper()] = matrix
+            return
+        path = self._path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            np.save(fh, matrix)
+        os.replace(tmp_path, path)
+
+    def _load_meta(self, ticker: str) -> Dict:
+        if not self.available:
+            return self._memory.get(ticker.upper() + ':meta', {})
+        try:
+            with open(self._path(ticker, '.json')) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self, ticker: str, meta: Dict):
+        if not self.available:
+            with self._lock:
+                self._memory[ticker.upper() + ':meta'] = meta
+            return
+        path = self._path(ticker, '.json')
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp_path, path)
+
+    def has_history(self, ticker: str) -> bool:
+        matrix = self._load(ticker)
+        return matrix is not None and len(matrix) > 0
+
+    def date_range(self, ticker: str):
+        """First and last stored date of a ticker, (None, None) when empty"""
+        matrix = self._load(ticker)
+        if matrix is None or len(matrix) == 0:
+            return None, None
+        dates = _from_days(np.asarray(matrix[[0, -1], 0]))
+        return dates[0], dates[1]
+
+    def covered_since(self, ticker: str) -> Optional[pd.Timestamp]:
+        """Earliest start date that has already been requested for the ticker
+
+        A ticker that listed after this date has no older rows to fetch, so
+        the head of its history counts as complete from here on.
+        """
+        start = self._load_meta(ticker).get('requested_start')
+        return pd.Timestamp(start) if start else None
+
+    def append(self, ticker: str, prices: pd.DataFrame, requested_start=None) -> int:
+        """Merge new daily rows into the history of a ticker
+
+        Args:
+            ticker: ticker symbol
+            prices: date-indexed frame with Yahoo-style columns (Open, Close, ...),
+                optionally with the Dividends and Stock Splits action columns
+            requested_start: start date of the download that produced prices
+
+        Returns:
+            number of dates that were not stored before
+        """
+        meta = self._load_meta(ticker)
+        if requested_start is not None:
+            covered = self.covered_since(ticker)
+            requested_start = pd.Timestamp(requested_start).normalize()
+            if covered is None or requested_start < covered:
+                meta['requested_start'] = requested_start.strftime('%Y-%m-%d')
+                self._save_meta(ticker, meta)
+
+        prices = prices.rename(columns=_field_name)
+        if 'close' not in prices.columns:
+            return 0
+        prices = prices[prices['close'].notna()].sort_index()
+        if prices.empty:
+            return 0
+
+        new = np.full((len(prices), len(_COLUMNS)), np.nan)
+        new[:, 0] = _to_days(prices.index)
+        for j, field in enumerate(FIELDS, start=1):
+            if field in prices.columns:
+                new[:, j] = pd.to_numeric(prices[field], errors='coerce').to_numpy(dtype=float)
+
+        current = self._load(ticker)
+        if meta.get('format') != PRICE_FORMAT:
+            # Adjusted closes from an older format cannot be mixed with raw ones
+            current = None
+        if current is None or len(current) == 0:
+            current = None
+            merged = new
+            added = len(np.unique(new[:, 0]))
+        else:
+            current = np.asarray(current)
+            added = len(np.setdiff1d(new[:, 0], current[:, 0]))
+            # New rows win for dates already present (late corrections)
+            merged = np.vstack([current, new])
+        order = np.argsort(merged[:, 0], kind='stable')
+        merged = merged[order]
+        last_of_each = np.append(merged[1:, 0] != merged[:-1, 0], True)
+
+        self._update_adjustments(meta, prices, new[:, 0], current)
+        meta['format'] = PRICE_FORMAT
+        self._save(ticker, merged[last_of_each])
+        self._save_meta(ticker, meta)
+        return int(added)
+
+    @staticmethod
+    def _update_adjustments(meta: Dict, prices: pd.DataFrame, days: np.ndarray, current: Optional[np.ndarray]):
+        """Record the dividends and splits of newly appended rows as factors
+
+        A factor applies to every row dated before its key. Yahoo closes are
+        already split-adjusted as of the download, so a split only needs a
+        factor for the rows stored by earlier downloads.
+        """
+        first_new = days[0]
+        reloaded = current is None or first_new <= current[0, 0]
+
+        def before_new(events):
+            return {d: f for d, f in events.items() if _to_days([d])[0] < first_new}
+
+        dividends = before_new(meta.get('dividends', {}))
+        splits = {} if reloaded else before_new(meta.get('splits', {}))
+
+        if 'dividends' in prices.columns:
+            closes = prices['close'].to_numpy(dtype=float)
+            previous = np.append(np.nan, closes[:-1])
+            if current is not None:
+                stored = current[current[:, 0] < first_new]
+                if len(stored):
+                    previous[0] = stored[-1, _COLUMNS.index('close')]
+            amounts = pd.to_numeric(prices['dividends'], errors='coerce').fillna(0).to_numpy(dtype=float)
+            for i in np.flatnonzero(amounts > 0):
+                if previous[i] > amounts[i]:
+                    key = prices.index[i].strftime('%Y-%m-%d')
+                    dividends[key] = dividends.get(key, 1.0) * (1 - amounts[i] / previous[i])
+
+        if not reloaded and 'stock_splits' in prices.columns:
+            ratios = pd.to_numeric(prices['stock_splits'], errors='coerce').fillna(0).to_numpy(dtype=float)
+            ratios = ratios[(ratios > 0) & (ratios != 1)]
+            if len(ratios):
+                key = _from_days(days[:1])[0].strftime('%Y-%m-%d')
+                splits[key] = splits.get(key, 1.0) * float(np.prod(1 / ratios))
+
+        meta['dividends'] = dividends
+        meta['splits'] = splits
+
+    def adjustment_factors(self, ticker: str, dates=None) -> np.ndarray:
+        """Cumulative dividend and split factor for each date of a ticker
+
+        Args:
+            ticker: ticker symbol
+            dates: dates to compute the factor for, every stored date by default
+
+        Returns:
+            array of factors; multiply raw prices by it for total-return prices
+        """
+        if dates is None:
+            matrix = self._load(ticker)
+            days = np.asarray(matrix[:, 0]) if matrix is not None else np.empty(0)
+        else:
+            days = _to_days(dates)
+        return self._factors(self._load_meta(ticker), days)
+
+    @staticmethod
+    def _factors(meta: Dict, days: np.ndarray) -> np.ndarray:
+        events = {}
+        for kind in ('dividends', 'splits'):
+            for date, factor in meta.get(kind, {}).items():
+                events[date] = events.get(date, 1.0) * factor
+        if not events:
+            return np.ones(len(days))
+        event_days = _to_days(list(events))
+        order = np.argsort(event_days)
+        factors = np.array(list(events.values()))[order]
+        # suffix[i] is the product of every factor from event i on
+        suffix = np.append(np.cumprod(factors[::-1])[::-1], 1.0)
+        return suffix[np.searchsorted(event_days[order], days, side='right')]
+
+    def read_ticker(self, ticker: str, start=None, end=None, adjusted: bool = False) -> pd.DataFrame:
+        """Date-indexed price history of one ticker
+
+        adj_close is always the close adjusted for every recorded dividend and
+        split; adjusted=True scales open, high, low and close the same way.
+        """
+        matrix = self._load(ticker)
+        if matrix is None or len(matrix) == 0:
+            return pd.DataFrame(columns=FIELDS, index=pd.DatetimeIndex([], name='Date'))
+        lo, hi = self._bounds(matrix[:, 0], start, end)
+        matrix = np.array(matrix[lo:hi])
+        factors = self._factors(self._load_meta(ticker), matrix[:, 0])
+        close = _COLUMNS.index('close')
+        matrix[:, _COLUMNS.index('adj_close')] = matrix[:, close] * factors
+        if adjusted:
+            for field in PRICE_FIELDS:
+                matrix[:, _COLUMNS.index(field)] *= factors
+        return pd.DataFrame(matrix[:, 1:], index=_from_days(matrix[:, 0]), columns=FIELDS)
+
+    def read(self, tickers: Iterable[str], start=None, end=None, field: str = 'close',
+             adjusted: bool = False) -> pd.DataFrame:
+        """Dates x tickers matrix of one field, NaN where a ticker has no row
+
+        Args:
+            tickers: ticker symbols; tickers without history are left out
+            start: first date to include
+            end: last date to include (inclusive)
+            field: one of FIELDS; adj_close is the adjusted close
+            adjusted: apply the dividend and split factors to a price field
+
+        Returns:
+            DataFrame indexed by date with one column per ticker
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown price field {field}, expected one of {FIELDS}")
+        if field == 'adj_close':
+            field, adjusted = 'close', True
+        adjusted = adjusted and field in PRICE_FIELDS
+        j = _COLUMNS.index(field)
+        series = {}
+        for ticker in tickers:
+            matrix = self._load(ticker)
+            if matrix is None or len(matrix) == 0:
+                continue
+            lo, hi = self._bounds(matrix[:, 0], start, end)
+            days = np.asarray(matrix[lo:hi, 0])
+            values = np.array(matrix[lo:hi, j])
+            if adjusted:
+                values *= self._factors(self._load_meta(ticker), days)
+            series[ticker] = pd.Series(values, index=_from_days(days))
+        if not series:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'))
+        df = pd.concat(series, axis=1).sort_index()
+        df.index.name = 'Date'
+        return df
+
+    @staticmethod
+    def _bounds(days, start, end):
+        lo, hi = 0, len(days)
+        if start is not None:
+            lo = int(np.searchsorted(days, _to_days([start])[0], side='left'))
+        if end is not None:
+            hi = int(np.searchsorted(days, _to_days([end])[0], side='right'))
+        return lo, hi
+
+    def missing_ranges(self, tickers: Iterable[str], start, end) -> Dict[tuple, List[str]]:
+        """Group tickers by the date range that still has to be downloaded
+
+        Only trading days after the last stored row are requested, plus the
+        head of the history when an earlier start is asked for than before.
+        Histories stored before raw closes were kept are requested in full.
+
+        Args:
+            tickers: ticker symbols
+            start: first date the caller needs
+            end: exclusive end date, as passed to yf.download
+
+        Returns:
+            dict mapping (start, end) timestamps to the tickers needing that range
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize()
+        last_business_day = end - pd.offsets.BDay(1)
+        ranges = {}
+        for ticker in tickers:
+            first, last = self.date_range(ticker)
+            covered = self.covered_since(ticker)
+            if first is None or self._load_meta(ticker).get('format') != PRICE_FORMAT:
+                ranges.setdefault((start, end), []).append(ticker)
+                continue
+            if first > start and (covered is None or covered > start):
+                # Backfill the head together with everything after it
+                ranges.setdefault((start, end), []).append(ticker)
+                continue
+            if last < last_business_day:
+                ranges.setdefault((last + pd.Timedelta(days=1), end), []).append(ticker)
+        return ranges
+
+    def tickers(self) -> List[str]:
+        """All tickers with stored history"""
+        if not self.available:
+            return [k for k in self._memory if not k.endswith(':meta')]
+        return sorted(name[:-4] for name in os.listdir(self.root) if name.endswith('.npy'))
+
+    def clear(self, ticker: str = None):
+        """Remove the history of one ticker, or of every ticker"""
+        tickers = [ticker] if ticker else self.tickers()
+        for t in tickers:
+            if not self.available:
+                self._memory.pop(t.upper(), None)
+                self._memory.pop(t.upper() + ':meta', None)
+                continue
+            for suffix in ('.npy', '.json'):
+                try:
+                    os.remove(self._path(t, suffix))
+                except FileNotFoundError:
+                    pass
+
+
+# Global instance
+price_store = PriceStore()
@@ -1,5 +1,6 @@
 import json
 import logging
+import numpy as np
 import pandas as pd
 import redis
 import uuid
@@ -7,6 +8,8 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 
+from utilities.frame_codec import decode_frame, encode_frame
+
 # Redis connection configuration from environment variables
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
@@ -69,11 +72,19 @@ except Exception as e:
         REDIS_AVAILABLE = False
         r = None
 
+# Strength table columns also kept as sorted sets by ticker, so top-K queries
+# with score filters fetch only the rows they return
+STRENGTH_INDEX_COLUMNS = ['strength', 'price', 'expected_annual_return', 'expected_annual_risk']
+STRENGTH_TTL = 86400  # 24 hours
+
 class RedisDataManager:
     """Redis-based data manager for stock portfolio application"""
     
     def __init__(self):
         self.r = r
+        # Same server without response decoding, for values stored as binary frames
+        self.raw = redis.Redis(connection_pool=redis.ConnectionPool(
+            **{**r.connection_pool.connection_kwargs, 'decode_responses': False})) if r is not None else None
         self.available = REDIS_AVAILABLE
     
     def _generate_id(self) -> str:
@@ -172,6 +183,40 @@ class RedisDataManager:
             logging.error(f"Error retrieving stock data: {e}")
             return pd.DataFrame()
     
+    def get_stock_data_sectors(self, index: str, sectors: List[str]) -> pd.DataFrame:
+        """Get the fresh stock data of several sectors of an index with one MGET
+
+        Returns one frame whose Sector column names the sector of every row;
+        sectors that are missing or stale have no rows.
+        """
+        if not self.available:
+            logging.warning("Redis not available - returning empty DataFrame")
+            return pd.DataFrame()
+
+        try:
+            values = self.r.mget([f"stock_data:{index}:{sector}" for sector in sectors])
+            frames = []
+            for sector, data in zip(sectors, values):
+                if not data:
+                    continue
+                data_dict = json.loads(data)
+                age_hours = (datetime.now() - datetime.fromisoformat(data_dict['timestamp'])).total_seconds() / 3600
+                if age_hours > 168:  # Data is stale (older than 7 days)
+                    continue
+                df = pd.DataFrame(data_dict['data'])
+                df['Sector'] = sector
+                if 'Index' not in df.columns:
+                    df['Index'] = index
+                frames.append(df)
+
+            logging.info(f"Retrieved fresh stock data for {len(frames)}/{len(sectors)} sectors of {index}")
+            if not frames:
+                return pd.DataFrame()
+            return pd.concat(frames, ignore_index=True)
+        except Exception as e:
+            logging.error(f"Error retrieving stock data for the sectors of {index}: {e}")
+            return pd.DataFrame()
+
     def get_stock_data_any_age(self, index: str, sector: str) -> pd.DataFrame:
         """Get stock data from Redis regardless of age (for immediate display)"""
         if not self.available:
@@ -249,6 +294,141 @@ class RedisDataManager:
             logging.error(f"Error retrieving average metrics: {e}")
             return pd.DataFrame()
     
+    def save_sector_aggregates(self, document: Dict[str, Any], version: str) -> bool:
+        """Save a sector aggregates document under its version and make it current"""
+        if not self.available:
+            logging.warning("Redis not available - skipping save operation")
+            return False
+        
+        try:
+            key = f"sector_aggregates:{version}"
+            previous = self.r.get("sector_aggregates:current")
+            pipe = self.r.pipeline()
+            # Save with 7-day TTL to match the screener data it is computed from
+            pipe.setex(key, 7 * 24 * 60 * 60, json.dumps(document))
+            pipe.set("sector_aggregates:current", version)
+            if previous and previous != version:
+                # Keep the old version around briefly for readers that already hold its id
+                pipe.expire(f"sector_aggregates:{previous}", 60 * 60)
+            pipe.execute()
+            logging.info(f"Saved sector aggregates version {version}")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving sector aggregates: {e}")
+            return False
+    
+    def get_sector_aggregates_version(self) -> Optional[str]:
+        """Get the version id of the current sector aggregates document"""
+        if not self.available:
+            return None
+        
+        try:
+            return self.r.get("sector_aggregates:current")
+        except Exception as e:
+            logging.error(f"Error retrieving sector aggregates version: {e}")
+            return None
+    
+    def get_sector_aggregates(self, version: str) -> Dict[str, Any]:
+        """Get a sector aggregates document by version"""
+        if not self.available:
+            logging.warning("Redis not available - returning empty document")
+            return {}
+        
+        try:
+            data = self.r.get(f"sector_aggregates:{version}")
+            if data:
+                return json.loads(data)
+            logging.info(f"No sector aggregates found for version {version}")
+            return {}
+        except Exception as e:
+            logging.error(f"Error retrieving sector aggregates: {e}")
+            return {}
+
+    def save_chart_document(self, index: str, payloads: Dict[str, str], version: str, ttl_seconds: int) -> bool:
+        """Replace the chart document of an index with encoded payloads by chart type
+
+        The document is one hash, so every chart type of a version is
+        published together and read back with a single HGET.
+        """
+        if not self.available:
+            logging.warning("Redis not available - skipping save operation")
+            return False
+
+        try:
+            key = f"chart_data:{index}"
+            pipe = self.r.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping={**payloads, 'version': version})
+            pipe.expire(key, ttl_seconds)
+            pipe.execute()
+            logging.info(f"Saved chart document {version} for {index}")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving chart document: {e}")
+            return False
+
+    def get_chart_payload(self, index: str, chart_type: str) -> Optional[str]:
+        """Get the encoded payload of one chart type, or None when not published"""
+        if not self.available:
+            return None
+
+        try:
+            return self.r.hget(f"chart_data:{index}", chart_type)
+        except Exception as e:
+            logging.error(f"Error retrieving chart payload: {e}")
+            return None
+
+    def save_covariance(self, method: str, tickers: List[str], matrix: np.ndarray, version: str,
+                        ttl_seconds: int) -> bool:
+        """Save a universe covariance matrix as one hash of raw float64 bytes, tickers and version"""
+        if not self.available:
+            logging.warning("Redis not available - skipping save operation")
+            return False
+
+        try:
+            key = f"covariance:{method}"
+            pipe = self.raw.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping={
+                'version': version,
+                'tickers': json.dumps(tickers),
+                'matrix': np.ascontiguousarray(matrix, dtype='<f8').tobytes(),
+            })
+            pipe.expire(key, ttl_seconds)
+            pipe.execute()
+            logging.info(f"Saved {method} covariance version {version} of {len(tickers)} tickers")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving covariance: {e}")
+            return False
+
+    def get_covariance_version(self, method: str) -> Optional[str]:
+        """Get the version id of the saved covariance of a method"""
+        if not self.available:
+            return None
+
+        try:
+            return self.r.hget(f"covariance:{method}", 'version')
+        except Exception as e:
+            logging.error(f"Error retrieving covariance version: {e}")
+            return None
+
+    def get_covariance(self, method: str) -> Optional[tuple]:
+        """Get the saved covariance of a method as (tickers, matrix, version), or None"""
+        if not self.available:
+            return None
+
+        try:
+            data = self.raw.hgetall(f"covariance:{method}")
+            if not data:
+                return None
+            tickers = json.loads(data[b'tickers'])
+            matrix = np.frombuffer(data[b'matrix'], dtype='<f8').reshape(len(tickers), len(tickers))
+            return tickers, matrix, data[b'version'].decode()
+        except Exception as e:
+            logging.error(f"Error retrieving covariance: {e}")
+            return None
+
     def save_user(self, email: str, name: str, password: str) -> bool:
         """Save user data"""
         if not self.available:
@@ -507,6 +687,107 @@ class RedisDataManager:
         except Exception as e:
             logging.error(f"Error retrieving annual returns: {e}")
             return pd.DataFrame()
+
+    def save_ticker_returns(self, df: pd.DataFrame, ttl_hours: int = 48) -> bool:
+        """Save one annual return record per ticker, each with its own TTL"""
+        if not self.available:
+            logging.warning("Redis not available - skipping save operation")
+            return False
+
+        try:
+            timestamp = self._get_timestamp()
+            pipe = self.r.pipeline()
+            for record in df.to_dict(orient='records'):
+                record['timestamp'] = timestamp
+                pipe.setex(f"annual_return:{record['Ticker']}", ttl_hours * 60 * 60, json.dumps(record))
+            pipe.execute()
+            logging.info(f"Saved annual returns for {len(df)} tickers (TTL: {ttl_hours}h)")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving ticker annual returns: {e}")
+            return False
+
+    def get_ticker_returns(self, tickers: List[str]) -> pd.DataFrame:
+        """Get the annual return records of the given tickers in one round trip
+
+        Tickers without a record are left out. The timestamp column holds the
+        time each record was computed.
+        """
+        if not self.available or not tickers:
+            return pd.DataFrame()
+
+        try:
+            values = self.r.mget([f"annual_return:{ticker}" for ticker in tickers])
+            records = [json.loads(value) for value in values if value]
+            logging.info(f"Found annual returns for {len(records)}/{len(tickers)} tickers in Redis")
+            return pd.DataFrame(records)
+        except Exception as e:
+            logging.error(f"Error retrieving ticker annual returns: {e}")
+            return pd.DataFrame()
+
+    def save_ticker_failures(self, tickers: List[str], ttl_seconds: int) -> bool:
+        """Mark tickers whose annual return could not be loaded, each for ttl_seconds"""
+        if not self.available or not tickers:
+            return False
+
+        try:
+            pipe = self.r.pipeline()
+            for ticker in tickers:
+                pipe.setex(f"annual_return_failed:{ticker}", ttl_seconds, self._get_timestamp())
+            pipe.execute()
+            logging.info(f"Marked {len(tickers)} tickers as failed for {ttl_seconds}s")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving ticker failures: {e}")
+            return False
+
+    def get_ticker_failures(self, tickers: List[str]) -> set:
+        """Tickers among the given ones that have a failure marker, in one round trip"""
+        if not self.available or not tickers:
+            return set()
+
+        try:
+            values = self.r.mget([f"annual_return_failed:{ticker}" for ticker in tickers])
+            return {ticker for ticker, value in zip(tickers, values) if value}
+        except Exception as e:
+            logging.error(f"Error retrieving ticker failures: {e}")
+            return set()
+
+    def save_return_metrics(self, df: pd.DataFrame) -> bool:
+        """Save the multi-horizon return metrics table"""
+        if not self.available:
+            logging.warning("Redis not available - skipping save operation")
+            return False
+        
+        try:
+            key = "return_metrics"
+            data = {
+                'data': df.to_dict(orient='records'),
+                'timestamp': self._get_timestamp(),
+                'count': len(df)
+            }
+            # Same 48-hour TTL as the annual returns it extends
+            self.r.setex(key, 48 * 60 * 60, json.dumps(data))
+            logging.info(f"Saved return metrics with {len(df)} records (TTL: 48h)")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving return metrics: {e}")
+            return False
+    
+    def get_return_metrics(self) -> pd.DataFrame:
+        """Get the multi-horizon return metrics table"""
+        if not self.available:
+            return pd.DataFrame()
+        
+        try:
+            data = self.r.get("return_metrics")
+            if data:
+                return pd.DataFrame(json.loads(data)['data'])
+            logging.info("No return metrics found in Redis")
+            return pd.DataFrame()
+        except Exception as e:
+            logging.error(f"Error retrieving return metrics: {e}")
+            return pd.DataFrame()
     
     def get_annual_returns_cache_status(self) -> Dict[str, Any]:
         """Get detailed cache status for annual returns"""
@@ -541,8 +822,17 @@ class RedisDataManager:
             return False
         
         try:
-            key = "annual_returns"
-            result = self.r.delete(key)
+            result = self.r.delete("annual_returns")
+            # SCAN instead of KEYS: there is one record per ticker
+            for pattern in ("annual_return:*", "annual_return_failed:*"):
+                batch = []
+                for key in self.r.scan_iter(match=pattern, count=500):
+                    batch.append(key)
+                    if len(batch) == 500:
+                        result += self.r.delete(*batch)
+                        batch = []
+                if batch:
+                    result += self.r.delete(*batch)
             if result:
                 logging.info("Cleared annual returns data from Redis")
             else:
@@ -590,24 +880,137 @@ class RedisDataManager:
             return 0
 
     def save_strength_data(self, df, cache_key):
-        """Save strength data to Redis"""
+        """Save strength data to Redis as a binary frame"""
         try:
-            # Convert DataFrame to JSON string
-            data_json = df.to_json(orient='records')
-            # Save with 24-hour TTL (86400 seconds)
-            self.r.setex(cache_key, 86400, data_json)
+            pipe = self.raw.pipeline()
+            pipe.setex(cache_key, STRENGTH_TTL, encode_frame(df))
+            self._queue_strength_index(pipe, cache_key, df)
+            pipe.execute()
             logging.debug(f"Saved strength data to Redis: {cache_key}")
             return True
         except Exception as e:
             logging.error(f"Error saving strength data to Redis: {e}")
             return False
 
-    def get_strength_data(self, cache_key):
-        """Get strength data from Redis"""
+    def save_strength_batch(self, frames: Dict[str, pd.DataFrame]) -> bool:
+        """Save several strength tables, keyed by cache key, in one pipeline"""
         try:
-            data_json = self.r.get(cache_key)
-            if data_json:
-                df = pd.read_json(data_json, orient='records')
+            pipe = self.raw.pipeline()
+            for cache_key, df in frames.items():
+                pipe.setex(cache_key, STRENGTH_TTL, encode_frame(df))
+                self._queue_strength_index(pipe, cache_key, df)
+            pipe.execute()
+            logging.debug(f"Saved {len(frames)} strength tables to Redis")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving strength data batch to Redis: {e}")
+            return False
+
+    def _queue_strength_index(self, pipe, cache_key: str, df: pd.DataFrame):
+        """Queue the rows hash and the sorted sets of a strength table on a pipeline
+
+        <cache_key>:rows maps each ticker to its row as JSON and
+        <cache_key>:by:<column> scores the tickers by that column. The old
+        index is dropped first so tickers that left the table do not linger.
+        """
+        index_keys = [f"{cache_key}:by:{col}" for col in STRENGTH_INDEX_COLUMNS]
+        pipe.delete(f"{cache_key}:rows", *index_keys)
+        if df.empty or 'Ticker' not in df.columns:
+            return
+
+        tickers = df['Ticker'].astype(str).tolist()
+        rows = df.to_json(orient='records', lines=True).splitlines()
+        pipe.hset(f"{cache_key}:rows", mapping=dict(zip(tickers, rows)))
+        pipe.expire(f"{cache_key}:rows", STRENGTH_TTL)
+        for col, key in zip(STRENGTH_INDEX_COLUMNS, index_keys):
+            if col not in df.columns:
+                continue
+            scores = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+            mapping = {ticker: score for ticker, score in zip(tickers, scores.tolist()) if not np.isnan(score)}
+            if mapping:
+                pipe.zadd(key, mapping)
+                pipe.expire(key, STRENGTH_TTL)
+
+    def get_top_strength(self, cache_key: str, count: int, above: Optional[Dict[str, float]] = None,
+                         below: Optional[Dict[str, float]] = None) -> Optional[pd.DataFrame]:
+        """Strongest rows of a cached strength table within score bounds
+
+        With only strength bounds the ranking set is read with a limit of
+        count. Other bounds are range-stored into temporary sorted sets and
+        intersected on the server, scored by strength, so only the top count
+        tickers come back and are read from the rows hash.
+
+        Args:
+            cache_key: key the strength table was saved under
+            count: maximum number of rows to return
+            above: column to exclusive lower bound
+            below: column to exclusive upper bound
+
+        Returns:
+            DataFrame of at most count rows, strongest first, or None when the
+            table is not cached
+        """
+        if not self.available:
+            return None
+
+        above = above or {}
+        below = below or {}
+        columns = ['strength'] + [col for col in STRENGTH_INDEX_COLUMNS[1:] if col in above or col in below]
+        unknown = (set(above) | set(below)) - set(STRENGTH_INDEX_COLUMNS)
+        if unknown:
+            raise ValueError(f"Strength index has no column {sorted(unknown)}")
+        if count <= 0:
+            return pd.DataFrame()
+
+        def bounds(col):
+            low = f"({above[col]}" if np.isfinite(above.get(col, np.inf)) else '-inf'
+            high = f"({below[col]}" if np.isfinite(below.get(col, np.inf)) else '+inf'
+            return low, high
+
+        try:
+            pipe = self.r.pipeline()
+            pipe.exists(f"{cache_key}:rows")
+            if len(columns) == 1:
+                low, high = bounds('strength')
+                pipe.zrevrangebyscore(f"{cache_key}:by:strength", high, low, start=0, num=count)
+            else:
+                query = f"{cache_key}:query:{uuid.uuid4().hex}"
+                filtered = {f"{query}:{col}": col for col in columns}
+                for key, col in filtered.items():
+                    pipe.zrangestore(key, f"{cache_key}:by:{col}", *bounds(col), byscore=True)
+                # Only the strength set keeps its score in the intersection
+                pipe.zinterstore(query, {key: 1 if col == 'strength' else 0 for key, col in filtered.items()})
+                pipe.zrevrange(query, 0, count - 1)
+                pipe.delete(query, *filtered)
+            results = pipe.execute()
+            if not results[0]:
+                return None
+
+            tickers = results[-1] if len(columns) == 1 else results[-2]
+            if not tickers:
+                return pd.DataFrame()
+            rows = self.r.hmget(f"{cache_key}:rows", tickers)
+            return pd.DataFrame([json.loads(row) for row in rows if row])
+        except Exception as e:
+            logging.error(f"Error querying strength index {cache_key}: {e}")
+            return None
+
+    def get_strength_data(self, cache_key, columns: Optional[List[str]] = None, copy: bool = True):
+        """Get strength data from Redis
+
+        Args:
+            cache_key: key the strength table was saved under
+            columns: decode only these columns; a table lacking one is a miss
+            copy: False returns read-only numeric columns without copying them,
+                for callers that only read the table
+
+        Returns:
+            DataFrame with the saved column types, empty when not cached
+        """
+        try:
+            data = self.raw.get(cache_key)
+            if data:
+                df = decode_frame(data, columns, copy)
                 logging.debug(f"Retrieved strength data from Redis: {cache_key}")
                 return df
             return pd.DataFrame()
@@ -636,6 +1039,9 @@ class RedisDataManager:
             cache_info = {}
             
             for key in keys:
+                # Skip the sorted-set index saved next to each table
+                if key.endswith(':rows') or ':by:' in key:
+                    continue
                 ttl = self.r.ttl(key)
                 cache_info[key] = {
                     'ttl': ttl,
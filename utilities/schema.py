@@ -0,0 +1,86 @@
+"""
+Column schema of the stock frames served to screeners, strength and portfolio
+Every column is cast, rounded and filled in one pass from this table instead of
+converting each column separately
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """How one column of a stock frame is stored"""
+    dtype: str
+    decimals: Optional[int] = None
+    fill: Any = None
+
+
+# Anything not listed below is numeric, like the screener metrics
+NUMERIC = ColumnSpec('float64', decimals=3, fill=0.0)
+
+STOCK_SCHEMA: Dict[str, ColumnSpec] = {
+    'Ticker': ColumnSpec('category'),
+    'Sector': ColumnSpec('category'),
+    'Index': ColumnSpec('category'),
+    'Last_Updated': ColumnSpec('str', fill=''),
+    'Earnings': ColumnSpec('str', fill=''),
+}
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, ColumnSpec] = STOCK_SCHEMA,
+                 default: ColumnSpec = NUMERIC) -> pd.DataFrame:
+    """Cast, round and fill a frame according to a column schema
+
+    Columns that already have their target dtype are not converted again, so
+    applying the schema to a frame that went through it before is cheap.
+
+    Args:
+        df: stock frame
+        schema: column name to ColumnSpec; other columns use default
+        default: spec of the columns missing from schema
+
+    Returns:
+        new DataFrame with the same columns in the same order
+    """
+    df = df.loc[:, ~df.columns.duplicated()]
+    specs = {col: schema.get(col, default) for col in df.columns}
+    numeric = [col for col, spec in specs.items() if spec.dtype == 'float64']
+
+    parts = []
+    if numeric:
+        block = df[numeric]
+        pending = [col for col, dtype in block.dtypes.items() if not pd.api.types.is_numeric_dtype(dtype)]
+        if pending:
+            block = block.assign(**block[pending].apply(pd.to_numeric, errors='coerce'))
+        # Round and fill the numeric columns as one float matrix
+        values = block.to_numpy(dtype='float64', copy=True)
+        decimals = pd.Series([specs[col].decimals for col in numeric])
+        for places in decimals.dropna().unique():
+            cols = (decimals == places).to_numpy()
+            values[:, cols] = np.round(values[:, cols], int(places))
+        fill = np.array([np.nan if specs[col].fill is None else specs[col].fill for col in numeric], dtype='float64')
+        values = np.where(np.isnan(values), fill, values)
+        parts.append(pd.DataFrame(values, index=df.index, columns=numeric))
+
+    others = {}
+    for col, spec in specs.items():
+        if spec.dtype == 'float64':
+            continue
+        column = df[col]
+        if spec.fill is not None and column.hasnans:
+            column = column.fillna(spec.fill)
+        if column.dtype != spec.dtype:
+            if spec.dtype == 'category':
+                column = column.astype(str)
+            column = column.astype(spec.dtype)
+        others[col] = column
+    if others:
+        parts.append(pd.DataFrame(others, index=df.index))
+
+    if not parts:
+        return df.copy()
+    return pd.concat(parts, axis=1)[list(df.columns)]
@@ -0,0 +1,202 @@
+"""
+Sector History Store
+Daily per-sector aggregates kept on disk for the chart history and downsampled
+with LTTB or min/max buckets for display
+
+File format, per index/sector in SECTOR_HISTORY_DIR:
+    <index>__<sector>.<width>.f64   raw native-order float64 records, no
+                                    header; each record is width values:
+                                    day (days since 1970-01-01), then one
+                                    value per SECTOR_HISTORY_FIELDS entry
+                                    in that order, NaN when missing
+Records are sorted by day and appended; a second write on the same day
+overwrites the last record in place. The width in the file name keeps files
+written with a different field list apart.
+"""
+
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Sector history location from environment variables
+SECTOR_HISTORY_DIR = os.getenv(
+    'SECTOR_HISTORY_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sector_history')
+)
+
+# Daily values kept per index/sector: metric averages, then the mean of the
+# top stock scores of each chart type
+SECTOR_HISTORY_FIELDS = ['pe', 'fpe', 'pb', 'dividend', 'value_score', 'growth_score', 'dividend_score']
+
+
+def _to_day(date) -> int:
+    return int(np.datetime64(pd.Timestamp(date).normalize().date(), 'D').astype(np.int64))
+
+
+class SectorHistoryStore:
+    """Daily per-sector aggregates in append-only files of fixed-size records
+
+    Each index/sector is one raw float64 file of records (day, *fields) with
+    the day counted since the epoch. A new day is appended to the end, a
+    second write on the same day replaces the last record in place, and
+    nothing is ever rewritten, so recording a refresh costs one record per
+    sector and reading a year of history is one small read.
+
+    When the directory cannot be written the records are kept in memory for
+    the lifetime of the process.
+    """
+
+    def __init__(self, root: str = SECTOR_HISTORY_DIR, fields: List[str] = SECTOR_HISTORY_FIELDS):
+        self.root = root
+        self.fields = list(fields)
+        self.width = len(self.fields) + 1
+        self._memory: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            self.available = os.access(self.root, os.W_OK)
+        except OSError as e:
+            logging.warning(f"Sector history directory {self.root} unavailable: {e}")
+            self.available = False
+        if not self.available:
+            logging.warning("Sector history not writable - keeping it in memory")
+
+    def _name(self, index: str, sector: str) -> str:
+        return re.sub(r'[^A-Za-z0-9]+', '_', f"{index}__{sector}") + f".{self.width}.f64"
+
+    def _records(self, index: str, sector: str) -> np.ndarray:
+        """All records of a group as a days x (1 + fields) matrix"""
+        name = self._name(index, sector)
+        if not self.available:
+            return self._memory.get(name, np.empty((0, self.width)))
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return np.empty((0, self.width))
+        values = np.fromfile(path, dtype=np.float64)
+        # A torn last write leaves a partial record, which is ignored
+        rows = len(values) // self.width
+        return values[:rows * self.width].reshape(rows, self.width)
+
+    def append(self, index: str, aggregates: pd.DataFrame, date=None) -> int:
+        """Record one day of aggregates for every sector in the frame
+
+        Args:
+            index: index the sectors belong to
+            aggregates: one row per sector (the frame index) with field columns;
+                missing fields are stored as NaN
+            date: day of the values, today by default
+
+        Returns:
+            number of sectors recorded; a day older than a sector's last
+            record is skipped
+        """
+        day = _to_day(date or datetime.now())
+        aggregates = aggregates.reindex(columns=self.fields).apply(pd.to_numeric, errors='coerce')
+        written = 0
+        with self._lock:
+            for sector, row in zip(aggregates.index, aggregates.to_numpy(dtype=np.float64)):
+                record = np.concatenate([[day], row])
+                if self._write(index, str(sector), record):
+                    written += 1
+        return written
+
+    def _write(self, index: str, sector: str, record: np.ndarray) -> bool:
+        name = self._name(index, sector)
+        records = self._records(index, sector)
+        last = records[-1, 0] if len(records) else None
+        if last is not None and record[0] < last:
+            logging.warning(f"Skipping sector history of {index}:{sector} older than its last day")
+            return False
+
+        if not self.available:
+            kept = records[:-1] if last == record[0] else records
+            self._memory[name] = np.vstack([kept, record])
+            return True
+
+        path = os.path.join(self.root, name)
+        size = len(records) * self.width * 8
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            os.truncate(path, size)
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+            # The same day again replaces the last record
+            fh.seek(size - self.width * 8 if last == record[0] else size)
+            fh.write(record.astype(np.float64).tobytes())
+        return True
+
+    def read(self, index: str, sector: str, start=None, end=None) -> pd.DataFrame:
+        """Daily history of one sector between start and end, inclusive"""
+        records = self._records(index, sector)
+        days = records[:, 0].astype(np.int64)
+        lo = np.searchsorted(days, _to_day(start)) if start is not None else 0
+        hi = np.searchsorted(days, _to_day(end), side='right') if end is not None else len(days)
+        dates = pd.DatetimeIndex(days[lo:hi].astype('datetime64[D]'), name='Date')
+        return pd.DataFrame(records[lo:hi, 1:], index=dates, columns=self.fields)
+
+    def last_date(self, index: str, sector: str) -> Optional[pd.Timestamp]:
+        records = self._records(index, sector)
+        if not len(records):
+            return None
+        return pd.Timestamp(np.datetime64(int(records[-1, 0]), 'D'))
+
+    def clear(self):
+        """Remove every recorded history"""
+        with self._lock:
+            if not self.available:
+                self._memory.clear()
+                return
+            for name in os.listdir(self.root):
+                if name.endswith('.f64'):
+                    os.remove(os.path.join(self.root, name))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, from each of threshold - 2 buckets,
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1])
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def min_max(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Indices of the minimum and maximum of each of buckets equal index ranges, in order"""
+    n = len(y)
+    if buckets * 2 >= n:
+        return np.arange(n)
+    edges = np.linspace(0, n, max(buckets, 1) + 1).astype(np.int64)
+    kept = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        if hi > lo:
+            bucket = y[lo:hi]
+            kept.extend((lo + int(np.argmin(bucket)), lo + int(np.argmax(bucket))))
+    return np.unique(kept)
+
+
+# Global instance
+sector_history = SectorHistoryStore()